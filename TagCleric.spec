@@ -5,7 +5,7 @@ a = Analysis(
     ['main_app.py'],
     pathex=[],
     binaries=[],
-    datas=[('lang', 'lang'), ('TagClericIcon.ico', '.'), ('config.template.ini', '.'),('utils.py', '.'), ('language_manager.py', '.'), ('google_drive_handler.py', '.'), ('file_system_handler.py', '.'), ('app_view.py', '.'), ('app_logic.py', '.')],
+    datas=[('lang', 'lang'), ('TagClericIcon.ico', '.'), ('config.template.ini', '.'),('utils.py', '.'), ('ui_utils.py', '.'), ('tagcleric_cli.py', '.'), ('startup_timer.py', '.'), ('language_manager.py', '.'), ('google_drive_handler.py', '.'), ('file_system_handler.py', '.'), ('app_view.py', '.'), ('app_logic.py', '.'), ('rate_limiter.py', '.'), ('suggestion_cache.py', '.'), ('image_similarity.py', '.'), ('image_preprocessor.py', '.'), ('video_frames.py', '.'), ('thumbnail_service.py', '.'), ('file_index.py', '.'), ('folder_watcher.py', '.'), ('virtual_list.py', '.'), ('record_store.py', '.'), ('ui_dispatcher.py', '.'), ('log_console.py', '.'), ('usage_ledger.py', '.'), ('rename_planner.py', '.'), ('naming.py', '.'), ('name_allocator.py', '.')],
     hiddenimports=['moviepy.editor', 'requests', 'google.cloud.vision', 'google.cloud.language_v1', 'google.generativeai'],
     hookspath=[],
     hooksconfig={},
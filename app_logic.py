@@ -5,23 +5,87 @@ from __future__ import annotations
 import typing
 import os
 import datetime
-from collections import defaultdict
-from threading import Thread
-import io
-from PIL import Image, ImageTk
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+import queue
+from threading import Thread, Event
 import tkinter as tk
 from tkinter import ttk,StringVar, font, messagebox
 
-from utils import generate_video_thumbnail, get_video_frame_as_pil
+from suggestion_cache import SuggestionCache
+from file_index import FileRecord
+from record_store import FileEntry, RecordStore
+import folder_watcher
+import rename_planner
+from naming import NamingOptions, compose_name, compose_names
+from name_allocator import NameAllocator
+from image_similarity import SimilarityClusterer
+from image_preprocessor import IMAGE_EXTENSIONS, VIDEO_EXTENSIONS, prepare_ai_payload
+
+# リネームを実行した行の ai_status
+RENAMED_STATUS = "リネーム済み"
+# 命名オプションを変更してから提案名を組み立て直すまでの待ち時間
+RECOMPOSE_DELAY_MS = 300
 
 if typing.TYPE_CHECKING:
     from main_app import FileRenamerApp
 
 
+def _completed_future(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def _run_as_future(func, *args):
+    future = Future()
+    try:
+        future.set_result(func(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def _shared_future(representative_future, ai_status):
+    """代表画像の結果を ai_status だけ差し替えて受け取る Future を作る。"""
+    future = Future()
+    def _on_done(f):
+        if f.cancelled():
+            future.cancel()
+            return
+        if not future.set_running_or_notify_cancel():
+            return
+        # 代表画像のリクエストが失敗した場合は、同じ例外でこちらも完了させる (待ち続けないように)
+        error = f.exception()
+        if error is not None:
+            future.set_exception(error)
+            return
+        _, ai_generated_part, success = f.result()
+        future.set_result((ai_status, ai_generated_part, success))
+    representative_future.add_done_callback(_on_done)
+    return future
+
+
 class AppLogic:
     def __init__(self, app_instance: 'FileRenamerApp'):
         self.app = app_instance
         self.lang = app_instance.lang_manager
+        self._image_pool = None
+        self._video_pool = None
+        self._scan_generation = 0
+        self._scan_cancel_event = None
+        self._scan_request = None
+        self._watcher = None
+        self._watch_token = None
+        self._renaming = False
+        # ★追加: 一覧の行データ。Treeview ではなくこちらを正とし、ワーカースレッドからも読み書きする
+        self.records = RecordStore()
+        self._recompose_id = None
+        self._recompose_pending = False
+        # ★追加: 連番はフォルダ内の既存ファイルと提案済みの名前を見て、重複しないように振る
+        self.name_allocator = NameAllocator(pending=self.records.suggestions_in)
 
     def load_local_files_logic(self):
         if self.app.is_processing: return
@@ -32,88 +96,287 @@ class AppLogic:
         self.app.update_status(self.lang.get("status_loading_files"))
         self.app.clear_file_list(self.app.app_view.local_tree)
         extensions = [ext.strip().lower() for ext in self.app.file_types_var.get().split(',')]
+        # ★追加: サブフォルダの再帰走査とパターンによる絞り込み
+        scan_options = {
+            'recursive': self.app.recursive_scan_var.get(),
+            'max_depth': self.app.get_scan_max_depth(),
+            'include_patterns': self._split_patterns(self.app.include_patterns_var.get()),
+            'exclude_patterns': self._split_patterns(self.app.exclude_patterns_var.get()),
+        }
+
+        # ★修正: 走査はバックグラウンドで行い、見つかったファイルを少しずつ一覧に追加する
+        self._scan_generation += 1
+        self._scan_cancel_event = Event()
+        self._scan_request = (directory_path, extensions, scan_options)
+        if self.app.app_view.cancel_button: self.app.app_view.cancel_button.config(state="normal")
+        Thread(target=self._scan_files_task, args=(directory_path, extensions, scan_options, self._scan_generation, self._scan_cancel_event), daemon=True).start()
+
+    @staticmethod
+    def _split_patterns(text):
+        return [pattern.strip() for pattern in text.replace(';', ',').split(',') if pattern.strip()]
+
+    def cancel_scan(self, discard=False):
+        """走査を中止する。discard=True の場合は、まだ一覧に追加されていない結果も捨て、フォルダの監視も止める。"""
+        if discard:
+            self._scan_request = None
+            self.stop_watcher()
+        if self._scan_cancel_event is None: return
+        self._scan_cancel_event.set()
+        if discard:
+            self._scan_generation += 1
+            self._scan_cancel_event = None
+            if not self.app.is_processing and self.app.app_view.cancel_button: self.app.app_view.cancel_button.config(state="disabled")
+
+    def _scan_files_task(self, directory_path, extensions, scan_options, generation, cancel_event):
+        # ★追加: 前回の走査結果をインデックスから読み、変化したファイルだけを更新する
+        root = os.path.abspath(directory_path)
+        file_index = self.app.file_index
+        signature = file_index.make_signature(extensions, scan_options)
+        previous_signature, known = file_index.load(root)
+        shown = set()
+        if known and previous_signature == signature:
+            rows = [FileEntry.from_record(path, record) for path, record in known.items()]
+            shown.update(known)
+            self.app.ui.call(self._insert_scanned_rows, generation, rows, len(rows))
+
+        seen = set()
         try:
-            files = self.app.file_system_handler.list_files(directory_path, extensions)
-            for file_path in files:
+            for entries in self.app.file_system_handler.scan_files(directory_path, extensions, cancel_event=cancel_event, **scan_options):
+                rows, changed = [], []
+                for entry in entries:
+                    seen.add(entry.path)
+                    old = known.get(entry.path)
+                    try: stat = entry.stat()
+                    except OSError as e: print(f"ファイル情報の取得エラー {entry.path}: {e}"); continue
+                    record = self._build_record(entry.path, stat, root, old)
+                    if record is None: continue
+                    if record is not old: changed.append((entry.path, record))
+                    elif entry.path in shown: continue
+                    rows.append(FileEntry.from_record(entry.path, record))
+                file_index.upsert(root, changed)
+                self.app.ui.call(self._insert_scanned_rows, generation, rows, len(seen))
+            cancelled = cancel_event.is_set()
+            if not cancelled:
+                removed = [path for path in known if path not in seen]
+                file_index.finish_scan(root, signature, removed)
+                self.app.ui.call(self._remove_rows, generation, [path for path in removed if path in shown])
+            self.app.ui.call(self._finish_scan, generation, len(seen), cancelled)
+        except Exception as e:
+            print(f"エラー: {e}")
+            self.app.ui.call(self._finish_scan, generation, None, False)
+
+    def _build_record(self, path, stat, root, old=None):
+        """stat の結果から FileRecord を作る。サイズ・更新日時・inode が前回と同じなら old をそのまま返す。"""
+        try:
+            if old is not None and (old.size, old.mtime_ns, old.inode) == (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+                return old
+            timestamp_to_use = None
+            try:
+                datetime.datetime.fromtimestamp(stat.st_ctime)
+                timestamp_to_use = stat.st_ctime
+            except (OSError, ValueError):
                 try:
-                    stat = file_path.stat()
-                    timestamp_to_use = None
-                    try:
-                        datetime.datetime.fromtimestamp(stat.st_ctime)
-                        timestamp_to_use = stat.st_ctime
-                    except (OSError, ValueError):
-                        try:
-                            datetime.datetime.fromtimestamp(stat.st_mtime)
-                            timestamp_to_use = stat.st_mtime
-                        except (OSError, ValueError):
-                            print(f"エラー: {file_path.name} の日時情報を取得できませんでした。")
-                            continue
-                    
-                    creation_dt = datetime.datetime.fromtimestamp(timestamp_to_use)
-                    values = (file_path.name, "", str(file_path), "未分析", creation_dt.strftime("%Y-%m-%d %H:%M:%S"), creation_dt.isoformat())
-                    self.app.app_view.local_tree.insert("", "end", values=values, iid=str(file_path))
-                except Exception as e: 
-                    print(f"ファイル情報の取得エラー {file_path}: {e}")
-            self.app.update_status(self.lang.get("status_files_loaded").format(count=len(self.app.app_view.local_tree.get_children())))
+                    datetime.datetime.fromtimestamp(stat.st_mtime)
+                    timestamp_to_use = stat.st_mtime
+                except (OSError, ValueError):
+                    print(f"エラー: {os.path.basename(path)} の日時情報を取得できませんでした。")
+                    return None
+            return FileRecord(stat.st_size, stat.st_mtime_ns, stat.st_ino, timestamp_to_use, self._subfolder_of(path, root), "未分析", "")
         except Exception as e:
+            print(f"ファイル情報の取得エラー {path}: {e}")
+            return None
+
+    @staticmethod
+    def _subfolder_of(path, root):
+        """ルートからの相対フォルダ (ルート直下は空文字)。"""
+        subfolder = os.path.relpath(os.path.dirname(path), root)
+        return "" if subfolder == os.curdir else subfolder.replace(os.sep, '/')
+
+    # --- 行データ (self.records) の追加・削除。メインスレッドで行い、一覧の表示に知らせる ---
+    def _upsert_entries(self, entries):
+        changed, old_count = self.records.upsert(entries)
+        self.app.app_view.local_tree.rows_appended(old_count)
+        return changed
+
+    def _delete_entries(self, paths):
+        removed = self.records.delete(paths)
+        self.app.app_view.local_tree.rows_removed(removed)
+        return len(removed)
+
+    def _replace_entry(self, old_path, entry):
+        removed = self.records.replace(old_path, entry)
+        if removed is None: return False
+        self.app.app_view.local_tree.rows_removed(removed)
+        self.app.app_view.local_tree.key_replaced(old_path, entry.path)
+        return True
+
+    def clear_records(self):
+        self.records.clear()
+        self.name_allocator.reset()
+        self.app.app_view.local_tree.reset()
+
+    def _insert_scanned_rows(self, generation, rows, count):
+        if generation != self._scan_generation: return
+        self._upsert_entries(rows)
+        self.app.update_status(self.lang.get("status_scanning_files").format(count=count))
+
+    def _remove_rows(self, generation, paths):
+        if generation != self._scan_generation: return
+        self._delete_entries(paths)
+
+    def _finish_scan(self, generation, count, cancelled):
+        if generation != self._scan_generation: return
+        self._scan_cancel_event = None
+        if not self.app.is_processing and self.app.app_view.cancel_button: self.app.app_view.cancel_button.config(state="disabled")
+        if count is None:
             self.app.update_status(self.lang.get("status_error_loading_files"))
-            print(f"エラー: {e}")
+        elif cancelled:
+            self.app.update_status(self.lang.get("status_scan_cancelled").format(count=count))
+        else:
+            self.app.update_status(self.lang.get("status_files_loaded").format(count=count))
+            self.start_watcher()
+
+    def start_watcher(self):
+        """★追加: 読み込み済みのフォルダを監視し、外部での追加・削除・リネームを一覧に反映する。"""
+        self.stop_watcher()
+        # ★修正: リネーム中は監視を止めておき、終了後に _finish_rename から呼び直す
+        if not self.app.watch_folder_var.get() or self._scan_request is None or self._scan_cancel_event is not None or self._renaming: return
+        directory_path, extensions, scan_options = self._scan_request
+        root = os.path.abspath(directory_path)
+        handler = self.app.file_system_handler
+        path_filter = handler.make_filter(root, extensions, **scan_options)
+        token = self._watch_token = object()
+
+        def snapshot():
+            states = {}
+            for entries in handler.scan_files(root, extensions, **scan_options):
+                for entry in entries:
+                    # ★修正: 走査の途中で削除されたファイルは飛ばす (例外で監視スレッドが止まらないように)
+                    try: stat = entry.stat()
+                    except OSError: continue
+                    states[entry.path] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+            return states
+
+        try:
+            self._watcher = folder_watcher.start_watcher(root, path_filter, scan_options['recursive'], snapshot,
+                                                         lambda delta: self._on_folder_changes(root, path_filter, token, delta))
+        except Exception as e:
+            print(f"フォルダの監視を開始できませんでした: {e}")
+            self._watch_token = None
+
+    def stop_watcher(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+        self._watcher = self._watch_token = None
+
+    def toggle_watcher(self):
+        if self.app.watch_folder_var.get(): self.start_watcher()
+        else: self.stop_watcher()
+
+    def _on_folder_changes(self, root, path_filter, token, delta):
+        """監視スレッドから呼ばれる。インデックスを更新し、一覧への反映はメインスレッドで行う。"""
+        if token is not self._watch_token: return
+        if delta.resync:
+            self.app.ui.call(self._resync_folder, token)
+            return
+        file_index = self.app.file_index
+        moves, rows, removed = [], [], []
+        for old_path, new_path, is_dir in delta.renames:
+            if is_dir:
+                pairs = [(path, new_path + path[len(old_path):], record) for path, record in file_index.load_prefix(root, old_path)]
+            else:
+                record = file_index.get(root, old_path)
+                pairs = [(old_path, new_path, record)] if record else []
+            # 移動先での判定とサブフォルダの付け替えを行い、提案状態はそのまま引き継ぐ
+            pairs = [(old, new, record._replace(subfolder=self._subfolder_of(new, root))) for old, new, record in pairs]
+            file_index.move(root, pairs)
+            moves.extend((old, FileEntry.from_record(new, record)) for old, new, record in pairs)
+            delta.changed.update(new for _, new, _ in pairs)
+        for directory in delta.removed_dirs:
+            removed.extend(path for path, _ in file_index.load_prefix(root, directory))
+        for path in delta.changed:
+            try:
+                stat = os.stat(path) if path_filter(path) else None
+            except OSError:
+                stat = None
+            if stat is None or not os.path.isfile(path):
+                removed.append(path)
+                continue
+            old = file_index.get(root, path)
+            record = self._build_record(path, stat, root, old)
+            if record is None: continue
+            if record is not old: file_index.upsert(root, [(path, record)])
+            rows.append(FileEntry.from_record(path, record))
+        file_index.remove(root, removed)
+        self.app.ui.call(self._apply_folder_changes, token, moves, rows, removed)
+
+    def _apply_folder_changes(self, token, moves, rows, removed):
+        if token is not self._watch_token: return
+        renamed = sum(1 for old_path, entry in moves if self._replace_entry(old_path, entry))
+        added = self._upsert_entries(rows)
+        deleted = self._delete_entries(removed)
+        # フォルダの中身が変わったため、連番の割り当ては次に必要になったときに読み直す
+        changed_paths = [path for move in moves for path in (move[0], move[1].path)] + [row.path for row in rows] + list(removed)
+        self.name_allocator.forget({os.path.dirname(path) for path in changed_paths})
+        if added or renamed or deleted:
+            self.app.update_status(self.lang.get("status_folder_changed").format(added=added, removed=deleted, renamed=renamed))
+
+    def _resync_folder(self, token):
+        # 変更通知を取りこぼしたときは、インデックスを使った差分走査で一覧を合わせ直す
+        if token is not self._watch_token or self.app.is_processing: return
+        self.load_local_files_logic()
 
     def on_tree_select_logic(self, event):
         if self.app.is_processing: return
-        selection = event.widget.selection()
-        if not selection:
+        file_path = event.widget.focused_item()
+        if not file_path:
             self.app.clear_thumbnail()
             return
-        file_path = event.widget.item(selection[0], 'values')[2]
         self._show_thumbnail_local(file_path)
 
     def _show_thumbnail_local(self, file_path):
-        self.app.clear_thumbnail()
         ext = os.path.splitext(file_path)[1].lower()
-        if ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']:
-            try:
-                image = Image.open(file_path)
-                image.thumbnail(self.app.THUMBNAIL_SIZE, Image.Resampling.LANCZOS)
-                photo = ImageTk.PhotoImage(image)
-                self.app.app_view.thumbnail_label.config(image=photo, text="")
-                self.app.app_view.current_thumbnail_image = photo
-            except Exception as e:
-                self.app.clear_thumbnail("表示エラー")
-        elif ext in ['.mp4', '.mov', '.avi', '.wmv', '.flv']:
+        if ext in IMAGE_EXTENSIONS:
+            # ★修正: デコードはサムネイルサービスのバックグラウンドスレッドで行い、UIを止めない
+            self.app.clear_thumbnail("読み込み中...")
+            self.app.thumbnail_service.request(file_path, lambda photo: self._update_thumbnail_ui(photo, "表示エラー"))
+        elif ext in VIDEO_EXTENSIONS:
             self.app.clear_thumbnail("動画サムネイル\n生成中...")
-            def _task():
-                photo = generate_video_thumbnail(file_path, self.app.THUMBNAIL_SIZE)
-                self.app.after(0, self._update_thumbnail_ui, photo)
-            Thread(target=_task, daemon=True).start()
+            self.app.thumbnail_service.request(file_path, self._update_thumbnail_ui)
         else:
             self.app.clear_thumbnail("プレビュー非対応")
             
-    def _update_thumbnail_ui(self, photo):
+    def _update_thumbnail_ui(self, photo, error_text="生成失敗"):
         if photo:
             self.app.app_view.thumbnail_label.config(image=photo, text="")
             self.app.app_view.current_thumbnail_image = photo
         else:
-            self.app.clear_thumbnail("生成失敗")
+            self.app.clear_thumbnail(error_text)
 
     def on_tree_edit_start_logic(self, event):
         if self.app.is_processing: return
-        tree = event.widget
-        if not tree.identify_region(event.x, event.y) == "cell": return
-        item_id, col_id = tree.identify_row(event.y), tree.identify_column(event.x)
-        if tree.heading(col_id, 'option', 'text') != self.lang.get("col_new_name"): return
-        x, y, w, h = tree.bbox(item_id, col_id)
+        file_list = self.app.app_view.local_tree
+        item_id, col_id = file_list.identify(event.x, event.y)
+        if col_id != "new_name": return
+        bbox = file_list.bbox(item_id, col_id)
+        if not bbox: return
+        x, y, w, h = bbox
         
-        entry_var = StringVar(value=tree.set(item_id, col_id))
-        entry = ttk.Entry(tree, textvariable=entry_var)
+        file_entry = self.records.get(item_id)
+        if file_entry is None: return
+        entry_var = StringVar(value=file_entry.new_name)
+        entry = ttk.Entry(file_list.tree, textvariable=entry_var)
         entry.place(x=x, y=y, width=w, height=h)
         entry.focus_set()
         
         def on_edit_end(e):
             new_val = entry_var.get()
-            tree.set(item_id, col_id, new_val)
-            old_name = tree.item(item_id, "values")[0]
-            self.app.update_status(self.lang.get("status_name_changed_manually").format(old_name=old_name, new_name=new_val))
+            # ★修正: 手動で編集した名前は、命名オプションを変えても組み立て直さない
+            self.records.update(item_id, new_name=new_val, manual=True)
+            self.name_allocator.reserve(item_id, new_val)
+            file_list.refresh()
+            self.app.file_index.update_suggestion(item_id, new_val, manual=True)
+            self.app.update_status(self.lang.get("status_name_changed_manually").format(old_name=file_entry.name, new_name=new_val))
             entry.destroy()
 
         entry.bind("<Return>", on_edit_end)
@@ -141,158 +404,478 @@ class AppLogic:
             messagebox.showwarning(self.lang.get("msgbox_warn_select_files_title"), self.lang.get("msgbox_warn_select_files_msg"))
             return
 
+        # ★修正: Tk の変数はメインスレッドで読み、ワーカースレッドには値だけを渡す
+        config = self._suggestion_config()
         self.app.toggle_ui_state(processing=True)
-        Thread(target=self._suggest_names_task, args=(selected_items,), daemon=True).start()
+        Thread(target=self._suggest_names_task, args=(selected_items, config, self._naming_options(config)), daemon=True).start()
+
+    def _suggestion_config(self):
+        """提案の設定を画面の値から作る (メインスレッドから呼ぶ)。"""
+        return {
+            'add_creation_date': self.app.add_date_var.get(),
+            'date_format': self.app.date_format_var.get(),
+            'remove_original_name': self.app.remove_original_name_var.get(),
+            'add_folder_name': self.app.add_folder_name_var.get(),
+            'folder_name_to_add': self.app.folder_name_to_add_var.get().strip(),
+            'ai_fallback_name': self.app.ai_fallback_name_var.get(),
+            'language_mode': self.app.language_mode_var.get(),
+            'custom_prompt': self.app.app_view.custom_prompt_text.get("1.0", tk.END).strip(),
+            # ★修正: 連番設定をconfigに追加
+            'add_sequence_number': self.app.add_sequence_var.get(),
+            # ★追加: 同時に送信するGeminiリクエスト数
+            'max_concurrent_requests': self.app.get_max_concurrent_requests(),
+            # ★追加: 連写などの類似画像とみなすハミング距離 (0で無効)
+            'similarity_threshold': self.app.get_similarity_threshold(),
+            # ★追加: 1回のリクエストにまとめる画像の枚数 (1でまとめない)
+            'batch_size': self.app.get_batch_size()
+        }
 
-    def _suggest_names_task(self, selected_items):
+    def _suggest_names_task(self, selected_items, config, naming_options):
+        stop_feeding = Event()
+        prepared_queue = None
         try:
             self.app.cancel_requested.clear()
             self.app.update_status(self.lang.get("status_suggesting_names").format(count=len(selected_items)))
             
+            # ★修正: 名前の組み立ては naming.compose_name に任せ、連番は NameAllocator がフォルダ単位で振る
+            allocate = self.name_allocator.allocate
+            total = len(selected_items)
+            done = 0
+            # ★追加: QUOTA_EXCEEDED を受けた時点で未送信のリクエストを止めるためのフラグ
+            stop_event = Event()
+            max_workers = config['max_concurrent_requests']
+            self.app.rate_limiter.sync_daily_usage(self.app.ai_handler.model_name, self.app.usage_ledger.daily_requests)
+
+            # ★追加: 類似画像はクラスタの代表1枚だけをGeminiに送り、残りはその結果を共有する
+            clusterer = SimilarityClusterer(config['similarity_threshold'])
+
+            # ★追加: 画像の準備は別スレッドからプロセスプールに投入し、上限付きのキューで受け取る。
+            # ネットワーク側が遅いとキューが満杯になり、準備の投入も止まる (メモリ使用量を一定に保つ)
+            entries = self.records.get_many(selected_items)
+            prepared_queue = queue.Queue(maxsize=self._preparation_queue_size(config))
+            Thread(target=self._feed_preparations, args=(entries, prepared_queue, stop_feeding, stop_event), daemon=True).start()
+
+            # ★追加: 結果は選択順に反映し、連番を並列実行でも決定的に保つ
+            pending = deque()
+            batch = []
+            unsent = set()  # 送信前のバッチの結果を待つ Future (類似画像として代表の結果を共有するものを含む)
+            # 送信済みのバッチに加えて組み立て中のバッチ1つ分まで先に進め、満杯のバッチを送れるようにする
+            window = max_workers * config['batch_size'] + config['batch_size']
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gemini") as executor:
+                for entry, preparation in iter(prepared_queue.get, None):
+                    if self.app.cancel_requested.is_set() or stop_event.is_set():
+                        preparation.cancel()
+                        break
+                    prepared = self._collect_preparation(preparation, entry.path)
+                    future = self._submit_suggestion(executor, prepared, config, stop_event, clusterer, batch, unsent)
+                    pending.append((entry, future))
+                    if len(batch) >= config['batch_size']:
+                        self._flush_batch(executor, batch, config, stop_event, unsent)
+
+                    while pending and (len(pending) > window or pending[0][1].done()):
+                        if pending[0][1] in unsent:
+                            # 先頭の結果が送信前のバッチを待っているときだけ、満杯になる前に送信する
+                            self._flush_batch(executor, batch, config, stop_event, unsent)
+                        self._apply_suggestion(*pending.popleft(), config, naming_options, allocate)
+                        done += 1
+                        self.app.update_status(self.lang.get("status_processing").format(done=done, total=total))
+
+                # 残りの準備は結果を待つ前に取り消す (例外で抜けた場合は finally で止める)
+                stop_feeding.set()
+                self._discard_preparations(prepared_queue)
+                interrupted = self.app.cancel_requested.is_set() or stop_event.is_set()
+                if interrupted:
+                    # 未着手のリクエストは取り消し、送信済みのものは結果を待って反映する
+                    batch.clear()
+                    unsent.clear()
+                    for _, future in pending:
+                        future.cancel()
+                else:
+                    self._flush_batch(executor, batch, config, stop_event, unsent)
+                while pending:
+                    entry, future = pending.popleft()
+                    if future.cancelled():
+                        continue
+                    self._apply_suggestion(entry, future, config, naming_options, allocate)
+                    done += 1
+
+            if stop_event.is_set():
+                self.app.ui.call(self.app.show_quota_error_message, self.app.ai_handler.model_name)
+
+            if interrupted:
+                self.app.update_status(self.lang.get("status_processing_interrupted").format(done=done, total=total))
+            else:
+                self.app.update_status(self.lang.get("status_suggestion_complete"))
+        finally:
+            # ★修正: 途中で例外が出ても、準備の投入スレッドを止めて待機中の準備を手放す
+            stop_feeding.set()
+            if prepared_queue is not None: self._discard_preparations(prepared_queue)
+            self.app.ui.call(self.app.toggle_ui_state, False)
+            self.app.ui.call(self._recompose_if_pending)
+
+    def _submit_suggestion(self, executor, prepared, config, stop_event, clusterer, batch, unsent):
+        """準備済みの画像をGeminiへのリクエストとしてワーカーに投入する。結果は (ai_status, ai_part, success) の Future。"""
+        file_content_bytes, image_hash, error_status = prepared
+        if error_status:
+            return _completed_future((error_status, None, False))
+
+        representative_future = clusterer.find(image_hash)
+        if representative_future is not None:
+            future = _shared_future(representative_future, "類似画像")
+            if representative_future in unsent: unsent.add(future)
+            return future
+
+        # ★追加: 同じ画像・モデル・言語・プロンプトの提案がキャッシュにあればAPIを呼ばない
+        cache_key = SuggestionCache.make_key(file_content_bytes, self.app.ai_handler.model_name, config['language_mode'], config['custom_prompt'])
+        cached_part = self.app.suggestion_cache.get(cache_key)
+        if cached_part:
+            future = _completed_future(("キャッシュ", cached_part, True))
+        elif config['batch_size'] > 1:
+            # ★追加: バッチモードでは複数枚がたまってから _flush_batch でまとめて送信する
+            future = Future()
+            batch.append((file_content_bytes, cache_key, future))
+            unsent.add(future)
+        else:
+            future = executor.submit(self._request_ai_name, file_content_bytes, cache_key, config, stop_event)
+        clusterer.add(image_hash, future)
+        return future
+
+    def _flush_batch(self, executor, batch, config, stop_event, unsent):
+        if batch:
+            executor.submit(self._request_ai_names_batch, list(batch), config, stop_event)
+            batch.clear()
+        unsent.clear()
+
+    def _preparation_queue_size(self, config):
+        return 2 * (self._preparation_workers() + config['max_concurrent_requests'] * config['batch_size'])
+
+    def _preparation_workers(self):
+        # UIのために1コア残す
+        return max(1, (os.cpu_count() or 2) - 1)
+
+    def _get_preparation_pools(self):
+        """画像用のプロセスプールと動画用のスレッドプールを初回だけ作成する。"""
+        if self._video_pool is None:
+            self._video_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="video_prep")
+        if self._image_pool is None:
+            try:
+                self._image_pool = ProcessPoolExecutor(max_workers=self._preparation_workers())
+            except (OSError, NotImplementedError) as e:
+                print(f"画像準備用のプロセスプールを作成できませんでした。スレッドで処理します: {e}")
+                self._image_pool = ThreadPoolExecutor(max_workers=self._preparation_workers(), thread_name_prefix="image_prep")
+        return self._image_pool, self._video_pool
+
+    def _feed_preparations(self, entries, prepared_queue, stop_feeding, stop_event):
+        """選択順に画像の準備を投入し、Future を prepared_queue に渡す。キューが満杯の間はここで待つ。"""
+        try:
+            image_pool, video_pool = self._get_preparation_pools()
+            for entry in entries:
+                if stop_feeding.is_set() or self.app.cancel_requested.is_set() or stop_event.is_set():
+                    break
+                file_path = entry.path
+                # 動画のデコードは ffmpeg の別プロセスで行われるため、スレッドで十分
+                pool = video_pool if os.path.splitext(file_path)[1].lower() in VIDEO_EXTENSIONS else image_pool
+                try:
+                    preparation = pool.submit(prepare_ai_payload, file_path)
+                except BrokenProcessPool:
+                    self._image_pool = None
+                    preparation = video_pool.submit(prepare_ai_payload, file_path)
+                if not self._put_until_stopped(prepared_queue, (entry, preparation), stop_feeding):
+                    preparation.cancel()
+                    return
+        except Exception as e:
+            print(f"画像準備の投入中にエラーが発生しました: {e}")
+        self._put_until_stopped(prepared_queue, None, stop_feeding)
+
+    @staticmethod
+    def _put_until_stopped(target_queue, entry, stop_feeding):
+        while not stop_feeding.is_set():
+            try:
+                target_queue.put(entry, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _discard_preparations(prepared_queue):
+        while True:
+            try:
+                item = prepared_queue.get_nowait()
+            except queue.Empty:
+                return
+            if item:
+                _, preparation = item
+                preparation.cancel()
+
+    def _collect_preparation(self, preparation, file_path):
+        """準備の結果を (jpeg_bytes, dhash, error_status) に変換する。失敗時は ai_status に表示する文字列を返す。"""
+        try:
+            optimized_bytes, image_hash = preparation.result()
+        except BrokenProcessPool:
+            # プロセスが異常終了した場合はプールを作り直し、この画像はここで準備する
+            self._image_pool = None
+            return self._collect_preparation(_run_as_future(prepare_ai_payload, file_path), file_path)
+        except Exception as e:
+            print(f"画像最適化エラー: {e}")
+            return None, None, "画像エラー"
+        if not optimized_bytes:
+            return None, None, "分析不可"
+        return optimized_bytes, image_hash, None
+
+    def shutdown(self):
+        self.stop_watcher()
+        for pool in (self._image_pool, self._video_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._image_pool = self._video_pool = None
+
+    def _request_ai_name(self, optimized_bytes, cache_key, config, stop_event):
+        """ワーカースレッドで実行される。中断要求後に未送信だったものは送らない。"""
+        result = self._call_gemini(
+            lambda: self.app.ai_handler.generate_name_from_image(optimized_bytes, config['custom_prompt'], config['language_mode']),
+            stop_event
+        )
+        if result is None:
+            return None, None, False
+        ai_generated_part, success, _ = result
+        if success:
+            self.app.suggestion_cache.put(cache_key, ai_generated_part)
+        return "提案済み", ai_generated_part, success
+
+    def _request_ai_names_batch(self, batch, config, stop_event):
+        """複数の画像を1回のリクエストで送り、名前を対応付けできなかった画像だけ1枚ずつ送り直す。"""
+        batch = [entry for entry in batch if entry[2].set_running_or_notify_cancel()]
+        try:
+            names = [None] * len(batch)
+            if len(batch) > 1:
+                result = self._call_gemini(
+                    lambda: self.app.ai_handler.generate_names_from_images([entry[0] for entry in batch], config['custom_prompt'], config['language_mode']),
+                    stop_event
+                )
+                if result is None or result[0] == "QUOTA_EXCEEDED":
+                    skipped = (None, None, False) if result is None else ("提案済み", "QUOTA_EXCEEDED", False)
+                    for _, _, future in batch:
+                        future.set_result(skipped)
+                    return
+                if result[1]:
+                    names = result[0]
+
+            for (optimized_bytes, cache_key, future), name in zip(batch, names):
+                if name:
+                    self.app.suggestion_cache.put(cache_key, name)
+                    future.set_result(("提案済み", name, True))
+                else:
+                    future.set_result(self._request_ai_name(optimized_bytes, cache_key, config, stop_event))
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+
+    def _call_gemini(self, request, stop_event):
+        """
+        request() を RPM/RPD を守って呼び出し、(ai_part, success, tokens_used) を返す。
+        中断された場合は None を返す。
+        """
+        model_name = self.app.ai_handler.model_name
+        should_abort = lambda: self.app.cancel_requested.is_set() or stop_event.is_set()
+
+        # ★追加: RPM/RPD を超えないよう送信ペースを制御し、ResourceExhausted では待機して再送する
+        for _ in range(self.app.rate_limiter.MAX_RETRIES + 1):
+            if not self.app.rate_limiter.acquire(model_name, abort=should_abort, on_wait=self._report_rate_limit_wait):
+                if should_abort():
+                    return None
+                break
+
+            started = time.monotonic()
+            ai_generated_part, success, tokens_used = request()
+            if ai_generated_part == "QUOTA_EXCEEDED":
+                self.app.rate_limiter.report_exhausted(model_name)
+                continue
+
+            self.app.rate_limiter.report_success(model_name)
+            if success:
+                # ★修正: ジャーナルへの記録はこのスレッドで行い、表示の更新はまとめて1回にする
+                self.app.usage_ledger.record(model_name, tokens_used, time.monotonic() - started)
+                self.app.ui.coalesce("usage", self.app.on_usage_recorded)
+            return ai_generated_part, success, tokens_used
+
+        # 本日の上限に達した、または再送しても制限が解除されなかった
+        stop_event.set()
+        return "QUOTA_EXCEEDED", False, 0
+
+    def _report_rate_limit_wait(self, seconds):
+        self.app.update_status(self.lang.get("status_rate_limit_wait").format(seconds=round(seconds)))
+
+    def _apply_suggestion(self, entry, future, config, naming_options, allocate):
+        """選択順に呼ばれ、AIの結果から新しいファイル名を組み立てて行データに反映する。"""
+        try:
+            ai_status, ai_generated_part, success = future.result()
+        except Exception as e:
+            print(f"AIによる名前の提案でエラーが発生しました: {entry.path}: {e}")
+            ai_status, ai_generated_part, success = "エラー", None, False
+        file_path = entry.path
+        self.app.ui.coalesce("thumbnail", self._show_thumbnail_local, file_path)
+
+        if ai_status is None or ai_generated_part == "QUOTA_EXCEEDED":
+            return
+        if ai_generated_part is None:
+            if self.records.update(file_path, ai_status=ai_status):
+                self.app.file_index.update_suggestion(file_path, entry.new_name, ai_status, manual=entry.manual)
+            self.app.ui.coalesce("file_list", self.app.app_view.local_tree.refresh)
+            return
+        if not success:
+            ai_generated_part = config['ai_fallback_name']
+
+        new_name = compose_name(entry.path, entry.created, entry.subfolder, ai_generated_part, naming_options, allocate)
+        # ★追加: AI の名前部分も保存し、オプションを変えたときに API を呼ばずに組み立て直せるようにする
+        if self.records.update(file_path, new_name=new_name, ai_status=ai_status, ai_part=ai_generated_part, manual=False):
+            self.app.file_index.update_suggestion(file_path, new_name, ai_status, ai_part=ai_generated_part)
+        self.app.ui.coalesce("file_list", self.app.app_view.local_tree.refresh)
+
+    def _naming_options(self, config=None):
+        """命名オプションを NamingOptions にまとめる。config を省略した場合は画面の値を読む (メインスレッドから呼ぶ)。"""
+        if config is None:
             config = {
                 'add_creation_date': self.app.add_date_var.get(),
                 'date_format': self.app.date_format_var.get(),
                 'remove_original_name': self.app.remove_original_name_var.get(),
                 'add_folder_name': self.app.add_folder_name_var.get(),
                 'folder_name_to_add': self.app.folder_name_to_add_var.get().strip(),
-                'ai_fallback_name': self.app.ai_fallback_name_var.get(), 
-                'language_mode': self.app.language_mode_var.get(),
-                'custom_prompt': self.app.app_view.custom_prompt_text.get("1.0", tk.END).strip(),
-                # ★修正: 連番設定をconfigに追加
-                'add_sequence_number': self.app.add_sequence_var.get()
+                'ai_fallback_name': self.app.ai_fallback_name_var.get(),
+                'add_sequence_number': self.app.add_sequence_var.get(),
             }
-            
-            # ★追加: 提案されたベース名を追跡するための辞書
-            name_counts = defaultdict(int)
-            previous_file_path = None
+        return NamingOptions(config['add_creation_date'], config['date_format'], config['remove_original_name'], config['add_folder_name'],
+                             config['folder_name_to_add'], config['ai_fallback_name'], config['add_sequence_number'])
 
-            for i, item_id in enumerate(selected_items):
-                if self.app.cancel_requested.is_set():
-                    self.app.update_status(self.lang.get("status_processing_interrupted").format(done=i, total=len(selected_items)))
-                    return
-                
-                self.app.update_status(self.lang.get("status_processing").format(done=i+1, total=len(selected_items)))
-                
-                values = self.app.app_view.local_tree.item(item_id, 'values')
-                old_name, _, file_path, _, _, creation_dt_iso = values
-                base_name, ext = os.path.splitext(old_name)
-
-                if previous_file_path:
-                    self.app.after(0, self._show_thumbnail_local, previous_file_path)
-                else: 
-                    self.app.after(0, self._show_thumbnail_local, file_path)
-
-
-                file_content_bytes = None
-                file_ext = ext.lower()
-                image_exts = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']
-                video_exts = ['.mp4', '.mov', '.avi', '.wmv', '.flv']
-
-                if file_ext in image_exts:
-                    file_content_bytes = self.app.file_system_handler.read_file_content(file_path)
-                elif file_ext in video_exts:
-                    pil_image = get_video_frame_as_pil(file_path)
-                    if pil_image:
-                        with io.BytesIO() as output:
-                            pil_image.save(output, format="PNG")
-                            file_content_bytes = output.getvalue()
-                
-                if not file_content_bytes:
-                     self.app.after(0, self.app.app_view.local_tree.set, item_id, "ai_status", "分析不可")
-                     previous_file_path = file_path 
-                     continue
-
-                optimized_bytes = None
-                try:
-                    with Image.open(io.BytesIO(file_content_bytes)) as img:
-                        img.thumbnail((1024, 1024), Image.Resampling.LANCZOS)
-                        optimized_buffer = io.BytesIO()
-                        img.save(optimized_buffer, format="PNG")
-                        optimized_bytes = optimized_buffer.getvalue()
-                except Exception as e:
-                    print(f"画像最適化エラー: {e}")
-                    self.app.after(0, self.app.app_view.local_tree.set, item_id, "ai_status", "画像エラー")
-                    previous_file_path = file_path 
-                    continue
-
-                ai_generated_part, success, tokens_used = self.app.ai_handler.generate_name_from_image(
-                    optimized_bytes, config['custom_prompt'], config['language_mode']
-                )
+    def schedule_recompose(self, *args):
+        """★追加: 命名オプションが変わったら、入力が落ち着いてから提案名を組み立て直す。"""
+        if self._recompose_id is not None: self.app.after_cancel(self._recompose_id)
+        self._recompose_id = self.app.after(RECOMPOSE_DELAY_MS, self.recompose_names)
+
+    def recompose_names(self):
+        """保存済みの AI の名前部分から、手動で編集していない行の提案名を組み立て直す (API は呼ばない)。"""
+        self._recompose_id = None
+        if self.app.is_processing:
+            # 提案の実行中は開始時のオプションで名前を付けているため、終了後に組み立て直す
+            self._recompose_pending = True
+            return
+        self._recompose_pending = False
+        options = self._naming_options()
+        changed = self.records.recompose_names(lambda rows: self._compose_names(rows, options))
+        if not changed: return
+        self.app.app_view.local_tree.refresh()
+        Thread(target=self.app.file_index.update_names, args=(changed,), daemon=True).start()
+
+    def _compose_names(self, rows, options):
+        # 組み立て直す行の以前の名前は解放してから振り直す (自分の古い名前と衝突して連番がずれないように)
+        with self.name_allocator.batch([row.path for row in rows]) as allocate:
+            return compose_names(rows, options, allocate)
+
+    def _recompose_if_pending(self):
+        if self._recompose_pending: self.recompose_names()
 
-                if not success:
-                    if ai_generated_part == "QUOTA_EXCEEDED":
-                        self.app.after(0, self.app.show_quota_error_message, self.app.gemini_model_var.get())
-                        break 
-                    else:
-                        ai_generated_part = config['ai_fallback_name']
-                
-                if success:
-                    self.app.after(0, self.app.increment_and_update_usage, tokens_used)
-
-                new_base_name_parts = []
-                creation_dt = datetime.datetime.fromisoformat(creation_dt_iso)
-                
-                if config['add_creation_date'] and creation_dt:
-                    try: 
-                        new_base_name_parts.append(creation_dt.strftime(config['date_format']))
-                    except Exception as e: 
-                        print(f"日付フォーマットエラー: {e}")
-                
-                if config['add_folder_name'] and config['folder_name_to_add']:
-                    new_base_name_parts.append(config['folder_name_to_add'])
-                
-                if ai_generated_part: 
-                    new_base_name_parts.append(ai_generated_part)
-                
-                if not config['remove_original_name']: 
-                    new_base_name_parts.append(base_name)
-                
-                base_name_candidate = '_'.join(filter(None, new_base_name_parts))
-                if not base_name_candidate:
-                    base_name_candidate = base_name if not config['remove_original_name'] else config['ai_fallback_name']
-
-                # ★修正: 連番追加ロジック
-                final_base_name = base_name_candidate
-                if config['add_sequence_number']:
-                    name_counts[base_name_candidate] += 1
-                    count = name_counts[base_name_candidate]
-                    if count > 1:
-                        final_base_name = f"{base_name_candidate}_{count}"
-                
-                new_name = f"{final_base_name}{ext}"
-                
-                self.app.after(0, self.app.app_view.local_tree.set, item_id, "new_name", new_name)
-                self.app.after(0, self.app.app_view.local_tree.set, item_id, "ai_status", "提案済み")
-                
-                previous_file_path = file_path
-
-            if previous_file_path:
-                self.app.after(0, self._show_thumbnail_local, previous_file_path)
-
-            self.app.update_status(self.lang.get("status_suggestion_complete"))
-        finally:
-            self.app.after(0, self.app.toggle_ui_state, False)
-        
     def rename_local_files_logic(self):
         if self.app.is_processing: return
         selected_items = self.app.app_view.local_tree.selection()
         if not selected_items: return
-        
+        # ★修正: 復旧していないジャーナルは上書きせず、先に復旧を試みる (復旧できなければ新しいリネームを始めない)
+        if rename_planner.RenameJournal(self.app.config_dir).load() is not None:
+            self.recover_interrupted_renames()
+            if rename_planner.RenameJournal(self.app.config_dir).load() is not None:
+                messagebox.showwarning(self.lang.get("rename_recovery_title"), self.lang.get("rename_recovery_pending_message"))
+                return
+
         confirm_msg = self.lang.get("msgbox_confirm_rename_msg").format(count=len(selected_items))
         if not messagebox.askyesno(self.lang.get("msgbox_confirm_rename_title"), confirm_msg): return
 
+        self.app.toggle_ui_state(processing=True)
+        # ★修正: 自分のリネームを監視が外部の変更として二重に反映しないよう、一覧の更新が終わるまで監視を止める
+        self._renaming = True
+        self.stop_watcher()
         Thread(target=self._rename_files_task, args=(selected_items,), daemon=True).start()
 
     def _rename_files_task(self, selected_items):
-        self.app.update_status(self.lang.get("status_renaming_files"))
-        renamed_count = 0
-        for item_id in selected_items:
-            values = self.app.app_view.local_tree.item(item_id, 'values')
-            new_name, file_path = values[1], values[2]
-            if new_name and file_path and self.app.file_system_handler.rename_file(file_path, new_name):
-                renamed_count += 1
-        self.app.update_status(self.lang.get("status_rename_complete").format(count=renamed_count))
-        self.app.after(0, self.load_local_files_logic)
+        try:
+            self.app.update_status(self.lang.get("status_renaming_files"))
+            # ★修正: 全体の対応表から競合を調べ、連鎖・循環を安全な順序に並べてからジャーナル付きで実行する
+            requests = [(entry.path, entry.new_name) for entry in self.records.get_many(selected_items) if entry.new_name]
+            plan = rename_planner.plan_renames(requests)
+            for source, new_name, reason in plan.conflicts:
+                print(f"リネームをスキップしました ({reason}): {os.path.basename(source)} -> {new_name}")
+            done, failed = set(), []
+            if plan.steps:
+                journal = rename_planner.RenameJournal(self.app.config_dir)
+                try:
+                    journal.begin(plan.steps)
+                except OSError as e:
+                    print(f"リネームのジャーナルを作成できませんでした: {e}")
+                    self.app.update_status(self.lang.get("status_rename_failed"))
+                    return
+                started = time.monotonic()
+                def report_progress(finished, total):
+                    elapsed = max(time.monotonic() - started, 1e-6)
+                    self.app.update_status(self.lang.get("status_rename_progress").format(done=finished, total=total, rate=round(finished / elapsed)))
+                # ★追加: ネットワーク共有では1回ごとの往復が重いため、フォルダごとにまとめて並行に実行する
+                done, failed = rename_planner.execute_plan(plan.steps, journal, workers=self.app.get_rename_workers(), progress=report_progress)
+                elapsed = time.monotonic() - started
+                print(f"{len(plan.steps)} 手順のリネームを {elapsed:.1f} 秒で実行しました ({len(plan.steps) / max(elapsed, 1e-6):.0f} 件/秒)。")
+                if rename_planner.is_settled(plan.steps, done): journal.finish()
+                else: journal.close()  # 元に戻せなかった手順は次回起動時に復旧する
+            for step, error in failed:
+                print(f"リネームに失敗しました: {step.source} -> {step.target}: {error}")
+            renamed = rename_planner.completed_renames(plan, done)
+            for old_path, new_path in renamed:
+                print(f"'{os.path.basename(old_path)}' を '{os.path.basename(new_path)}' にリネームしました。")
+            # ★修正: フォルダ全体を読み直さず、インデックスと該当する行だけを更新する
+            self.app.file_index.rename(renamed, RENAMED_STATUS)
+            skipped = len(requests) - len(renamed) - sum(1 for path, name in requests if name == os.path.basename(path))
+            if skipped: self.app.update_status(self.lang.get("status_rename_partial").format(count=len(renamed), skipped=skipped))
+            else: self.app.update_status(self.lang.get("status_rename_complete").format(count=len(renamed)))
+            self.app.ui.call(self._apply_renames, renamed)
+        finally:
+            # ★修正: 実行中は他のリネーム・提案・再読み込みを受け付けない (ジャーナルを上書きしないように)
+            self.app.ui.call(self._finish_rename)
+
+    def _finish_rename(self):
+        # _apply_renames の後に呼ばれるため、監視は更新済みの一覧から新しいトークンで再開する
+        self._renaming = False
+        self.app.toggle_ui_state(False)
+        self.start_watcher()
+
+    def recover_interrupted_renames(self):
+        """前回のリネームが途中で終了していた場合に、続きを実行するか元に戻す (起動時にメインスレッドから呼ぶ)。"""
+        journal = rename_planner.RenameJournal(self.app.config_dir)
+        interrupted = journal.load()
+        if interrupted is None: return
+        steps, done = interrupted
+        if rename_planner.is_settled(steps, done):
+            journal.finish()
+            return
+        finish = messagebox.askyesno(self.lang.get("rename_recovery_title"), self.lang.get("rename_recovery_message").format(done=len(done), total=len(steps)))
+        journal.resume()
+        if finish:
+            done, failed = rename_planner.execute_plan(steps, journal, done, workers=self.app.get_rename_workers())
+            for step, error in failed:
+                print(f"リネームに失敗しました: {step.source} -> {step.target}: {error}")
+        else:
+            rename_planner.rollback([(index, steps[index]) for index in sorted(done)], journal, done)
+        if rename_planner.is_settled(steps, done):
+            journal.finish()
+            self.app.update_status(self.lang.get("status_rename_recovered"))
+        else:
+            journal.close()
+            self.app.update_status(self.lang.get("status_rename_recovery_failed"))
+
+    def _apply_renames(self, renamed):
+        # 入れ替えや連鎖もあるため、1行ずつではなくまとめて置き換える
+        entries = {entry.path: entry for entry in self.records.get_many([old_path for old_path, _ in renamed])}
+        replacements = [(old_path, FileEntry(new_path, "", RENAMED_STATUS, entries[old_path].created, entries[old_path].subfolder))
+                        for old_path, new_path in renamed if old_path in entries]
+        _, removed = self.records.replace_many(replacements)
+        self.app.app_view.local_tree.rows_removed(removed)
+        self.app.app_view.local_tree.keys_replaced({old_path: entry.path for old_path, entry in replacements})
+        self.name_allocator.forget({os.path.dirname(path) for pair in renamed for path in pair})
 
     def authenticate_google_drive_logic(self): messagebox.showinfo("Not Implemented", "This feature is currently under development.")
     
@@ -6,7 +6,8 @@ import typing
 import tkinter as tk
 from tkinter import ttk, scrolledtext
 from tkinterdnd2 import DND_FILES
-from utils import ToolTip, ContextMenu
+from ui_utils import ToolTip, ContextMenu
+from virtual_list import VirtualFileList
 
 if typing.TYPE_CHECKING:
     from main_app import FileRenamerApp
@@ -46,6 +47,13 @@ class AppView:
         self.api_key_help_label = None
         self.date_format_entry = None
         self.folder_name_to_add_entry = None
+        self.max_concurrent_requests_spinbox = None
+        self.similarity_threshold_spinbox = None
+        self.batch_size_spinbox = None
+        self.recursive_scan_check = None
+        self.scan_max_depth_spinbox = None
+        self.include_patterns_entry = None
+        self.exclude_patterns_entry = None
 
     def create_local_file_tab(self, parent_frame):
         parent_frame.rowconfigure(0, weight=0)
@@ -84,6 +92,29 @@ class AppView:
         self.file_types_entry.grid(row=0, column=1, sticky='ew')
         ContextMenu(self.file_types_entry)
 
+        # ★追加: サブフォルダの再帰走査とパターン指定
+        recursive_row = ttk.Frame(filter_frame)
+        recursive_row.grid(row=1, column=0, columnspan=2, sticky='ew', pady=(3,0))
+        self.recursive_scan_check = ttk.Checkbutton(recursive_row, text=self.lang.get("recursive_scan"), variable=self.app.recursive_scan_var)
+        self.recursive_scan_check.pack(side='left')
+        ttk.Label(recursive_row, text=self.lang.get("scan_max_depth")).pack(side='left', padx=(10,5))
+        self.scan_max_depth_spinbox = ttk.Spinbox(recursive_row, from_=0, to=64, textvariable=self.app.scan_max_depth_var, width=4)
+        self.scan_max_depth_spinbox.pack(side='left')
+        ToolTip(self.scan_max_depth_spinbox, self.lang.get("scan_max_depth_tooltip"))
+        watch_check = ttk.Checkbutton(recursive_row, text=self.lang.get("watch_folder"), variable=self.app.watch_folder_var, command=self.app.app_logic.toggle_watcher)
+        watch_check.pack(side='left', padx=(10,0))
+        ToolTip(watch_check, self.lang.get("watch_folder_tooltip"))
+        ttk.Label(filter_frame, text=self.lang.get("include_patterns")).grid(row=2, column=0, padx=(0,5), pady=(3,0), sticky='w')
+        self.include_patterns_entry = ttk.Entry(filter_frame, textvariable=self.app.include_patterns_var)
+        self.include_patterns_entry.grid(row=2, column=1, pady=(3,0), sticky='ew')
+        ContextMenu(self.include_patterns_entry)
+        ToolTip(self.include_patterns_entry, self.lang.get("scan_patterns_tooltip"))
+        ttk.Label(filter_frame, text=self.lang.get("exclude_patterns")).grid(row=3, column=0, padx=(0,5), pady=(3,0), sticky='w')
+        self.exclude_patterns_entry = ttk.Entry(filter_frame, textvariable=self.app.exclude_patterns_var)
+        self.exclude_patterns_entry.grid(row=3, column=1, pady=(3,0), sticky='ew')
+        ContextMenu(self.exclude_patterns_entry)
+        ToolTip(self.exclude_patterns_entry, self.lang.get("scan_patterns_tooltip"))
+
         # ★修正: コンパクトなボタンスタイルを定義
         self.app.style.configure('Info.TButton', foreground='white', background='#17a2b8', padding=(5, 1))
         self.app.style.configure('Compact.TButton', padding=(5, 1))
@@ -144,24 +175,23 @@ class AppView:
         tree_frame.columnconfigure(0, weight=1)
         tree_frame.rowconfigure(0, weight=1)
 
-        self.local_tree = ttk.Treeview(tree_frame, columns=("old_name", "new_name", "path", "ai_status", "creation_time_display", "creation_time_obj"), show="headings")
+        # ★修正: 画面に見えている行だけを Treeview に作る仮想リスト。行データは AppLogic の records から読む
+        self.local_tree = VirtualFileList(
+            tree_frame, model=self.app.app_logic.records,
+            display_columns=("old_name", "new_name", "ai_status", "creation_time_display", "subfolder"))
         self.local_tree.grid(row=0, column=0, sticky='nsew')
         
         self.local_tree.heading("old_name", text=self.lang.get("col_current_name"))
         self.local_tree.heading("new_name", text=self.lang.get("col_new_name"))
         self.local_tree.heading("ai_status", text=self.lang.get("col_ai_status"))
         self.local_tree.heading("creation_time_display", text=self.lang.get("col_creation_date"))
+        self.local_tree.heading("subfolder", text=self.lang.get("col_subfolder"))
         
         self.local_tree.column("old_name", width=200, stretch=True)
         self.local_tree.column("new_name", width=350, stretch=True)
-        self.local_tree.column("path", width=0, stretch=False)
         self.local_tree.column("ai_status", width=100, stretch=False)
         self.local_tree.column("creation_time_display", width=120, stretch=False)
-        self.local_tree.column("creation_time_obj", width=0, stretch=False)
-
-        local_scroll = ttk.Scrollbar(tree_frame, orient="vertical", command=self.local_tree.yview)
-        local_scroll.grid(row=0, column=1, sticky='ns')
-        self.local_tree.configure(yscrollcommand=local_scroll.set)
+        self.local_tree.column("subfolder", width=150, stretch=False)
 
     def create_google_drive_tab(self, parent_frame):
         auth_frame = ttk.Frame(parent_frame)
@@ -240,6 +270,21 @@ class AppView:
         self.api_key_help_label = ttk.Label(api_key_entry_frame, text=" (?)", foreground="blue", cursor="hand2")
         self.api_key_help_label.pack(side='left')
         ToolTip(self.api_key_help_label, self.lang.get("api_key_tooltip"))
+
+        performance_frame = ttk.Frame(ai_inner_frame)
+        performance_frame.pack(fill='x', pady=(5, 0))
+        ttk.Label(performance_frame, text=self.lang.get("max_concurrent_requests")).pack(side='left', padx=(0,5))
+        self.max_concurrent_requests_spinbox = ttk.Spinbox(performance_frame, from_=1, to=16, textvariable=self.app.max_concurrent_requests_var, width=5)
+        self.max_concurrent_requests_spinbox.pack(side='left')
+        ToolTip(self.max_concurrent_requests_spinbox, self.lang.get("max_concurrent_requests_tooltip"))
+        ttk.Label(performance_frame, text=self.lang.get("similarity_threshold")).pack(side='left', padx=(15,5))
+        self.similarity_threshold_spinbox = ttk.Spinbox(performance_frame, from_=0, to=32, textvariable=self.app.similarity_threshold_var, width=5)
+        self.similarity_threshold_spinbox.pack(side='left')
+        ToolTip(self.similarity_threshold_spinbox, self.lang.get("similarity_threshold_tooltip"))
+        ttk.Label(performance_frame, text=self.lang.get("batch_size")).pack(side='left', padx=(15,5))
+        self.batch_size_spinbox = ttk.Spinbox(performance_frame, from_=1, to=16, textvariable=self.app.batch_size_var, width=5)
+        self.batch_size_spinbox.pack(side='left')
+        ToolTip(self.batch_size_spinbox, self.lang.get("batch_size_tooltip"))
         
 
         # --- プロンプトセクション ---
@@ -295,7 +340,10 @@ class AppView:
             self.deselect_all_button, self.suggest_button, self.rename_button,
             self.clear_list_button, self.about_button, self.update_button,
             self.donate_button, self.add_prompt_button, self.delete_prompt_button,
-            self.prompt_idea_button, self.gdrive_auth_button
+            self.prompt_idea_button, self.gdrive_auth_button,
+            self.max_concurrent_requests_spinbox, self.similarity_threshold_spinbox,
+            self.batch_size_spinbox, self.recursive_scan_check, self.scan_max_depth_spinbox,
+            self.include_patterns_entry, self.exclude_patterns_entry
         ]
         for widget in widgets:
             if widget:
@@ -0,0 +1,129 @@
+# ==============================================================================
+# file: file_index.py (フォルダごとのファイル一覧の永続インデックス)
+# ==============================================================================
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+# ai_part: AI が返した名前の部分 (オプション変更時に API を呼ばずに名前を組み立て直すため) / manual: 提案名を手動で編集した
+FileRecord = namedtuple("FileRecord", "size mtime_ns inode created subfolder ai_status new_name ai_part manual", defaults=("", False))
+RECORD_COLUMNS = "size, mtime_ns, inode, created, subfolder, ai_status, new_name, ai_part, manual"
+INSERT_FILE = f"INSERT OR REPLACE INTO files (folder, path, {RECORD_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+class FileIndex:
+    """
+    走査したフォルダごとに、各ファイルのサイズ・更新日時・inode・作成日時と AI の提案状態を保存する。
+    再走査では変化のあったファイルだけを更新し、大きなフォルダを開き直したときも前回の一覧と提案をすぐに表示できる。
+    """
+    def __init__(self, config_dir, filename="file_index.sqlite3"):
+        self.db_path = os.path.join(config_dir, filename)
+        self._lock = threading.Lock()
+        self._conn = None
+        try:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS folders (folder TEXT PRIMARY KEY, signature TEXT NOT NULL, scanned_at REAL NOT NULL)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS files (folder TEXT NOT NULL, path TEXT NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL, created REAL NOT NULL, subfolder TEXT NOT NULL, ai_status TEXT NOT NULL, new_name TEXT NOT NULL, ai_part TEXT NOT NULL DEFAULT '', manual INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (folder, path))")
+            # ★追加: 以前のバージョンで作成したインデックスに列を追加する
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(files)")}
+            if "ai_part" not in columns: self._conn.execute("ALTER TABLE files ADD COLUMN ai_part TEXT NOT NULL DEFAULT ''")
+            if "manual" not in columns: self._conn.execute("ALTER TABLE files ADD COLUMN manual INTEGER NOT NULL DEFAULT 0")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_files_path ON files (path)")
+            self._conn.commit()
+        except sqlite3.Error as e:
+            print(f"ファイルインデックスを開けませんでした: {e}")
+            self._conn = None
+
+    @staticmethod
+    def make_signature(extensions, scan_options):
+        """走査条件が変わったら前回の一覧をそのまま表示しないよう、条件を文字列にまとめる。"""
+        return json.dumps({"extensions": sorted(extensions), **scan_options}, sort_keys=True, ensure_ascii=False)
+
+    def _execute(self, func, default=None):
+        if self._conn is None: return default
+        with self._lock:
+            try:
+                result = func(self._conn)
+                self._conn.commit()
+                return result
+            except sqlite3.Error as e:
+                print(f"ファイルインデックスの操作エラー: {e}")
+                return default
+
+    def load(self, folder):
+        """(前回の走査条件, {path: FileRecord}) を返す。未登録のフォルダなら (None, {})。"""
+        def _load(conn):
+            row = conn.execute("SELECT signature FROM folders WHERE folder = ?", (folder,)).fetchone()
+            records = conn.execute(f"SELECT path, {RECORD_COLUMNS} FROM files WHERE folder = ? ORDER BY path", (folder,)).fetchall()
+            return (row[0] if row else None), {path: FileRecord(*rest) for path, *rest in records}
+        return self._execute(_load, (None, {}))
+
+    def upsert(self, folder, records):
+        """records は (path, FileRecord) のリスト。"""
+        if not records: return
+        self._execute(lambda conn: conn.executemany(INSERT_FILE, [(folder, path, *record) for path, record in records]))
+
+    def finish_scan(self, folder, signature, removed_paths):
+        """走査が最後まで終わったときに、見つからなかったファイルを削除して走査条件を記録する。"""
+        def _finish(conn):
+            conn.executemany("DELETE FROM files WHERE folder = ? AND path = ?", [(folder, path) for path in removed_paths])
+            conn.execute("INSERT OR REPLACE INTO folders (folder, signature, scanned_at) VALUES (?, ?, ?)", (folder, signature, time.time()))
+        self._execute(_finish)
+
+    def get(self, folder, path):
+        row = self._execute(lambda conn: conn.execute(f"SELECT {RECORD_COLUMNS} FROM files WHERE folder = ? AND path = ?", (folder, path)).fetchone())
+        return FileRecord(*row) if row else None
+
+    def load_prefix(self, folder, directory):
+        """directory 配下に登録されている (path, FileRecord) のリストを返す。"""
+        prefix = directory + os.sep
+        rows = self._execute(lambda conn: conn.execute(f"SELECT path, {RECORD_COLUMNS} FROM files WHERE folder = ? AND substr(path, 1, ?) = ?", (folder, len(prefix), prefix)).fetchall(), [])
+        return [(path, FileRecord(*rest)) for path, *rest in rows]
+
+    def move(self, folder, moves):
+        """moves は (旧パス, 新パス, FileRecord) のリスト。外部でのリネームを提案状態ごと引き継ぐ。"""
+        if not moves: return
+        def _move(conn):
+            conn.executemany("DELETE FROM files WHERE folder = ? AND path = ?", [(folder, old_path) for old_path, _, _ in moves])
+            conn.executemany(INSERT_FILE, [(folder, new_path, *record) for _, new_path, record in moves])
+        self._execute(_move)
+
+    def remove(self, folder, paths):
+        if not paths: return
+        self._execute(lambda conn: conn.executemany("DELETE FROM files WHERE folder = ? AND path = ?", [(folder, path) for path in paths]))
+
+    def update_suggestion(self, path, new_name, ai_status=None, ai_part=None, manual=False):
+        """提案名を保存する。ai_status / ai_part が None の列は変更しない。"""
+        assignments, values = ["new_name = ?", "manual = ?"], [new_name, int(manual)]
+        if ai_status is not None: assignments.append("ai_status = ?"); values.append(ai_status)
+        if ai_part is not None: assignments.append("ai_part = ?"); values.append(ai_part)
+        self._execute(lambda conn: conn.execute(f"UPDATE files SET {', '.join(assignments)} WHERE path = ?", (*values, path)))
+
+    def update_names(self, names):
+        """names は (path, new_name) のリスト。オプション変更で組み立て直した提案名をまとめて保存する。"""
+        if not names: return
+        self._execute(lambda conn: conn.executemany("UPDATE files SET new_name = ? WHERE path = ?", [(new_name, path) for path, new_name in names]))
+
+    def rename(self, renamed, ai_status):
+        """renamed は (旧パス, 新パス) のリスト。リネーム後は提案名と AI の名前部分を空にし、ai_status を付け替える。"""
+        if not renamed: return
+        def _rename(conn):
+            # 入れ替え (A→B, B→A) で行が上書きされないよう、先に全行を読み出してから入れ直す
+            rows = []
+            for old_path, new_path in renamed:
+                rows.extend((folder, new_path, size, mtime_ns, inode, created, subfolder, ai_status, "", "", 0) for folder, size, mtime_ns, inode, created, subfolder in
+                            conn.execute("SELECT folder, size, mtime_ns, inode, created, subfolder FROM files WHERE path = ?", (old_path,)))
+            conn.executemany("DELETE FROM files WHERE path = ?", [(old_path,) for old_path, _ in renamed])
+            conn.executemany(INSERT_FILE, rows)
+        self._execute(_rename)
+
+    def close(self):
+        if self._conn is None: return
+        with self._lock:
+            self._conn.close()
+            self._conn = None
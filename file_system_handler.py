@@ -1,21 +1,117 @@
 from pathlib import Path
 import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from fnmatch import fnmatch
+
+# 再帰走査でフォルダを同時に列挙するスレッド数
+SCAN_WORKERS = 8
+
+
+def _matches_any(path, root, patterns):
+    if not patterns: return False
+    name = os.path.basename(path)
+    relative_path = os.path.relpath(path, root).replace(os.sep, '/')
+    return any(fnmatch(name, pattern) or fnmatch(relative_path, pattern) for pattern in patterns)
+
+
 class FileSystemHandler:
     def list_files(self, directory_path='.', file_types=None):
         path = Path(directory_path)
         if not path.is_dir(): print(f"エラー: ディレクトリ '{directory_path}' が見つかりません。"); return []
-        files = [item for item in path.iterdir() if item.is_file() and (not file_types or item.suffix.lower() in [ft.lower() for ft in file_types])]
+        type_set = {ft.lower() for ft in file_types} if file_types else None
+        files = [item for item in path.iterdir() if item.is_file() and (not type_set or item.suffix.lower() in type_set)]
         return files
 
-    def rename_file(self, old_path_str, new_name):
-        old_path = Path(old_path_str)
-        if not old_path.exists(): print(f"エラー: ファイル '{old_path_str}' が見つかりません。"); return False
-        new_path = old_path.parent / new_name
-        try:
-            if old_path.name == new_name: print(f"ファイル名は既に '{new_name}' です。スキップしました。"); return True
-            old_path.rename(new_path); print(f"'{old_path.name}' を '{new_name}' にリネームしました。"); return True
-        except FileExistsError: print(f"エラー: 既に同名のファイル '{new_path}' が存在します。"); return False
-        except OSError as e: print(f"エラーが発生しました: {e}"); return False
+    def scan_files(self, directory_path, file_types=None, batch_size=500, cancel_event=None,
+                   recursive=False, max_depth=0, include_patterns=None, exclude_patterns=None):
+        """
+        os.scandir で走査し、対象ファイルの DirEntry を batch_size 件ずつのリストで順次返す。
+        recursive=True の場合はサブフォルダも走査する。max_depth はルートから下る階層の上限 (0 は無制限)。
+        include_patterns / exclude_patterns は glob パターンのリストで、ファイル名かルートからの相対パスに照合する。
+        除外パターンに一致したフォルダは配下ごと読み飛ばす。
+        """
+        type_set = {ft.lower() for ft in file_types} if file_types else None
+        root = os.path.abspath(directory_path)
+        filters = (type_set, include_patterns or [], exclude_patterns or [])
+        if not recursive:
+            batch = []
+            for entry in self._iter_dir(root, root, filters, cancel_event):
+                batch.append(entry)
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+            if batch: yield batch
+            return
+        yield from self._walk_parallel(root, filters, batch_size, cancel_event, max_depth)
+
+    def make_filter(self, directory_path, file_types=None, recursive=False, max_depth=0, include_patterns=None, exclude_patterns=None):
+        """scan_files と同じ条件で、パスが走査対象に入るかを判定する関数 filter(path, is_dir) を返す。"""
+        type_set = {ft.lower() for ft in file_types} if file_types else None
+        root = os.path.abspath(directory_path)
+
+        def path_filter(path, is_dir=False):
+            relative_path = os.path.relpath(path, root)
+            if relative_path == os.curdir or relative_path.startswith(os.pardir): return False
+            parts = relative_path.split(os.sep)
+            folders = parts if is_dir else parts[:-1]
+            if folders and (not recursive or (max_depth > 0 and len(folders) > max_depth)): return False
+            # 途中のフォルダが除外されていれば、その配下も対象外
+            for i in range(1, len(folders) + 1):
+                if _matches_any(os.path.join(root, *folders[:i]), root, exclude_patterns): return False
+            if is_dir: return True
+            if type_set and os.path.splitext(path)[1].lower() not in type_set: return False
+            if include_patterns and not _matches_any(path, root, include_patterns): return False
+            return not _matches_any(path, root, exclude_patterns)
+        return path_filter
+
+    def _walk_parallel(self, root, filters, batch_size, cancel_event, max_depth):
+        # ネットワークドライブではフォルダごとの待ち時間が長いため、フォルダ単位でスレッドプールに並べて列挙する
+        def list_dir(path, depth):
+            subdirs = [] if max_depth <= 0 or depth < max_depth else None
+            try:
+                files = list(self._iter_dir(path, root, filters, cancel_event, subdirs))
+            except OSError as e:
+                if depth == 0: raise
+                print(f"フォルダを読み込めませんでした: {path} -> {e}")
+                return [], [], depth
+            for entry in files:
+                try: entry.stat()  # stat もワーカー側で済ませ、結果を DirEntry にキャッシュさせる
+                except OSError: pass
+            return files, subdirs or [], depth
+
+        batch = []
+        with ThreadPoolExecutor(max_workers=SCAN_WORKERS, thread_name_prefix="scan") as pool:
+            pending = {pool.submit(list_dir, root, 0)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirs, depth = future.result()
+                    if cancel_event is not None and cancel_event.is_set():
+                        for f in pending: f.cancel()
+                        return
+                    pending.update(pool.submit(list_dir, subdir, depth + 1) for subdir in subdirs)
+                    batch.extend(files)
+                    while len(batch) >= batch_size:
+                        yield batch[:batch_size]
+                        batch = batch[batch_size:]
+        if batch: yield batch
+
+    def _iter_dir(self, path, root, filters, cancel_event, subdirs=None):
+        """1つのフォルダを列挙して対象ファイルを返す。subdirs にリストを渡すと、除外されていないサブフォルダのパスを追加する。"""
+        type_set, include_patterns, exclude_patterns = filters
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if cancel_event is not None and cancel_event.is_set(): return
+                try:
+                    if subdirs is not None and entry.is_dir(follow_symlinks=False):
+                        if not _matches_any(entry.path, root, exclude_patterns): subdirs.append(entry.path)
+                        continue
+                    if type_set and os.path.splitext(entry.name)[1].lower() not in type_set: continue
+                    if not entry.is_file(): continue
+                except OSError: continue
+                if include_patterns and not _matches_any(entry.path, root, include_patterns): continue
+                if exclude_patterns and _matches_any(entry.path, root, exclude_patterns): continue
+                yield entry
 
     def read_file_content(self, file_path_str, mode='rb'):
         file_path = Path(file_path_str)
@@ -0,0 +1,264 @@
+# ==============================================================================
+# file: folder_watcher.py (開いているフォルダの変更監視)
+# ==============================================================================
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+
+# renames: (旧パス, 新パス, フォルダかどうか) のリスト (発生順)
+# changed: 追加・更新・削除された可能性のあるファイルパスの集合。反映する側で存在と条件を確認する
+# removed_dirs: 削除または監視範囲外へ移動したフォルダ
+# resync: イベントを取りこぼしたため、フォルダ全体を読み直す必要がある
+WatchDelta = namedtuple("WatchDelta", "renames changed removed_dirs resync")
+
+DEBOUNCE_SECONDS = 0.5
+MAX_DELAY_SECONDS = 2.0
+POLL_INTERVAL_SECONDS = 2.0
+
+# <sys/inotify.h>
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+WATCH_MASK = IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class _DeltaBuffer:
+    """イベントをまとめ、一定時間イベントが途切れたら1つの WatchDelta として取り出す。"""
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.renames, self.changed, self.removed_dirs = [], set(), []
+        self.resync = False
+        self.first_event = self.last_event = None
+
+    def touch(self):
+        now = time.monotonic()
+        self.first_event = self.first_event or now
+        self.last_event = now
+
+    def __bool__(self):
+        return bool(self.renames or self.changed or self.removed_dirs or self.resync)
+
+    def is_due(self):
+        now = time.monotonic()
+        return bool(self) and (now - self.last_event >= DEBOUNCE_SECONDS or now - self.first_event >= MAX_DELAY_SECONDS)
+
+    def take(self):
+        delta = WatchDelta(self.renames, self.changed, self.removed_dirs, self.resync)
+        self.clear()
+        return delta
+
+
+class InotifyWatcher(threading.Thread):
+    """Linux の inotify を ctypes で使い、フォルダ (再帰時は配下のフォルダも) の変更を監視する。"""
+    def __init__(self, root, path_filter, recursive, on_changes):
+        super().__init__(daemon=True, name="folder-watcher")
+        self.root = root
+        self.path_filter = path_filter
+        self.recursive = recursive
+        self.on_changes = on_changes
+        self._stop_event = threading.Event()
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._paths = {}  # wd -> フォルダのパス
+        self._buffer = _DeltaBuffer()
+        try:
+            self._add_watch(root)
+            if recursive: self._watch_tree(root, collect_files=False)
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _add_watch(self, path):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f"inotify_add_watch failed: {os.strerror(errno)}", path)
+        self._paths[wd] = path
+
+    def _watch_tree(self, directory, collect_files=True):
+        """directory 配下の対象フォルダに監視を追加し、collect_files なら中のファイルを changed に加える。"""
+        for dirpath, dirnames, filenames in os.walk(directory):
+            dirnames[:] = [d for d in dirnames if self.path_filter(os.path.join(dirpath, d), True)]
+            for dirname in dirnames:
+                try: self._add_watch(os.path.join(dirpath, dirname))
+                except OSError as e: print(f"フォルダの監視を追加できませんでした: {e}")
+            if collect_files:
+                self._buffer.changed.update(os.path.join(dirpath, f) for f in filenames)
+
+    def _forget_tree(self, directory):
+        prefix = directory + os.sep
+        for wd, path in list(self._paths.items()):
+            if path == directory or path.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._paths[wd]
+
+    def _move_tree(self, old_dir, new_dir):
+        prefix = old_dir + os.sep
+        for wd, path in self._paths.items():
+            if path == old_dir or path.startswith(prefix):
+                self._paths[wd] = new_dir + path[len(old_dir):]
+
+    def run(self):
+        pending_moves = {}  # cookie -> (旧パス, フォルダかどうか)
+        try:
+            while not self._stop_event.is_set():
+                readable, _, _ = select.select([self._fd], [], [], DEBOUNCE_SECONDS / 2)
+                if readable:
+                    try: data = os.read(self._fd, 64 * 1024)
+                    except BlockingIOError: data = b""
+                    self._handle_events(data, pending_moves)
+                else:
+                    # 対になる IN_MOVED_TO が来なかった移動は、監視範囲外への移動 (=削除) とみなす
+                    for old_path, is_dir in pending_moves.values():
+                        self._removed(old_path, is_dir)
+                    pending_moves.clear()
+                if not pending_moves and self._buffer.is_due():
+                    self.on_changes(self._buffer.take())
+        except Exception as e:
+            print(f"フォルダ監視エラー: {e}")
+        finally:
+            os.close(self._fd)
+
+    def _removed(self, path, is_dir):
+        if is_dir:
+            self._forget_tree(path)
+            self._buffer.removed_dirs.append(path)
+        else:
+            self._buffer.changed.add(path)
+
+    def _added_dir(self, path):
+        if not self.recursive or not self.path_filter(path, True): return
+        try: self._add_watch(path)
+        except OSError as e: print(f"フォルダの監視を追加できませんでした: {e}"); return
+        self._watch_tree(path)
+
+    def _handle_events(self, data, pending_moves):
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            name = os.fsdecode(data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0"))
+            offset += EVENT_HEADER.size + length
+            self._buffer.touch()
+            if mask & IN_Q_OVERFLOW:
+                self._buffer.resync = True
+                continue
+            directory = self._paths.get(wd)
+            if mask & IN_IGNORED:
+                self._paths.pop(wd, None)
+                continue
+            if directory is None: continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                if directory == self.root: self._buffer.resync = True
+                continue
+            path = os.path.join(directory, name)
+            is_dir = bool(mask & IN_ISDIR)
+            if mask & IN_MOVED_FROM:
+                pending_moves[cookie] = (path, is_dir)
+            elif mask & IN_MOVED_TO:
+                moved = pending_moves.pop(cookie, None)
+                if moved is None:
+                    if is_dir: self._added_dir(path)
+                    else: self._buffer.changed.add(path)
+                else:
+                    self._buffer.renames.append((moved[0], path, is_dir))
+                    if is_dir: self._move_tree(moved[0], path)
+                    else: self._buffer.changed.add(path)
+            elif mask & IN_DELETE:
+                self._removed(path, is_dir)
+            elif mask & IN_CREATE and is_dir:
+                self._added_dir(path)
+            elif not is_dir:
+                self._buffer.changed.add(path)
+
+
+class PollingWatcher(threading.Thread):
+    """inotify が使えない環境向けに、一定間隔でフォルダを走査して前回との差分を通知する。"""
+    def __init__(self, snapshot, on_changes):
+        super().__init__(daemon=True, name="folder-watcher")
+        self.snapshot = snapshot
+        self.on_changes = on_changes
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        try:
+            previous = self.snapshot()
+            interval = POLL_INTERVAL_SECONDS
+            while not self._stop_event.wait(interval):
+                started = time.monotonic()
+                current = self.snapshot()
+                # 大きなフォルダで走査が重い場合は、その分だけ間隔を空ける
+                interval = max(POLL_INTERVAL_SECONDS, (time.monotonic() - started) * 5)
+                if self._stop_event.is_set(): return
+                delta = self._diff(previous, current)
+                previous = current
+                if delta: self.on_changes(delta)
+        except Exception as e:
+            print(f"フォルダ監視エラー: {e}")
+
+    @staticmethod
+    def _diff(previous, current):
+        removed = previous.keys() - current.keys()
+        added = current.keys() - previous.keys()
+        modified = {path for path in previous.keys() & current.keys() if previous[path] != current[path]}
+        # 同じ inode・サイズのファイルが消えて現れたらリネームとみなす。
+        # ★修正: inode を返さない環境 (Windows の scandir では 0) では、サイズと更新日時で対応付ける。
+        # 消えた側・現れた側のどちらでも同じ鍵が1件だけの場合にリネームとし、それ以外は削除と追加として扱う
+        removed_keys = {path: _rename_key(previous[path]) for path in removed}
+        added_keys = {path: _rename_key(current[path]) for path in added}
+        removed_counts, added_counts = Counter(removed_keys.values()), Counter(added_keys.values())
+        added_by_key = {key: path for path, key in added_keys.items() if added_counts[key] == 1}
+        renames = [(old_path, added_by_key[key], False) for old_path, key in sorted(removed_keys.items())
+                   if removed_counts[key] == 1 and key in added_by_key]
+        if not (removed or added or modified): return None
+        return WatchDelta(renames, removed | added | modified, [], False)
+
+
+def _rename_key(state):
+    size, mtime_ns, inode = state
+    return (inode, size) if inode else (None, size, mtime_ns)
+
+
+def start_watcher(root, path_filter, recursive, snapshot, on_changes):
+    """
+    フォルダの監視を開始して、stop() で止められるスレッドを返す。
+    Linux では inotify を使い、使えない場合や他の OS では snapshot() を定期的に比較するポーリングにする。
+    snapshot() は {パス: (サイズ, 更新日時ns, inode)} を返す関数。on_changes(delta) は監視スレッドから呼ばれる。
+    """
+    if sys.platform.startswith("linux"):
+        try:
+            watcher = InotifyWatcher(root, path_filter, recursive, on_changes)
+            watcher.start()
+            return watcher
+        except (OSError, AttributeError) as e:
+            print(f"inotify を使えないため、ポーリングで監視します: {e}")
+    watcher = PollingWatcher(snapshot, on_changes)
+    watcher.start()
+    return watcher
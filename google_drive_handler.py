@@ -3,10 +3,20 @@
 # ==============================================================================
 import re
 import io
-import google.generativeai as genai
-from google.api_core import exceptions
+import json
 from PIL import Image
 
+# ★追加: 画面版とコマンドライン版で共有するモデル一覧と、モデルごとの1日 (RPD)・1分 (RPM) あたりのリクエスト上限
+GEMINI_MODELS = ["gemini-2.5-flash-lite", "gemini-2.0-flash-lite", "gemini-1.5-flash-latest", "gemini-1.5-pro-latest", "gemini-pro"]
+GEMINI_RPD_LIMITS = {"gemini-2.5-flash-lite": 200, "gemini-2.0-flash-lite": 200, "gemini-1.5-flash-latest": 200, "gemini-1.5-pro-latest": 20, "gemini-pro": 100}
+GEMINI_RPM_LIMITS = {"gemini-2.5-flash-lite": 15, "gemini-2.0-flash-lite": 30, "gemini-1.5-flash-latest": 15, "gemini-1.5-pro-latest": 2, "gemini-pro": 15}
+
+
+def _is_resource_exhausted(error):
+    # ★修正: google.api_core は読み込みに時間がかかるため、API を呼んだ後に初めて読み込む
+    from google.api_core import exceptions
+    return isinstance(error, exceptions.ResourceExhausted)
+
 class GoogleAIApiHandler:
     def __init__(self, gemini_api_key, model_name="gemini-2.0-flash-lite"):
         self.api_key = gemini_api_key
@@ -16,6 +26,8 @@ class GoogleAIApiHandler:
 
     def _configure_api(self):
         try:
+            # ★修正: google.generativeai は起動時ではなく、クライアントを作るときに読み込む
+            import google.generativeai as genai
             genai.configure(api_key=self.api_key)
             self.generative_model = genai.GenerativeModel(self.model_name)
         except Exception as e:
@@ -28,36 +40,110 @@ class GoogleAIApiHandler:
         prompt = self._build_prompt(custom_prompt, language_mode)
         
         try:
-            img = Image.open(io.BytesIO(image_bytes))
             print(f"Gemini APIに画像とプロンプトを送信中...")
-            response = self.generative_model.generate_content([prompt, img])
+            response = self.generative_model.generate_content([prompt, self._image_part(image_bytes)])
             
             if response.parts:
-                generated_text = response.text.strip()
-                # レスポンスのクリーニング処理を強化
-                generated_text = re.sub(r"```(python|text|json|)\n|```", "", generated_text)
-                generated_text = generated_text.replace(" ", "_").replace("　", "_").replace("\n", "_")
-
-                # 万が一、モデルがまだ余計なことを言ってきた場合への対策
-                lines = generated_text.split('_')
-                if len(lines) > 1 and ("提案します" in lines[0] or "suggest" in lines[0].lower()):
-                    generated_text = "_".join(lines[1:])
-
-                tokens_used = 0
-                if hasattr(response, 'usage_metadata') and hasattr(response.usage_metadata, 'total_token_count'):
-                    tokens_used = response.usage_metadata.total_token_count
-                
+                generated_text = self._clean_generated_text(response.text)
+                tokens_used = self._get_tokens_used(response)
                 print(f"Geminiからの提案名: {generated_text}")
                 return generated_text, True, tokens_used
             else:
                 return "No content generated", False, 0
-        except exceptions.ResourceExhausted as e:
-            print(f"Quota exceeded for model {self.model_name}: {e}")
-            return "QUOTA_EXCEEDED", False, 0
         except Exception as e:
+            if _is_resource_exhausted(e):
+                print(f"Quota exceeded for model {self.model_name}: {e}")
+                return "QUOTA_EXCEEDED", False, 0
             print(f"Error during API call: {e}")
             return f"API_ERROR: {e}", False, 0
 
+    def generate_names_from_images(self, images_bytes, custom_prompt, language_mode):
+        """
+        複数の画像を1回のリクエストで送り、画像ごとのファイル名をリストで返す。
+        戻り値は (names, success, tokens_used)。names は images_bytes と同じ長さで、
+        対応付けできなかった画像は None になる。
+        """
+        if not self.generative_model:
+            return "API not configured", False, 0
+
+        count = len(images_bytes)
+        contents = [self._build_batch_prompt(custom_prompt, language_mode, count)]
+        try:
+            for index, image_bytes in enumerate(images_bytes, start=1):
+                contents.append(f"Image {index}:")
+                contents.append(self._image_part(image_bytes))
+            print(f"Gemini APIに{count}枚の画像とプロンプトをまとめて送信中...")
+            response = self.generative_model.generate_content(contents)
+
+            if not response.parts:
+                return "No content generated", False, 0
+            names = self._parse_batch_response(response.text, count)
+            tokens_used = self._get_tokens_used(response)
+            print(f"Geminiからの提案名 ({sum(1 for n in names if n)}/{count}件): {names}")
+            return names, any(names), tokens_used
+        except Exception as e:
+            if _is_resource_exhausted(e):
+                print(f"Quota exceeded for model {self.model_name}: {e}")
+                return "QUOTA_EXCEEDED", False, 0
+            print(f"Error during API call: {e}")
+            return f"API_ERROR: {e}", False, 0
+
+    def _image_part(self, image_bytes):
+        """エンコード済みの画像はデコードし直さず、そのままインラインデータとして渡す。"""
+        if image_bytes.startswith(b"\xff\xd8"):
+            return {"mime_type": "image/jpeg", "data": image_bytes}
+        if image_bytes.startswith(b"\x89PNG"):
+            return {"mime_type": "image/png", "data": image_bytes}
+        if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+            return {"mime_type": "image/webp", "data": image_bytes}
+        return Image.open(io.BytesIO(image_bytes))
+
+    def _clean_generated_text(self, text):
+        generated_text = text.strip()
+        # レスポンスのクリーニング処理を強化
+        generated_text = re.sub(r"```(python|text|json|)\n|```", "", generated_text)
+        generated_text = generated_text.replace(" ", "_").replace("　", "_").replace("\n", "_")
+
+        # 万が一、モデルがまだ余計なことを言ってきた場合への対策
+        lines = generated_text.split('_')
+        if len(lines) > 1 and ("提案します" in lines[0] or "suggest" in lines[0].lower()):
+            generated_text = "_".join(lines[1:])
+        return generated_text
+
+    def _get_tokens_used(self, response):
+        if hasattr(response, 'usage_metadata') and hasattr(response.usage_metadata, 'total_token_count'):
+            return response.usage_metadata.total_token_count
+        return 0
+
+    def _parse_batch_response(self, text, count):
+        """JSON配列 (推奨) または「番号: 名前」形式の行から、画像番号ごとの名前を取り出す。"""
+        names = [None] * count
+        body = re.sub(r"```(json|text|)\n?|```", "", text).strip()
+        match = re.search(r"\[.*\]", body, re.DOTALL)
+        try:
+            items = json.loads(match.group(0)) if match else None
+        except json.JSONDecodeError:
+            items = None
+
+        if isinstance(items, list):
+            if all(isinstance(item, str) for item in items) and len(items) == count:
+                items = [{"index": i, "name": name} for i, name in enumerate(items, start=1)]
+            for item in items:
+                if not isinstance(item, dict): continue
+                try: index = int(item.get("index", 0))
+                except (TypeError, ValueError): continue
+                name = item.get("name")
+                if 1 <= index <= count and names[index - 1] is None and isinstance(name, str) and name.strip():
+                    names[index - 1] = self._clean_generated_text(name)
+        else:
+            for line in body.splitlines():
+                line_match = re.match(r"^\s*(?:Image\s*)?(\d+)\s*[\.:：\)]\s*(.+?)\s*$", line, re.IGNORECASE)
+                if not line_match: continue
+                index = int(line_match.group(1))
+                if 1 <= index <= count and names[index - 1] is None:
+                    names[index - 1] = self._clean_generated_text(line_match.group(2).strip("`\"'"))
+        return names
+
     def _build_prompt(self, custom_prompt, language_mode):
         # ★修正: AIへの指示をより厳密で、具体的な例を示す形式に変更
         if language_mode == "日本語":
@@ -90,6 +176,36 @@ class GoogleAIApiHandler:
             - The final output must be only a single string usable as a filename.
             """
 
+    def _build_batch_prompt(self, custom_prompt, language_mode, count):
+        if language_mode == "日本語":
+            return f"""
+            あなたはファイル名の提案の専門家です。
+            これから「Image 1:」から「Image {count}:」までの{count}枚の画像を送ります。各画像の内容を個別に分析し、ユーザーの指示に基づいて画像ごとに最適なファイル名を1つずつ生成してください。
+
+            # ユーザーの指示:
+            {custom_prompt}
+
+            # 厳格な出力ルール:
+            - 出力は JSON 配列のみとし、各要素は {{"index": 画像番号, "name": "ファイル名"}} の形式にしてください。
+            - 配列の要素数はちょうど{count}個で、index は 1 から {count} までを1回ずつ使ってください。
+            - name は日本語で、アンダースコア(_)区切りの単一のファイル名にしてください。説明、記号、拡張子は含めないでください。
+            - 良い出力例: [{{"index": 1, "name": "夏の縁側で涼む女子高生"}}, {{"index": 2, "name": "夕焼けの海辺"}}]
+            """
+        else: # English
+            return f"""
+            You are an expert in suggesting file names.
+            You will receive {count} images labeled "Image 1:" through "Image {count}:". Analyze each image separately and generate the single most appropriate filename for each one based on the user's instructions.
+
+            # User Instructions:
+            {custom_prompt}
+
+            # Strict Output Rules:
+            - Respond with a JSON array only. Each element must be {{"index": image_number, "name": "filename"}}.
+            - The array must contain exactly {count} elements, using each index from 1 to {count} once.
+            - Each name must be in English with underscores (_) as separators, without descriptions, symbols, or file extensions.
+            - Good output example: [{{"index": 1, "name": "high_school_girls_relaxing_on_summer_veranda"}}, {{"index": 2, "name": "sunset_beach"}}]
+            """
+
 class GoogleDriveHandler:
     def __init__(self, credentials_path=None):
         # This is a placeholder for Google Drive functionality
@@ -0,0 +1,63 @@
+# ==============================================================================
+# file: image_preprocessor.py (AI送信用の画像前処理)
+# ==============================================================================
+import io
+import os
+from PIL import Image, ImageOps
+
+from image_similarity import compute_dhash
+from video_frames import get_video_frame
+
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp']
+VIDEO_EXTENSIONS = ['.mp4', '.mov', '.avi', '.wmv', '.flv']
+
+# Gemini は画像を 768x768 のタイル単位で扱うため、長辺を1タイルに収める
+AI_IMAGE_MAX_SIDE = 768
+AI_JPEG_QUALITY = 85
+
+
+def open_reduced(file_path, max_side):
+    """
+    画像を開き、JPEG の場合は draft() で 1/2〜1/8 に縮小しながらデコードする。
+    フル解像度でのデコードを避けるため、必ず thumbnail() より前に呼ぶこと。
+    """
+    img = Image.open(file_path)
+    if img.format == "JPEG":
+        img.draft("RGB", (max_side, max_side))
+    return img
+
+
+def _to_rgb(img):
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        rgba = img.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        return background
+    return img.convert("RGB") if img.mode != "RGB" else img
+
+
+def encode_ai_image(img, max_side=AI_IMAGE_MAX_SIDE):
+    """縮小済み画像を AI 送信用の JPEG バイト列と dHash に変換する。"""
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS, reducing_gap=2.0)
+    img = _to_rgb(img)
+    with io.BytesIO() as output:
+        img.save(output, format="JPEG", quality=AI_JPEG_QUALITY, optimize=False)
+        return output.getvalue(), compute_dhash(img)
+
+
+def prepare_ai_payload(file_path, max_side=AI_IMAGE_MAX_SIDE):
+    """
+    画像・動画ファイルから Gemini に送る JPEG ペイロードを作る。
+    戻り値は (jpeg_bytes, dhash)。分析できない形式や動画フレームを取得できない場合は (None, None)。
+    画像のデコードに失敗した場合は例外をそのまま送出する。
+    """
+    file_ext = os.path.splitext(file_path)[1].lower()
+    if file_ext in IMAGE_EXTENSIONS:
+        with open_reduced(file_path, max_side) as img:
+            return encode_ai_image(img, max_side)
+    if file_ext in VIDEO_EXTENSIONS:
+        pil_image = get_video_frame(file_path)
+        if pil_image:
+            return encode_ai_image(pil_image, max_side)
+    return None, None
@@ -0,0 +1,51 @@
+# ==============================================================================
+# file: image_similarity.py (類似画像のクラスタリング)
+# ==============================================================================
+from PIL import Image
+
+# ★修正: NumPy は起動時ではなく、ハッシュの計算や類似画像の判定で初めて使うときに読み込む
+HASH_BITS = 64
+
+
+def compute_dhash(image):
+    """縮小済みの PIL.Image から 64bit の差分ハッシュ (dHash) を計算する。"""
+    import numpy as np
+    small = image.convert("L").resize((9, 8), Image.Resampling.BILINEAR)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+class SimilarityClusterer:
+    """
+    選択順に届く画像ハッシュを、代表画像とのハミング距離でクラスタに振り分ける。
+    threshold 以下の距離なら同じクラスタとみなす。threshold が 0 以下なら無効。
+    """
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self._hashes = None  # 最初の代表を登録するときに作る (無効のときは NumPy を読み込まない)
+        self._values = []
+
+    def find(self, image_hash):
+        """最も近い代表画像に登録された値を返す。しきい値内の代表がなければ None。"""
+        if self.threshold <= 0 or image_hash is None or not self._values:
+            return None
+        import numpy as np
+        count = len(self._values)
+        xored = np.bitwise_xor(self._hashes[:count], np.uint64(image_hash))
+        distances = np.unpackbits(xored.view(np.uint8)).reshape(count, HASH_BITS).sum(axis=1)
+        best = int(np.argmin(distances))
+        return self._values[best] if distances[best] <= self.threshold else None
+
+    def add(self, image_hash, value):
+        """新しいクラスタの代表として登録する。"""
+        if self.threshold <= 0 or image_hash is None:
+            return
+        import numpy as np
+        count = len(self._values)
+        if self._hashes is None:
+            self._hashes = np.zeros(64, dtype=np.uint64)
+        elif count == len(self._hashes):
+            self._hashes = np.concatenate([self._hashes, np.zeros(count, dtype=np.uint64)])
+        self._hashes[count] = image_hash
+        self._values.append(value)
@@ -0,0 +1,134 @@
+# ==============================================================================
+# file: log_console.py (ログビューアとログファイルへの出力)
+# ==============================================================================
+import datetime
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+ERROR_KEYWORDS = ("エラー", "error", "失敗", "failed", "exception")
+MAX_LINES = 2000
+FLUSH_INTERVAL_MS = 200
+LOG_FILE_NAME = "tagcleric.log"
+LOG_FILE_MAX_BYTES = 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+
+class LogStream:
+    """
+    sys.stdout / sys.stderr の代わりに使うストリーム。どのスレッドから書かれても
+    行ごとに (時刻, タグ, テキスト) をキューに積むだけで、Tk には触れない。
+    """
+    def __init__(self, records, tag):
+        self._records = records
+        self.tag = tag
+        self._local = threading.local()  # 書きかけの行はスレッドごとに持ち、他スレッドの出力と混ざらないようにする
+
+    def write(self, text):
+        if not text: return 0
+        buffered = getattr(self._local, "buffer", "") + text
+        *lines, self._local.buffer = buffered.split("\n")
+        now = time.time()
+        for line in lines:
+            self._records.put((now, self.tag, line))
+        return len(text)
+
+    def flush(self):
+        line = getattr(self._local, "buffer", "")
+        if line:
+            self._local.buffer = ""
+            self._records.put((time.time(), self.tag, line))
+
+
+class LogConsole:
+    """
+    LogStream に書かれた行を一定間隔でまとめてログビューアに追加し、ログファイルにも書き出す。
+    - ビューアは最新 max_lines 行だけを保持し、古い行から削除する
+    - ログファイルは設定フォルダに保存し、一定サイズでローテーションする
+    """
+    def __init__(self, widget, config_dir, max_lines=MAX_LINES, interval_ms=FLUSH_INTERVAL_MS):
+        self.widget = widget
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        self._records = queue.SimpleQueue()
+        self.stdout = LogStream(self._records, "stdout")
+        self.stderr = LogStream(self._records, "stderr")
+        self._line_count = 0
+        self._after_id = None
+        self._file_handler = None
+        try:
+            self._file_handler = logging.handlers.RotatingFileHandler(
+                os.path.join(config_dir, LOG_FILE_NAME), maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding="utf-8")
+            self._file_handler.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+        except OSError as e:
+            self.stderr.write(f"ログファイルを開けませんでした: {e}\n")
+        self._after_id = self.widget.after(self.interval_ms, self._flush)
+
+    @staticmethod
+    def _tag_for(tag, line):
+        lower_line = line.lower()
+        return "error" if tag == "stdout" and any(keyword in lower_line for keyword in ERROR_KEYWORDS) else tag
+
+    def _take_records(self):
+        records = []
+        while True:
+            try: records.append(self._records.get_nowait())
+            except queue.Empty: return records
+
+    def _write_file(self, records):
+        if self._file_handler is None: return
+        for created, tag, line in records:
+            level = logging.ERROR if self._tag_for(tag, line) != "stdout" else logging.INFO
+            record = logging.makeLogRecord({"msg": line, "levelno": level, "levelname": logging.getLevelName(level), "created": created, "msecs": (created % 1) * 1000})
+            try: self._file_handler.handle(record)
+            except Exception: pass
+
+    def _flush(self):
+        self._after_id = None
+        records = self._take_records()
+        if records:
+            self._write_file(records)
+            self._append(deque(records, maxlen=self.max_lines))
+        self._after_id = self.widget.after(self.interval_ms, self._flush)
+
+    def _append(self, records):
+        # 同じタグが続く行は1つにまとめ、1回の insert で追加する
+        chunks, current_tag, lines = [], None, []
+        for created, tag, line in records:
+            tag = self._tag_for(tag, line)
+            if tag != current_tag and lines:
+                chunks.extend(("".join(lines), (current_tag,)))
+                lines = []
+            current_tag = tag
+            timestamp = datetime.datetime.fromtimestamp(created).strftime("%H:%M:%S")
+            lines.append(f"[{timestamp}] {line}\n")
+        chunks.extend(("".join(lines), (current_tag,)))
+        try:
+            self.widget.configure(state="normal")
+            self.widget.insert("end", *chunks)
+            self._line_count += len(records)
+            excess = self._line_count - self.max_lines
+            if excess > 0:
+                self.widget.delete("1.0", f"{excess + 1}.0")
+                self._line_count -= excess
+            self.widget.configure(state="disabled")
+            self.widget.see("end")
+        except Exception:
+            pass  # ウィンドウの破棄後
+
+    def close(self):
+        """終了時に残りの行をログファイルへ書き出して閉じる。"""
+        if self._after_id is not None:
+            try: self.widget.after_cancel(self._after_id)
+            except Exception: pass
+            self._after_id = None
+        self.stdout.flush()
+        self.stderr.flush()
+        self._write_file(self._take_records())
+        if self._file_handler is not None:
+            self._file_handler.close()
+            self._file_handler = None
@@ -1,6 +1,9 @@
 # ==============================================================================
 # file: main_app.py (v1.1.1)
 # ==============================================================================
+# ★追加: 起動時間の計測の起点 (モジュールの読み込みより前)
+import time
+STARTUP_STARTED = time.perf_counter()
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, font, scrolledtext, simpledialog
 from tkinterdnd2 import DND_FILES, TkinterDnD
@@ -8,21 +11,26 @@ import os
 import sys
 import json
 import configparser
-import datetime
 import webbrowser
-import urllib.request
-import urllib.error
 from threading import Thread, Event
 import traceback
 import subprocess
-from PIL import Image, ImageTk
+import multiprocessing
 import shutil
 
 # 外部ファイルをインポート
 from language_manager import LanguageManager
-from google_drive_handler import GoogleDriveHandler, GoogleAIApiHandler
+from google_drive_handler import GoogleDriveHandler, GoogleAIApiHandler, GEMINI_MODELS, GEMINI_RPD_LIMITS, GEMINI_RPM_LIMITS
 from file_system_handler import FileSystemHandler
 from utils import resource_path, get_config_dir, compare_versions
+from rate_limiter import RateLimiter
+from suggestion_cache import SuggestionCache
+from file_index import FileIndex
+from thumbnail_service import ThumbnailService
+from ui_dispatcher import UIDispatcher
+from log_console import LogConsole
+from usage_ledger import UsageLedger
+from startup_timer import StartupTimer
 
 import app_view
 import app_logic
@@ -91,32 +99,16 @@ class ApiKeyWindow(tk.Toplevel):
         return self.saved_api_key
 
 
-class TextRedirector:
-    def __init__(self, widget, tag="stdout"):
-        self.widget = widget
-        self.tag = tag
-    def write(self, str_in):
-        if not hasattr(self.widget, 'winfo_exists') or not self.widget.winfo_exists(): return
-        self.widget.configure(state="normal")
-        log_tag = self.tag
-        lower_str = str_in.lower()
-        error_keywords = ["エラー", "error", "失敗", "failed", "exception"]
-        if any(keyword in lower_str for keyword in error_keywords):
-            log_tag = "error"
-        timestamp = datetime.datetime.now().strftime("%H:%M:%S")
-        formatted_str = f"[{timestamp}] {str_in}"
-        self.widget.insert("end", formatted_str, (log_tag,))
-        self.widget.configure(state="disabled")
-        self.widget.see("end")
-    def flush(self): pass
-
 class FileRenamerApp(TkinterDnD.Tk):
     CURRENT_VERSION = "1.1.1" 
     CURRENT_PROMPTS_VERSION = "1.1.1"
     UPDATE_INFO_URL = "https://gist.githubusercontent.com/nicobtan/724c59750c93cf7a296117e345a2f0c5/raw/version.json"
 
-    def __init__(self):
+    def __init__(self, startup_timer=None):
         super().__init__()
+        self.startup_timer = startup_timer or StartupTimer(False)
+        # ★追加: ワーカースレッドからの UI 更新はすべてこのディスパッチャー経由でメインスレッドに渡す
+        self.ui = UIDispatcher(self)
 
         self.config_dir = get_config_dir("TagClericAI")
         self.config_filepath = os.path.join(self.config_dir, "config.ini")
@@ -130,8 +122,13 @@ class FileRenamerApp(TkinterDnD.Tk):
         
         self._update_language_dependent_vars()
 
+        self.usage_ledger = UsageLedger(self.config_dir)
+        self._usage_save_id = None
         self._load_app_config()
         self.load_config()
+        self.suggestion_cache = SuggestionCache(self.config_dir, max_bytes=self.suggestion_cache_max_mb * 1024 * 1024)
+        self.file_index = FileIndex(self.config_dir)
+        self.startup_timer.mark("設定の読み込み")
 
         self.cancel_requested = Event()
         self.is_processing = False
@@ -144,10 +141,21 @@ class FileRenamerApp(TkinterDnD.Tk):
 
         self.check_daily_token_reset()
         self.update_usage_display()
+        self.startup_timer.mark("画面の構築")
+        # ★修正: AI クライアントは最初のウィンドウを表示してから作る
+        self.after_idle(self._on_first_window_shown)
         self.after(100, self.check_api_key_on_startup)
+        self.after(200, self.app_logic.recover_interrupted_renames)
         self.after(2000, self.check_for_updates, True)
 
 
+    def _on_first_window_shown(self):
+        self.update_idletasks()
+        self.startup_timer.mark("最初の表示", budget=True)
+        if self.gemini_api_key_var.get() and self.ai_handler is None: self.init_ai_handler()
+        self.startup_timer.mark("AI クライアントの準備")
+        self.startup_timer.report()
+
     def check_api_key_on_startup(self):
         api_key_is_missing = not self.gemini_api_key_var.get()
         
@@ -252,9 +260,9 @@ class FileRenamerApp(TkinterDnD.Tk):
         self.create_menu()
         self.load_all_prompts()
         self.ai_handler = None
-        if self.gemini_api_key_var.get(): self.init_ai_handler()
 
         self.file_system_handler = FileSystemHandler()
+        self.thumbnail_service = ThumbnailService(self.ui.call, self.config_dir, self.THUMBNAIL_SIZE)
         
         self.app_view = app_view.AppView(self)
         self.app_logic = app_logic.AppLogic(self)
@@ -262,9 +270,12 @@ class FileRenamerApp(TkinterDnD.Tk):
         self.create_widgets()
         self._connect_ui_events()
 
+        self.log_console = None
         if self.app_view.log_viewer:
-            sys.stdout = TextRedirector(self.app_view.log_viewer, "stdout")
-            sys.stderr = TextRedirector(self.app_view.log_viewer, "stderr")
+            # ★修正: print はキューに積むだけにし、ビューアへの追加とログファイルへの書き出しはまとめて行う
+            self.log_console = LogConsole(self.app_view.log_viewer, self.config_dir)
+            sys.stdout = self.log_console.stdout
+            sys.stderr = self.log_console.stderr
             self.app_view.log_viewer.tag_config("stderr", foreground="red")
             self.app_view.log_viewer.tag_config("error", foreground="red")
             
@@ -281,6 +292,7 @@ class FileRenamerApp(TkinterDnD.Tk):
         file_menu = tk.Menu(self.menu_bar, tearoff=0)
         self.menu_bar.add_cascade(label=self.lang_manager.get("menu_file"), menu=file_menu)
         file_menu.add_command(label=self.lang_manager.get("menu_set_api_key"), command=self.show_api_key_window)
+        file_menu.add_command(label=self.lang_manager.get("menu_clear_suggestion_cache"), command=self.clear_suggestion_cache)
         file_menu.add_separator()
         lang_menu = tk.Menu(file_menu, tearoff=0)
         file_menu.add_cascade(label=self.lang_manager.get("language_menu"), menu=lang_menu)
@@ -301,8 +313,11 @@ class FileRenamerApp(TkinterDnD.Tk):
 
     def setup_variables(self):
         self.THUMBNAIL_SIZE = (160, 160)
-        self.GEMINI_MODELS = [ "gemini-2.5-flash-lite", "gemini-2.0-flash-lite","gemini-1.5-flash-latest", "gemini-1.5-pro-latest", "gemini-pro" ]
-        self.GEMINI_LIMITS = { "gemini-2.5-flash-lite": 200, "gemini-2.0-flash-lite": 200,"gemini-1.5-flash-latest": 200, "gemini-1.5-pro-latest": 20, "gemini-pro": 100 }
+        self.USAGE_SAVE_DELAY_MS = 10000
+        self.GEMINI_MODELS = list(GEMINI_MODELS)
+        self.GEMINI_LIMITS = dict(GEMINI_RPD_LIMITS)
+        self.GEMINI_RPM_LIMITS = dict(GEMINI_RPM_LIMITS)
+        self.rate_limiter = RateLimiter(self.GEMINI_LIMITS, self.GEMINI_RPM_LIMITS)
         self.gemini_model_var = tk.StringVar(value=self.GEMINI_MODELS[0])
         self.add_date_var = tk.BooleanVar(value=True)
         self.date_format_var = tk.StringVar(value="%Y%m%d")
@@ -311,8 +326,18 @@ class FileRenamerApp(TkinterDnD.Tk):
         self.add_folder_name_var = tk.BooleanVar(value=False)
         self.folder_name_to_add_var = tk.StringVar(value="")
         self.ai_fallback_name_var = tk.StringVar(value="AI_Unknown")
+        self.max_concurrent_requests_var = tk.IntVar(value=4)
+        self.similarity_threshold_var = tk.IntVar(value=6)
+        self.batch_size_var = tk.IntVar(value=1)
+        self.suggestion_cache_max_mb = 20
+        self.rename_workers = 8
         self.folder_path_display_var = tk.StringVar()
         self.file_types_var = tk.StringVar(value=".jpg,.png,.jpeg,.gif,.bmp,.webp,.mp4,.mov,.avi")
+        self.recursive_scan_var = tk.BooleanVar(value=False)
+        self.scan_max_depth_var = tk.IntVar(value=0)
+        self.include_patterns_var = tk.StringVar(value="")
+        self.exclude_patterns_var = tk.StringVar(value="")
+        self.watch_folder_var = tk.BooleanVar(value=False)
         self.language_mode_var = tk.StringVar()
         self.gemini_api_key_var = tk.StringVar(value="")
         self.PROMPT_TEMPLATES = {
@@ -328,9 +353,6 @@ class FileRenamerApp(TkinterDnD.Tk):
         }
         self.prompt_template_var = None
         self.selected_language_var = tk.StringVar(value='ja')
-        self.total_tokens_used = 0
-        self.daily_requests_made = 0
-        self.last_reset_date_gmt = ""
         self.token_count_var = tk.StringVar()
         self.request_count_var = tk.StringVar()
 
@@ -365,14 +387,27 @@ class FileRenamerApp(TkinterDnD.Tk):
             self.gemini_api_key_var.set(config.get('Settings', 'GeminiApiKey', fallback=''))
             self.gemini_model_var.set(config.get('Settings', 'GeminiModel', fallback=self.GEMINI_MODELS[0]))
         
-        if config.has_section('TokenUsage'):
-            self.last_reset_date_gmt = config.get('TokenUsage', 'last_reset_date_gmt', fallback='')
-            self.total_tokens_used = config.getint('TokenUsage', 'total_tokens_used', fallback=0)
-            self.daily_requests_made = config.getint('TokenUsage', 'daily_requests_made', fallback=0)
-        else:
-            self.last_reset_date_gmt = ''
-            self.total_tokens_used = 0
-            self.daily_requests_made = 0
+        if config.has_section('Performance'):
+            self.max_concurrent_requests_var.set(config.getint('Performance', 'MaxConcurrentRequests', fallback=4))
+            self.similarity_threshold_var.set(config.getint('Performance', 'SimilarityThreshold', fallback=6))
+            self.batch_size_var.set(config.getint('Performance', 'BatchSize', fallback=1))
+            self.suggestion_cache_max_mb = config.getint('Performance', 'SuggestionCacheMaxMB', fallback=20)
+            self.rename_workers = config.getint('Performance', 'RenameWorkers', fallback=8)
+
+        if config.has_section('Scan'):
+            self.recursive_scan_var.set(config.getboolean('Scan', 'Recursive', fallback=False))
+            self.scan_max_depth_var.set(config.getint('Scan', 'MaxDepth', fallback=0))
+            self.include_patterns_var.set(config.get('Scan', 'IncludePatterns', fallback=''))
+            self.exclude_patterns_var.set(config.get('Scan', 'ExcludePatterns', fallback=''))
+            self.watch_folder_var.set(config.getboolean('Scan', 'WatchFolder', fallback=False))
+
+        # ★修正: 使用量は UsageLedger で集計し、前回の保存より後のリクエストはジャーナルから復元する
+        replayed = self.usage_ledger.load(
+            config.get('TokenUsage', 'last_reset_date_gmt', fallback=''),
+            config.getint('TokenUsage', 'total_tokens_used', fallback=0),
+            config.getint('TokenUsage', 'daily_requests_made', fallback=0),
+            config.getint('TokenUsage', 'journal_offset', fallback=0))
+        if replayed: print(f"使用量ジャーナルから {replayed} 件のリクエストを復元しました。")
 
     def save_config(self):
         config = configparser.ConfigParser()
@@ -384,10 +419,26 @@ class FileRenamerApp(TkinterDnD.Tk):
         config.set('Settings', 'Language', self.selected_language_var.get())
         config.set('Settings', 'PromptsVersion', self.CURRENT_PROMPTS_VERSION)
         
+        if not config.has_section('Performance'): config.add_section('Performance')
+        config.set('Performance', 'MaxConcurrentRequests', str(self.get_max_concurrent_requests()))
+        config.set('Performance', 'SimilarityThreshold', str(self.get_similarity_threshold()))
+        config.set('Performance', 'BatchSize', str(self.get_batch_size()))
+        config.set('Performance', 'SuggestionCacheMaxMB', str(self.suggestion_cache_max_mb))
+        config.set('Performance', 'RenameWorkers', str(self.get_rename_workers()))
+
+        if not config.has_section('Scan'): config.add_section('Scan')
+        config.set('Scan', 'Recursive', str(self.recursive_scan_var.get()))
+        config.set('Scan', 'MaxDepth', str(self.get_scan_max_depth()))
+        config.set('Scan', 'IncludePatterns', self.include_patterns_var.get())
+        config.set('Scan', 'ExcludePatterns', self.exclude_patterns_var.get())
+        config.set('Scan', 'WatchFolder', str(self.watch_folder_var.get()))
+
         if not config.has_section('TokenUsage'): config.add_section('TokenUsage')
-        config.set('TokenUsage', 'last_reset_date_gmt', str(self.last_reset_date_gmt))
-        config.set('TokenUsage', 'total_tokens_used', str(self.total_tokens_used))
-        config.set('TokenUsage', 'daily_requests_made', str(self.daily_requests_made))
+        last_reset_date, total_tokens, daily_requests, journal_offset = self.usage_ledger.checkpoint()
+        config.set('TokenUsage', 'last_reset_date_gmt', last_reset_date)
+        config.set('TokenUsage', 'total_tokens_used', str(total_tokens))
+        config.set('TokenUsage', 'daily_requests_made', str(daily_requests))
+        config.set('TokenUsage', 'journal_offset', str(journal_offset))
 
         try:
             with open(self.config_filepath, 'w', encoding='utf-8') as configfile: config.write(configfile)
@@ -399,11 +450,30 @@ class FileRenamerApp(TkinterDnD.Tk):
             if messagebox.askyesno(self.lang_manager.get("confirm_exit_title"), self.lang_manager.get("confirm_exit_message")):
                 self.cancel_requested.set()
                 self.save_config()
+                self.app_logic.shutdown()
+                self.usage_ledger.close()
+                self._close_log_console()
                 self.destroy()
         else:
             self.save_config()
+            self.suggestion_cache.close()
+            self.file_index.close()
+            self.app_logic.shutdown()
+            self.usage_ledger.close()
+            self._close_log_console()
             self.destroy()
 
+    def _close_log_console(self):
+        if self.log_console is None: return
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+        self.log_console.close()
+
+    def clear_suggestion_cache(self):
+        if self.is_processing: return
+        if not messagebox.askyesno(self.lang_manager.get("confirm_clear_cache_title"), self.lang_manager.get("confirm_clear_cache_message"), parent=self): return
+        count = self.suggestion_cache.clear()
+        self.update_status(self.lang_manager.get("status_cache_cleared").format(count=count))
+
     def create_widgets(self):
         status_frame = ttk.Frame(self)
         status_frame.pack(side='bottom', fill='x')
@@ -448,14 +518,17 @@ class FileRenamerApp(TkinterDnD.Tk):
         self.app_view.suggest_button.config(command=self.suggest_local_names)
         self.app_view.cancel_button.config(command=self.cancel_processing)
         self.app_view.rename_button.config(command=self.rename_local_files)
-        self.app_view.local_tree.bind('<<TreeviewSelect>>', self.on_tree_select)
-        self.app_view.local_tree.bind('<Double-1>', self.on_tree_edit_start)
+        self.app_view.local_tree.bind('<<ListSelect>>', self.on_tree_select)
+        self.app_view.local_tree.tree.bind('<Double-1>', self.on_tree_edit_start)
         if hasattr(self.app_view, 'gdrive_auth_button') and self.app_view.gdrive_auth_button: self.app_view.gdrive_auth_button.config(command=self.authenticate_google_drive)
         self.app_view.template_combo.bind("<<ComboboxSelected>>", self.on_template_selected)
         self.app_view.prompt_idea_button.config(command=self.open_prompt_idea_page)
         self.app_view.delete_prompt_button.config(command=self.delete_selected_prompt)
         self.app_view.add_prompt_button.config(command=self.add_new_prompt)
         if self.app_view.api_key_help_label: self.app_view.api_key_help_label.bind("<Button-1>", lambda e: self.show_api_key_window())
+        # ★追加: 命名オプションを変えたら、保存済みの AI の名前部分から提案名を組み立て直す
+        for var in (self.add_date_var, self.date_format_var, self.remove_original_name_var, self.add_sequence_var, self.add_folder_name_var, self.folder_name_to_add_var):
+            var.trace_add("write", self.app_logic.schedule_recompose)
 
 
     def on_template_selected(self, event=None):
@@ -523,6 +596,7 @@ class FileRenamerApp(TkinterDnD.Tk):
 
     def suggest_local_names(self): self.app_logic.suggest_local_names_logic()
     def cancel_processing(self):
+        self.app_logic.cancel_scan()
         if self.is_processing:
             self.cancel_requested.set()
             print("Cancellation requested. Stopping after the current file is processed.")
@@ -532,7 +606,30 @@ class FileRenamerApp(TkinterDnD.Tk):
         self.app_view.toggle_ui_state(processing)
         if self.app_view.cancel_button: self.app_view.cancel_button.config(state="normal" if processing else "disabled")
 
+    def get_rename_workers(self):
+        return max(1, min(32, self.rename_workers))
+
+    def get_max_concurrent_requests(self):
+        try: return max(1, min(16, int(self.max_concurrent_requests_var.get())))
+        except (tk.TclError, ValueError): return 1
+
+    def get_similarity_threshold(self):
+        try: return max(0, min(32, int(self.similarity_threshold_var.get())))
+        except (tk.TclError, ValueError): return 0
+
+    def get_batch_size(self):
+        try: return max(1, min(16, int(self.batch_size_var.get())))
+        except (tk.TclError, ValueError): return 1
+
+    def get_scan_max_depth(self):
+        try: return max(0, min(64, int(self.scan_max_depth_var.get())))
+        except (tk.TclError, ValueError): return 0
+
     def update_status(self, message):
+        # ★修正: ワーカースレッドから呼ばれた場合は、次の tick でまとめて表示する (最後のメッセージだけが残る)
+        if not self.ui.on_main_thread():
+            self.ui.coalesce("status", self.update_status, message)
+            return
         if hasattr(self, 'status_bar'): self.status_bar.config(text=message)
         print(message)
 
@@ -544,7 +641,8 @@ class FileRenamerApp(TkinterDnD.Tk):
 
     def clear_file_list(self, tree):
         if tree:
-            for item in tree.get_children(): tree.delete(item)
+            self.app_logic.cancel_scan(discard=True)
+            self.app_logic.clear_records()
             self.clear_thumbnail() 
             self.update_status(self.lang_manager.get("status_list_cleared"))
 
@@ -554,56 +652,53 @@ class FileRenamerApp(TkinterDnD.Tk):
         Thread(target=self._check_update_task, args=(silent,), daemon=True).start()
 
     def _check_update_task(self, silent=False):
+        # ★修正: 通信だけをこのスレッドで行い、ダイアログ表示はメインスレッドで行う
         try:
+            import urllib.request  # ★修正: 更新の確認をするときに初めて読み込む
             with urllib.request.urlopen(self.UPDATE_INFO_URL, timeout=10) as response: data = json.load(response)
-            latest_version = data.get("latest_version")
-            download_url = data.get("download_url")
-            if latest_version and compare_versions(latest_version, self.CURRENT_VERSION):
-                if messagebox.askyesno(self.lang_manager.get("update_available_title"), self.lang_manager.get("update_available_message").format(version=latest_version)):
-                    webbrowser.open(download_url)
-            elif not silent:
-                messagebox.showinfo(self.lang_manager.get("no_updates_title"), self.lang_manager.get("no_updates_message"))
-            
-            if not silent:
-                self.after(0, self.update_status, self.lang_manager.get("status_update_check_complete"))
+            self.ui.call(self._show_update_result, silent, data.get("latest_version"), data.get("download_url"), None)
         except Exception as e:
             error_message = f"An error occurred while checking for updates: {e}"
             print(error_message)
+            self.ui.call(self._show_update_result, silent, None, None, error_message)
+
+    def _show_update_result(self, silent, latest_version, download_url, error_message):
+        if error_message:
             if not silent:
                 messagebox.showerror(self.lang_manager.get("error_title"), error_message)
-                self.after(0, self.update_status, self.lang_manager.get("status_update_check_failed"))
-
-    
+                self.update_status(self.lang_manager.get("status_update_check_failed"))
+            return
+        if latest_version and compare_versions(latest_version, self.CURRENT_VERSION):
+            if messagebox.askyesno(self.lang_manager.get("update_available_title"), self.lang_manager.get("update_available_message").format(version=latest_version)):
+                webbrowser.open(download_url)
+        elif not silent:
+            messagebox.showinfo(self.lang_manager.get("no_updates_title"), self.lang_manager.get("no_updates_message"))
+        if not silent:
+            self.update_status(self.lang_manager.get("status_update_check_complete"))
 
     def show_quota_error_message(self, model_name):
          messagebox.showerror(self.lang_manager.get("quota_error_title"), self.lang_manager.get("quota_error_message").format(model_name=model_name))
 
     def check_daily_token_reset(self):
-        try:
-            stored_date = datetime.datetime.strptime(self.last_reset_date_gmt, '%Y-%m-%d').date() if self.last_reset_date_gmt else None
-        except ValueError:
-            stored_date = None
-        
-        current_gmt_date = datetime.datetime.now(datetime.timezone.utc).date()
-
-        if stored_date != current_gmt_date:
-            print(f"New day (GMT). Resetting token count. Old date: {stored_date}, New date: {current_gmt_date}")
-            self.total_tokens_used = 0
-            self.daily_requests_made = 0
-            self.last_reset_date_gmt = str(current_gmt_date)
+        if self.usage_ledger.reset_if_new_day():
+            print(f"New day (GMT). Resetting token count. New date: {self.usage_ledger.last_reset_date}")
             self.save_config()
 
-    def increment_and_update_usage(self, tokens_just_used):
+    def on_usage_recorded(self):
+        """★修正: 使用量は UsageLedger が記録済み。表示だけを更新し、config.ini への保存は一定時間ごとにまとめる。"""
         self.check_daily_token_reset()
-        self.total_tokens_used += tokens_just_used
-        self.daily_requests_made += 1
         self.update_usage_display()
-        self.save_config()
-    
+        if self._usage_save_id is None:
+            self._usage_save_id = self.after(self.USAGE_SAVE_DELAY_MS, self._save_usage)
+
+    def _save_usage(self):
+        self._usage_save_id = None
+        if self.usage_ledger.dirty: self.save_config()
+
     def update_usage_display(self):
-        self.token_count_var.set(self.lang_manager.get("token_usage_label").format(tokens=self.total_tokens_used))
+        self.token_count_var.set(self.lang_manager.get("token_usage_label").format(tokens=self.usage_ledger.total_tokens))
         limit = self.GEMINI_LIMITS.get(self.gemini_model_var.get(), 200)
-        self.request_count_var.set(self.lang_manager.get("request_usage_label").format(requests=self.daily_requests_made, limit=limit))
+        self.request_count_var.set(self.lang_manager.get("request_usage_label").format(requests=self.usage_ledger.daily_requests, limit=limit))
 
     def show_api_key_window(self):
         current_key = self.gemini_api_key_var.get()
@@ -621,8 +716,8 @@ class FileRenamerApp(TkinterDnD.Tk):
     def open_app_page(self): webbrowser.open(self.ABOUT_URL)
     def open_prompt_idea_page(self): webbrowser.open(self.PROMPT_IDEA_URL)
     def select_all_items(self, tree, select=True):
-        if select: tree.selection_set(tree.get_children())
-        else: tree.selection_remove(tree.get_children())
+        if select: tree.select_all()
+        else: tree.deselect_all()
 
     def browse_folder(self):
         folder = filedialog.askdirectory()
@@ -649,8 +744,12 @@ class FileRenamerApp(TkinterDnD.Tk):
     def authenticate_google_drive(self): self.app_logic.authenticate_google_drive_logic()
 
 if __name__ == '__main__':
+    # PyInstaller でビルドした場合に、画像準備用の子プロセスがアプリ本体を起動しないようにする
+    multiprocessing.freeze_support()
+    startup_timer = StartupTimer.from_environment(started=STARTUP_STARTED)
+    startup_timer.mark("モジュールの読み込み")
     try:
-        app = FileRenamerApp()
+        app = FileRenamerApp(startup_timer)
         app.mainloop()
     except Exception as e:
         log_file_path = "error.log"
@@ -0,0 +1,157 @@
+# ==============================================================================
+# file: name_allocator.py (連番付きの重複しないファイル名の割り当て)
+# ==============================================================================
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+SUFFIX_PATTERN = re.compile(r"^(.*)_(\d+)$")
+
+
+class _FolderNames:
+    __slots__ = ("stems", "disk", "free_from", "owners")
+
+    def __init__(self):
+        self.disk = set()  # ディスク上のファイルの名前
+        self.stems = set()  # 使用中の名前 (拡張子なし・大文字小文字は OS に合わせて正規化)
+        self.free_from = {}  # ベース名 -> これより小さい連番はすべて使用中
+        self.owners = {}  # 提案名を割り当てたファイルのパス -> 割り当てた名前
+
+    def discard(self, stem):
+        if stem in self.disk: return  # 既存ファイルと同じ名前 (自分自身の現在の名前など) はディスク上に残っている
+        self.stems.discard(stem)
+        base, separator, number = stem.rpartition("_")
+        if separator and number.isdigit():
+            # 空いた連番を次の割り当てで再利用する
+            number = int(number)
+            if number < self.free_from.get(base, 2): self.free_from[base] = number
+
+
+# 名前の比較用の正規化。大文字小文字を区別しない Windows では小文字にし、それ以外はそのまま使う
+# (行ごとに呼ぶため、os.path.normcase の Python 関数呼び出しを避けて組み込みの関数にする)
+_fold = str.lower if os.path.normcase("A") == "a" else str
+
+
+def _stem_key(name):
+    return _fold(os.path.splitext(name)[0])
+
+
+class NameAllocator:
+    """
+    フォルダごとに、ディスク上の既存ファイルと割り当て済みの提案名 (拡張子を除く) の集合と、
+    ベース名ごとに空いている最小の連番の目安を持ち、同じベース名が続いても先頭から数え直さずに重複しない名前を割り当てる。
+    フォルダの中身は最初に必要になったときに1回だけ読み、別のバッチ・並行する処理・前回までの提案とも衝突しない。
+    pending(フォルダの集合) は、それらのフォルダで提案済みの名前を {フォルダ: [(パス, 提案名)]} で返す関数。
+    """
+    def __init__(self, pending=None, listdir=os.listdir):
+        self._pending = pending
+        self._listdir = listdir
+        self._lock = threading.Lock()
+        self._folders = {}
+
+    def _folders_for(self, directories):
+        """
+        フォルダの情報を {フォルダ: 情報} で返す (ロックを取る前に呼ぶ)。初めてのフォルダは一覧を読み、pending はまとめて1回だけ呼ぶ。
+        pending が呼び出し元のロックを取ってもデッドロックしないよう、読み込みはロックの外で行う。
+        """
+        with self._lock:
+            folders = {directory: self._folders.get(directory) for directory in directories}
+        missing = {directory for directory, folder in folders.items() if folder is None}
+        if not missing: return folders
+        loaded = {}
+        for directory in missing:
+            folder = loaded[directory] = _FolderNames()
+            try:
+                folder.disk.update(_stem_key(name) for name in self._listdir(directory))
+                folder.stems.update(folder.disk)
+            except OSError as e:
+                print(f"フォルダの読み込みエラー {directory}: {e}")
+        for directory, suggestions in (self._pending(missing) if self._pending else {}).items():
+            folder = loaded[directory]
+            for path, new_name in suggestions:
+                stem = _stem_key(new_name)
+                folder.stems.add(stem)
+                folder.owners[path] = stem
+        with self._lock:
+            folders.update((directory, self._folders.setdefault(directory, folder)) for directory, folder in loaded.items())
+        return folders
+
+    def _folder(self, directory):
+        return self._folders_for((directory,))[directory]
+
+    @staticmethod
+    def _release(folder, path):
+        stem = folder.owners.pop(path, None)
+        if stem is not None: folder.discard(stem)
+
+    @staticmethod
+    def _assign(folder, path, base_name, ext):
+        # ロックを取ってから呼ぶ
+        key = _fold(base_name)
+        if key in folder.stems:
+            # 自分の現在の名前かどうかは、パスにベース名が含まれるときだけ調べる (大量の行で毎回分解しないように)
+            own = _stem_key(os.path.basename(path)) if key in _fold(path) else None
+            match = own and SUFFIX_PATTERN.match(own)
+            if own == key:
+                pass  # 自分自身の現在の名前はそのまま使う
+            elif match and match.group(1) == key:
+                # ★修正: 同じベース名の連番が付いた名前なら、付け直さずに今の連番を残す (再実行で名前が変わらないように)
+                base_name = f"{base_name}_{match.group(2)}"
+                key = own
+            else:
+                number = folder.free_from.get(key, 2)
+                while True:
+                    candidate = f"{base_name}_{number}"
+                    candidate_key = _fold(candidate)
+                    if candidate_key not in folder.stems: break
+                    number += 1
+                folder.free_from[key] = number + 1
+                base_name, key = candidate, candidate_key
+        folder.stems.add(key)
+        folder.owners[path] = key
+        return f"{base_name}{ext}"
+
+    def allocate(self, path, base_name, ext):
+        """path のファイルに base_name (+ 必要なら "_連番") + ext を割り当てて返す。以前の割り当ては解放する。"""
+        folder = self._folder(os.path.dirname(path))
+        with self._lock:
+            self._release(folder, path)
+            return self._assign(folder, path, base_name, ext)
+
+    @contextmanager
+    def batch(self, paths):
+        """
+        ★追加: paths の以前の割り当てを解放し、paths のファイルだけに割り当てる allocate を返す (with 文で使う)。
+        フォルダの解決はパスごとに1回、ロックはバッチ全体で1回だけ取るため、大量の行の組み立て直しに使う。
+        """
+        directories = [os.path.dirname(path) for path in paths]
+        folders = self._folders_for(set(directories))
+        folder_of = dict(zip(paths, map(folders.__getitem__, directories)))
+        assign = self._assign
+        with self._lock:
+            for path, folder in folder_of.items():
+                stem = folder.owners.pop(path, None)
+                if stem is not None and stem not in folder.disk: folder.stems.discard(stem)
+            # 空いた連番の目安は1件ずつ戻さず、まとめて先頭から数え直す
+            for folder in folders.values(): folder.free_from.clear()
+            yield lambda path, base_name, ext: assign(folder_of[path], path, base_name, ext)
+
+    def reserve(self, path, new_name):
+        """手動で入力した名前など、割り当て以外で決まった提案名を登録する。空なら解放だけ行う。"""
+        folder = self._folder(os.path.dirname(path))
+        with self._lock:
+            self._release(folder, path)
+            if new_name:
+                stem = _stem_key(new_name)
+                folder.stems.add(stem)
+                folder.owners[path] = stem
+
+    def forget(self, directories):
+        """リネームや外部の変更で中身が変わったフォルダは、次に必要になったときに読み直す。"""
+        with self._lock:
+            for directory in directories: self._folders.pop(directory, None)
+
+    def reset(self):
+        with self._lock:
+            self._folders.clear()
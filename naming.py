@@ -0,0 +1,95 @@
+# ==============================================================================
+# file: naming.py (提案名の組み立て)
+# ==============================================================================
+import datetime
+import os
+import time
+from collections import defaultdict, namedtuple
+
+NamingOptions = namedtuple("NamingOptions", "add_creation_date date_format remove_original_name add_folder_name folder_name_to_add ai_fallback_name add_sequence_number")
+
+# 時刻を含む書式 (これらがなければ日付ごとに1回だけ strftime すればよい)
+TIME_DIRECTIVES = ("%H", "%I", "%M", "%S", "%f", "%p", "%X", "%c", "%z", "%Z", "%s", "%T", "%R", "%r")
+
+
+class _DateFormatter:
+    """同じ日付の書式化結果を再利用し、大量の行でも strftime の回数を抑える。"""
+    # タイムゾーンの時差と夏時間の切り替えは15分単位のため、15分ごとの区間内では日付が変わらない
+    BUCKET_SECONDS = 900
+
+    def __init__(self, date_format):
+        self.date_format = date_format
+        self.date_only = not any(directive in date_format for directive in TIME_DIRECTIVES)
+        # time.strftime は datetime.strftime より速いが、マイクロ秒 (%f) には対応していない
+        self._format = self._format_datetime if "%f" in date_format else self._format_time
+        self._cache = {}
+        self._warned = False
+
+    def _format_datetime(self, created):
+        return datetime.datetime.fromtimestamp(created).strftime(self.date_format)
+
+    def _format_time(self, created):
+        return time.strftime(self.date_format, time.localtime(created))
+
+    def __call__(self, created):
+        """書式化した日付を返す。書式が不正なら None (エラーは1回だけ表示する)。"""
+        try:
+            if not self.date_only: return self._format(created)
+            bucket = created // self.BUCKET_SECONDS
+            text = self._cache.get(bucket)
+            if text is None:
+                text = self._cache[bucket] = self._format(created)
+            return text
+        except Exception as e:
+            if not self._warned:
+                print(f"日付フォーマットエラー: {e}")
+                self._warned = True
+            return None
+
+
+class SequenceCounter:
+    """
+    フォルダとベース名ごとの使用回数から連番を振る。2件目から "_2", "_3" ... を付ける。
+    ディスク上のファイルは考慮しないため、既存ファイルと衝突させない場合は name_allocator.NameAllocator を使う。
+    """
+    def __init__(self):
+        self._counts = defaultdict(int)
+
+    def allocate(self, path, base_name, ext):
+        key = (os.path.dirname(path), base_name)
+        self._counts[key] += 1
+        count = self._counts[key]
+        return f"{base_name}_{count}{ext}" if count > 1 else f"{base_name}{ext}"
+
+
+def compose_name(path, created, subfolder, ai_part, options, allocate, format_date=None):
+    """
+    path のファイルの新しいファイル名を返す。連番を付ける場合は allocate(パス, ベース名, 拡張子) が最終的な名前を決める。
+    連番はフォルダごとに数える (別フォルダのファイル同士は名前が衝突しない)。
+    """
+    base_name, ext = os.path.splitext(os.path.basename(path))
+    parts = []
+    if options.add_creation_date and created is not None:
+        parts.append((format_date or _DateFormatter(options.date_format))(created))
+    # サブフォルダ内のファイルは、実際の親フォルダ名を使う
+    folder_name = subfolder.rsplit('/', 1)[-1] if subfolder else options.folder_name_to_add
+    if options.add_folder_name and folder_name:
+        parts.append(folder_name)
+    if ai_part:
+        parts.append(ai_part)
+    if not options.remove_original_name:
+        parts.append(base_name)
+    candidate = '_'.join(filter(None, parts))
+    if not candidate:
+        candidate = base_name if not options.remove_original_name else options.ai_fallback_name
+    return allocate(path, candidate, ext) if options.add_sequence_number else f"{candidate}{ext}"
+
+
+def compose_names(rows, options, allocate=None):
+    """
+    rows (path / created / subfolder / ai_part 属性を持つ行) の新しいファイル名を、行の順に連番を振って返す。
+    API は呼ばず、オプションを変えたときに保存済みの AI の名前部分から組み立て直すのに使う。
+    """
+    allocate = allocate or SequenceCounter().allocate
+    format_date = _DateFormatter(options.date_format)
+    return [compose_name(row.path, row.created, row.subfolder, row.ai_part, options, allocate, format_date) for row in rows]
@@ -0,0 +1,118 @@
+# ==============================================================================
+# file: rate_limiter.py (モデル別レート制御)
+# ==============================================================================
+import datetime
+import threading
+import time
+
+
+class _ModelBucket:
+    """1モデル分のトークンバケットと日次カウンタ。RateLimiter のロック下でのみ操作する。"""
+    def __init__(self, rpm, rpd):
+        self.rpm = rpm
+        self.rpd = rpd
+        self.tokens = 1.0
+        self.last_refill = time.monotonic()
+        self.rate_scale = 1.0
+        self.strikes = 0
+        self.backoff_until = 0.0
+        self.daily_used = 0
+
+    def refill_rate(self, safety_margin):
+        # 1秒あたりに補充するリクエスト数。ResourceExhausted を受けると rate_scale で絞られる
+        return self.rpm * safety_margin * self.rate_scale / 60.0
+
+    def refill(self, now, safety_margin):
+        self.tokens = min(1.0, self.tokens + (now - self.last_refill) * self.refill_rate(safety_margin))
+        self.last_refill = now
+
+    def wait_time(self, now, safety_margin):
+        token_wait = 0.0 if self.tokens >= 1.0 else (1.0 - self.tokens) / self.refill_rate(safety_margin)
+        return max(token_wait, self.backoff_until - now)
+
+
+class RateLimiter:
+    """
+    GEMINI_LIMITS (RPD) と GEMINI_RPM_LIMITS (RPM) に基づき、モデルごとに送信ペースを制御する。
+    複数のワーカースレッドから共有され、acquire() が送信可能になるまで待機する。
+    """
+    SAFETY_MARGIN = 0.9
+    MAX_RETRIES = 5
+    BASE_BACKOFF = 5.0
+    MAX_BACKOFF = 120.0
+    MIN_RATE_SCALE = 0.1
+
+    def __init__(self, rpd_limits, rpm_limits, default_rpd=200, default_rpm=15):
+        self.rpd_limits = rpd_limits
+        self.rpm_limits = rpm_limits
+        self.default_rpd = default_rpd
+        self.default_rpm = default_rpm
+        self._buckets = {}
+        self._current_date = self._gmt_date()
+        self._condition = threading.Condition()
+
+    @staticmethod
+    def _gmt_date():
+        return datetime.datetime.now(datetime.timezone.utc).date()
+
+    def _get_bucket(self, model_name):
+        today = self._gmt_date()
+        if today != self._current_date:
+            self._current_date = today
+            for bucket in self._buckets.values(): bucket.daily_used = 0
+        bucket = self._buckets.get(model_name)
+        if bucket is None:
+            bucket = _ModelBucket(self.rpm_limits.get(model_name, self.default_rpm), self.rpd_limits.get(model_name, self.default_rpd))
+            self._buckets[model_name] = bucket
+        return bucket
+
+    def sync_daily_usage(self, model_name, requests_made):
+        """設定ファイルに記録された本日のリクエスト数を反映する (小さい値で上書きはしない)。"""
+        with self._condition:
+            bucket = self._get_bucket(model_name)
+            bucket.daily_used = max(bucket.daily_used, requests_made)
+
+    def acquire(self, model_name, abort=None, on_wait=None):
+        """
+        1リクエスト分の枠を確保する。確保できれば True を返す。
+        本日の上限 (RPD) に達している場合、または abort() が True になった場合は False を返す。
+        待機が必要な間は on_wait(待ち秒数) を呼び出す。
+        """
+        with self._condition:
+            while True:
+                if abort and abort():
+                    return False
+                bucket = self._get_bucket(model_name)
+                if bucket.daily_used >= bucket.rpd:
+                    return False
+                now = time.monotonic()
+                bucket.refill(now, self.SAFETY_MARGIN)
+                wait = bucket.wait_time(now, self.SAFETY_MARGIN)
+                if wait <= 0:
+                    bucket.tokens -= 1.0
+                    bucket.daily_used += 1
+                    return True
+                if on_wait and wait >= 1.0:
+                    on_wait(wait)
+                # 中断要求に素早く反応できるよう、長い待機は1秒ずつに分ける
+                self._condition.wait(min(wait, 1.0))
+
+    def report_success(self, model_name):
+        with self._condition:
+            bucket = self._get_bucket(model_name)
+            bucket.strikes = 0
+            bucket.rate_scale = min(1.0, bucket.rate_scale + 0.05)
+
+    def report_exhausted(self, model_name):
+        """ResourceExhausted を受けたときに呼ぶ。送信ペースを半分に落とし、指数的に待機する。"""
+        with self._condition:
+            bucket = self._get_bucket(model_name)
+            # 429 で拒否されたリクエストは日次の枠を消費しない
+            bucket.daily_used = max(0, bucket.daily_used - 1)
+            bucket.rate_scale = max(self.MIN_RATE_SCALE, bucket.rate_scale * 0.5)
+            backoff = min(self.MAX_BACKOFF, self.BASE_BACKOFF * (2 ** bucket.strikes))
+            bucket.strikes += 1
+            bucket.tokens = 0.0
+            bucket.backoff_until = max(bucket.backoff_until, time.monotonic() + backoff)
+            print(f"{model_name} のレート制限に達しました。{backoff:.0f}秒待機し、送信ペースを {bucket.rate_scale:.0%} に下げます。")
+            self._condition.notify_all()
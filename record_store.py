@@ -0,0 +1,174 @@
+# ==============================================================================
+# file: record_store.py (一覧の行データを保持するスレッドセーフなストア)
+# ==============================================================================
+import datetime
+import os
+import threading
+
+
+class FileEntry:
+    """一覧の1行分のデータ。大量の行を保持するため __slots__ でメモリを抑える。"""
+    __slots__ = ("path", "name", "new_name", "ai_status", "created", "subfolder", "ai_part", "manual")
+
+    def __init__(self, path, new_name, ai_status, created, subfolder, ai_part="", manual=False):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.new_name = new_name
+        self.ai_status = ai_status
+        self.created = created  # 作成日時のタイムスタンプ
+        self.subfolder = subfolder
+        self.ai_part = ai_part  # AI が返した名前の部分 (空なら未提案)
+        self.manual = manual  # 提案名を手動で編集した (オプション変更で組み立て直さない)
+
+    @classmethod
+    def from_record(cls, path, record):
+        """file_index.FileRecord から作る。"""
+        return cls(path, record.new_name, record.ai_status, record.created, record.subfolder, record.ai_part, bool(record.manual))
+
+    def copy(self):
+        return FileEntry(self.path, self.new_name, self.ai_status, self.created, self.subfolder, self.ai_part, self.manual)
+
+    @property
+    def creation_dt(self):
+        return datetime.datetime.fromtimestamp(self.created)
+
+    def display_values(self):
+        """一覧の表示列 (現在の名前, 新しい名前, AIステータス, 作成日時, サブフォルダ) の値。"""
+        return (self.name, self.new_name, self.ai_status, self.creation_dt.strftime("%Y-%m-%d %H:%M:%S"), self.subfolder)
+
+    def _fields(self):
+        return (self.path, self.new_name, self.ai_status, self.created, self.subfolder, self.ai_part, self.manual)
+
+    def __eq__(self, other):
+        return isinstance(other, FileEntry) and self._fields() == other._fields()
+
+
+class RecordStore:
+    """
+    AppLogic が持つ一覧の行データ。行の追加・削除・入れ替えはメインスレッドで行い、
+    ワーカースレッドは get / get_many / update で lock の中から読み書きする。
+    表示側 (VirtualFileList) には __len__ / key_at / values_range / index_of を提供する。
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+        self._entries = []
+        self._index = {}
+
+    # --- 表示用 ---
+    def __len__(self):
+        return len(self._entries)
+
+    def key_at(self, index):
+        with self.lock:
+            return self._entries[index].path
+
+    def keys_at(self, indices):
+        with self.lock:
+            return [self._entries[i].path for i in indices]
+
+    def values_range(self, start, stop):
+        with self.lock:
+            return [entry.display_values() for entry in self._entries[start:stop]]
+
+    def index_of(self, path):
+        with self.lock:
+            return self._index.get(path)
+
+    # --- 読み書き (どのスレッドからでも呼べる) ---
+    def get(self, path):
+        """行のコピーを返す。存在しなければ None。"""
+        with self.lock:
+            index = self._index.get(path)
+            return self._entries[index].copy() if index is not None else None
+
+    def get_many(self, paths):
+        with self.lock:
+            return [self._entries[self._index[path]].copy() for path in paths if path in self._index]
+
+    def update(self, path, **fields):
+        """指定した列を書き換える。行がすでに削除されていれば False。"""
+        with self.lock:
+            index = self._index.get(path)
+            if index is None: return False
+            entry = self._entries[index]
+            for name, value in fields.items():
+                setattr(entry, name, value)
+            return True
+
+    def suggestions_in(self, directories):
+        """directories (フォルダの集合) 直下のファイルの提案名を {フォルダ: [(path, new_name)]} で返す。"""
+        suggestions = {}
+        with self.lock:
+            for entry in self._entries:
+                if not entry.new_name: continue
+                directory = os.path.dirname(entry.path)
+                if directory in directories: suggestions.setdefault(directory, []).append((entry.path, entry.new_name))
+        return suggestions
+
+    def recompose_names(self, compose):
+        """
+        AI の名前部分があり、手動で編集されていない行の new_name を compose(行のリスト) が返す名前で置き換える。
+        変わった (path, new_name) のリストを返す。
+        """
+        with self.lock:
+            targets = [entry for entry in self._entries if entry.ai_part and not entry.manual]
+            changed = []
+            for entry, new_name in zip(targets, compose(targets)):
+                if entry.new_name != new_name:
+                    entry.new_name = new_name
+                    changed.append((entry.path, new_name))
+            return changed
+
+    # --- 行の追加・削除 (メインスレッドから呼ぶ) ---
+    def upsert(self, entries):
+        """行を追加し、同じパスの行は置き換える。(内容が変わった行数, 追加前の行数) を返す。"""
+        with self.lock:
+            old_count = len(self._entries)
+            changed = 0
+            for entry in entries:
+                index = self._index.get(entry.path)
+                if index is None:
+                    self._index[entry.path] = len(self._entries)
+                    self._entries.append(entry)
+                    changed += 1
+                elif self._entries[index] != entry:
+                    self._entries[index] = entry
+                    changed += 1
+            return changed, old_count
+
+    def replace(self, old_path, entry):
+        """
+        old_path の行を同じ位置で entry に置き換える。old_path がなければ None。
+        entry のパスの行がほかにあれば (上書きされたファイル) 削除し、その行番号のリストを返す。
+        """
+        replaced, removed = self.replace_many([(old_path, entry)])
+        return removed if replaced else None
+
+    def replace_many(self, replacements):
+        """
+        [(旧パス, entry)] をまとめて置き換える。入れ替え (A→B, B→A) や連鎖 (A→B, B→C) も1度に反映できる。
+        (置き換えた旧パスのリスト, 上書きされて削除した行番号のリスト) を返す。
+        """
+        with self.lock:
+            replacements = [(old_path, entry) for old_path, entry in replacements if old_path in self._index]
+            moving = {old_path for old_path, _ in replacements}
+            removed = self.delete([entry.path for _, entry in replacements if entry.path not in moving])
+            positions = [(self._index.pop(old_path), entry) for old_path, entry in replacements]
+            for index, entry in positions:
+                self._index[entry.path] = index
+                self._entries[index] = entry
+            return [old_path for old_path, _ in replacements], removed
+
+    def delete(self, paths):
+        """行を削除し、削除した行番号を昇順で返す。"""
+        with self.lock:
+            removed = sorted(self._index[path] for path in set(paths) if path in self._index)
+            if not removed: return removed
+            removed_set = set(removed)
+            self._entries = [entry for i, entry in enumerate(self._entries) if i not in removed_set]
+            self._index = {entry.path: i for i, entry in enumerate(self._entries)}
+            return removed
+
+    def clear(self):
+        with self.lock:
+            self._entries, self._index = [], {}
@@ -0,0 +1,309 @@
+# ==============================================================================
+# file: rename_planner.py (一括リネームの計画・実行・中断からの復旧)
+# ==============================================================================
+import errno
+import json
+import os
+import sys
+import threading
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# source を target に移動する1手順。group が同じ手順は順番どおりに実行し、失敗したらまとめて元に戻す
+RenameStep = namedtuple("RenameStep", "source target group")
+# steps: 実行する手順 (一時名への退避を含む) / renames: 最終的な (旧パス, 新パス) / conflicts: (旧パス, 新しい名前, 理由)
+RenamePlan = namedtuple("RenamePlan", "steps renames conflicts")
+
+JOURNAL_FILE_NAME = "rename_journal.jsonl"
+# execute_plan で1つのタスクにまとめる group の数
+EXECUTE_CHUNK_GROUPS = 64
+
+# 競合の理由
+INVALID_NAME = "invalid_name"
+MISSING_SOURCE = "missing_source"
+DUPLICATE_TARGET = "duplicate_target"
+TARGET_EXISTS = "target_exists"
+LISTING_FAILED = "listing_failed"  # フォルダを読めず、既存ファイルとの競合を確認できない
+
+
+def _key(path):
+    return os.path.normcase(path)
+
+
+def _is_valid_name(name):
+    return bool(name) and name not in (".", "..") and "/" not in name and os.sep not in name and "\0" not in name
+
+
+def _move_no_replace(source, target):
+    """
+    source を target に移動する。target が既にあれば FileExistsError (既存のファイルは上書きしない)。
+    POSIX の os.rename は移動先を黙って置き換えるため、ハードリンクを作ってから元の名前を消す。
+    """
+    if sys.platform == "win32":
+        os.rename(source, target)  # Windows の os.rename は移動先があれば FileExistsError になる
+        return
+    try:
+        os.link(source, target, follow_symlinks=False)
+    except FileExistsError:
+        # ★修正: リンクを作った直後に中断された手順の再実行だけ、元の名前を消して完了させる。
+        # 大文字小文字を区別しないファイルシステムでは target が source 自身を指すため、
+        # 同じファイルかどうかではなく、両方の名前がフォルダに別々に存在するかで判断する
+        if not _is_leftover_link(source, target): raise
+    except OSError as e:
+        if e.errno not in (errno.EPERM, errno.EXDEV, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK, errno.ENOSYS):
+            raise
+        # ハードリンクを作れないファイルシステム (FAT・一部のネットワーク共有) では、直前に確認してから移動する
+        if os.path.lexists(target): raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), target)
+        os.rename(source, target)
+        return
+    os.unlink(source)
+
+
+def _is_leftover_link(source, target):
+    try:
+        names = os.listdir(os.path.dirname(target))
+        return (os.path.basename(source) in names and os.path.basename(target) in names
+                and os.lstat(source).st_nlink > 1 and os.path.samefile(source, target))
+    except OSError:
+        return False
+
+
+def _differs_only_in_case(source, target):
+    return source != target and os.path.basename(source).casefold() == os.path.basename(target).casefold()
+
+
+def _temp_path(directory, name, listing):
+    while True:
+        candidate = os.path.join(directory, f".{name}.{uuid.uuid4().hex[:8]}.renaming")
+        if _key(os.path.basename(candidate)) not in listing: return candidate
+
+
+class _Move:
+    __slots__ = ("source", "target")
+
+    def __init__(self, source, target):
+        self.source, self.target = source, target
+
+
+def plan_renames(requests, listdir=os.listdir):
+    """
+    requests は (旧パス, 新しいファイル名) のリスト。バッチ内と既存ファイルの両方との競合を調べ、
+    A→B と B→C のような連鎖は後ろから、A→B と B→A のような循環は一時名を経由して実行する手順を作る。
+    フォルダの中身は listdir でフォルダごとに1回だけ読む。
+    """
+    listings, conflicts, moves = {}, [], []
+    by_target = {}
+    for source, new_name in requests:
+        directory = os.path.dirname(source)
+        if directory not in listings:
+            try: listings[directory] = {_key(name) for name in listdir(directory)}
+            except OSError as e:
+                print(f"フォルダを読み込めないため、リネームをスキップします: {directory}: {e}")
+                listings[directory] = None
+        if listings[directory] is None:
+            conflicts.append((source, new_name, LISTING_FAILED)); continue
+        if not _is_valid_name(new_name):
+            conflicts.append((source, new_name, INVALID_NAME)); continue
+        if new_name == os.path.basename(source): continue  # 変更なし
+        if _key(os.path.basename(source)) not in listings[directory]:
+            conflicts.append((source, new_name, MISSING_SOURCE)); continue
+        target = os.path.join(directory, new_name)
+        if _key(target) in by_target:
+            conflicts.append((source, new_name, DUPLICATE_TARGET)); continue
+        move = _Move(source, target)
+        by_target[_key(target)] = move
+        moves.append(move)
+
+    # 移動先に残るファイルがある手順を除く。除いた手順の移動元も残るため、そこへ移動する手順も連鎖的に除く
+    by_source = {_key(move.source): move for move in moves}
+    pending = [move for move in moves if _key(move.target) not in by_source and _key(os.path.basename(move.target)) in listings[os.path.dirname(move.target)]]
+    while pending:
+        move = pending.pop()
+        if by_source.pop(_key(move.source), None) is None: continue
+        del by_target[_key(move.target)]
+        conflicts.append((move.source, os.path.basename(move.target), TARGET_EXISTS))
+        blocked = by_target.get(_key(move.source))
+        if blocked is not None: pending.append(blocked)
+    moves = [move for move in moves if _key(move.source) in by_source]
+
+    steps, visited = [], set()
+    # 連鎖: 誰の移動先にもなっていない手順から辿り、移動先が空いている末尾から実行する
+    for head in moves:
+        if _key(head.source) in by_target: continue
+        chain, move = [], head
+        while move is not None:
+            chain.append(move); visited.add(id(move))
+            move = by_source.get(_key(move.target))
+        group = len(steps)
+        for move in reversed(chain):
+            if _differs_only_in_case(move.source, move.target):
+                # ★修正: 大文字小文字だけの変更は、区別しないファイルシステムでも移動先が自分自身にならないよう一時名を経由する
+                directory = os.path.dirname(move.source)
+                temp = _temp_path(directory, os.path.basename(move.source), listings[directory])
+                steps.extend((RenameStep(move.source, temp, group), RenameStep(temp, move.target, group)))
+            else:
+                steps.append(RenameStep(move.source, move.target, group))
+    # 循環: 先頭を一時名に退避してから残りを逆順に移動し、最後に一時名から移動する (大文字小文字を区別しない OS では、大文字小文字だけの変更もここに含まれる)
+    for start in moves:
+        if id(start) in visited: continue
+        cycle, move = [], start
+        while id(move) not in visited:
+            cycle.append(move); visited.add(id(move))
+            move = by_source[_key(move.target)]
+        group = len(steps)
+        directory = os.path.dirname(start.source)
+        temp = _temp_path(directory, os.path.basename(start.source), listings[directory])
+        steps.append(RenameStep(start.source, temp, group))
+        steps.extend(RenameStep(move.source, move.target, group) for move in reversed(cycle[1:]))
+        steps.append(RenameStep(temp, start.target, group))
+
+    renames = [(move.source, move.target) for move in moves]
+    return RenamePlan(steps, renames, conflicts)
+
+
+class RenameJournal:
+    """
+    リネームの先行書き込みジャーナル。実行前に全手順を書き出し、完了した手順を1行ずつ追記する。
+    異常終了で残っていた場合は、次回起動時に続きを実行するか元に戻せる。
+    """
+    def __init__(self, config_dir):
+        self.path = os.path.join(config_dir, JOURNAL_FILE_NAME)
+        self._file = None
+
+    def begin(self, steps):
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write(json.dumps({"steps": [list(step) for step in steps]}, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def resume(self):
+        """load() で読み込んだジャーナルに続けて記録する。"""
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def mark(self, index, done=True):
+        self._file.write(json.dumps({"done" if done else "undone": index}) + "\n")
+        self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        """全手順が完了したか元に戻せたときに呼び、ジャーナルを削除する。"""
+        self.close()
+        try: os.remove(self.path)
+        except FileNotFoundError: pass
+
+    def load(self):
+        """中断されたジャーナルがあれば (手順のリスト, 完了した手順番号の集合) を返す。なければ None。"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return None
+        try:
+            steps = [RenameStep(*step) for step in json.loads(lines[0])["steps"]]
+        except (IndexError, ValueError, KeyError, TypeError):
+            self.finish()  # 手順の書き出し前に終了したため、まだ何も移動していない
+            return None
+        done = set()
+        for line in lines[1:]:
+            try: mark = json.loads(line)
+            except ValueError: continue
+            if "done" in mark: done.add(mark["done"])
+            elif "undone" in mark: done.discard(mark["undone"])
+        # 移動した直後に記録する前に終了した手順は、移動元がなく移動先があれば完了とみなす
+        for index, step in enumerate(steps):
+            if index not in done and not os.path.lexists(step.source) and os.path.lexists(step.target):
+                done.add(index)
+        return steps, done
+
+
+def _run_groups(groups, journal, done, lock):
+    """group ごとの手順 [(番号, 手順)] を順に実行し、[(失敗した手順, 例外)] と実行した手順数を返す。"""
+    failed, count = [], 0
+    for items in groups:
+        completed = []
+        for index, step in items:
+            if index in done: completed.append((index, step)); continue
+            count += 1
+            try:
+                # 存在確認は行わず (ネットワーク共有では1回ごとに往復が発生する)、計画後に現れたファイルも上書きしない
+                _move_no_replace(step.source, step.target)
+            except OSError as e:
+                failed.append((step, e))
+                rollback(completed, journal, done, lock)
+                break
+            completed.append((index, step))
+            with lock:
+                done.add(index)
+                journal.mark(index)
+    return failed, count
+
+
+def execute_plan(steps, journal, done=None, workers=1, progress=None):
+    """
+    手順を実行する。連鎖・循環ごとの group は順番どおりに、別の group はフォルダごとにまとめて workers 個のスレッドで並行に実行する。
+    失敗した手順があれば、同じ group で完了済みの手順を逆順に戻して残りを飛ばす。
+    progress(実行した手順数, 全手順数) は呼び出したスレッドで呼ばれる。
+    (完了した手順番号の集合, [(失敗した手順, 例外)]) を返す。
+    """
+    done = set(done or ())
+    lock = threading.Lock()
+    groups = {}
+    for index, step in enumerate(steps):
+        groups.setdefault(step.group, []).append((index, step))
+    by_directory = {}
+    for items in groups.values():
+        by_directory.setdefault(os.path.dirname(items[0][1].source), []).append(items)
+    # 1つのタスクが大きくなりすぎないよう、フォルダごとの group を一定数ずつに分ける
+    chunks = [groups_in_dir[i:i + EXECUTE_CHUNK_GROUPS] for groups_in_dir in by_directory.values() for i in range(0, len(groups_in_dir), EXECUTE_CHUNK_GROUPS)]
+    total = sum(1 for index in range(len(steps)) if index not in done)
+    failed, finished = [], 0
+    if workers <= 1 or len(chunks) <= 1:
+        for chunk in chunks:
+            chunk_failed, count = _run_groups(chunk, journal, done, lock)
+            failed.extend(chunk_failed); finished += count
+            if progress: progress(finished, total)
+        return done, failed
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rename") as executor:
+        for future in as_completed([executor.submit(_run_groups, chunk, journal, done, lock) for chunk in chunks]):
+            chunk_failed, count = future.result()
+            failed.extend(chunk_failed); finished += count
+            if progress: progress(finished, total)
+    return done, failed
+
+
+def rollback(indexed_steps, journal, done, lock=None):
+    """完了済みの手順 [(番号, 手順)] を逆順に元へ戻す。"""
+    for index, step in reversed(indexed_steps):
+        try:
+            _move_no_replace(step.target, step.source)
+        except OSError as e:
+            print(f"リネームを元に戻せませんでした: {step.target} -> {step.source}: {e}")
+            continue
+        if lock is not None: lock.acquire()
+        try:
+            done.discard(index)
+            journal.mark(index, done=False)
+        finally:
+            if lock is not None: lock.release()
+
+
+def completed_renames(plan, done):
+    """全手順が完了した group の最終的な (旧パス, 新パス) を返す。"""
+    incomplete = {step.group for index, step in enumerate(plan.steps) if index not in done}
+    group_of = {}
+    for step in plan.steps:
+        group_of.setdefault(_key(step.target), step.group)
+    return [(source, target) for source, target in plan.renames if group_of.get(_key(target)) not in incomplete]
+
+
+def is_settled(steps, done):
+    """どの group も全手順が完了しているか、1つも完了していなければ True (ジャーナルを消してよい)。"""
+    groups = {}
+    for index, step in enumerate(steps):
+        groups.setdefault(step.group, set()).add(index in done)
+    return all(len(states) == 1 for states in groups.values())
@@ -0,0 +1,54 @@
+# ==============================================================================
+# file: startup_timer.py (起動時間の計測)
+# ==============================================================================
+import os
+import sys
+import time
+
+STARTUP_TIMING_FLAG = "--startup-timing"
+STARTUP_TIMING_ENV = "TAGCLERIC_STARTUP_TIMING"
+# 最初のウィンドウが表示されるまでの目安 (ミリ秒)。超えた場合は警告を表示する
+STARTUP_BUDGET_MS = 1500
+
+
+class StartupTimer:
+    """
+    起動の段階ごと (モジュールの読み込み・設定の読み込み・画面の構築・最初の表示など) の所要時間を記録する。
+    起動オプション --startup-timing か環境変数 TAGCLERIC_STARTUP_TIMING=1 のときだけ有効になり、無効なら何もしない。
+    """
+    def __init__(self, enabled, started=None):
+        self.enabled = enabled
+        self._started = self._last = started if started is not None else time.perf_counter()
+        self.phases = []  # [(段階, 秒)]
+        self.budget_phase = None  # ここまでの合計を STARTUP_BUDGET_MS と比べる
+
+    @classmethod
+    def from_environment(cls, argv=None, started=None):
+        argv = sys.argv if argv is None else argv
+        enabled = STARTUP_TIMING_FLAG in argv or os.environ.get(STARTUP_TIMING_ENV, "") not in ("", "0")
+        return cls(enabled, started)
+
+    def mark(self, phase, budget=False):
+        """直前の mark からここまでを phase の所要時間として記録する。budget=True の段階までを起動時間の目安と比べる。"""
+        if not self.enabled: return
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+        if budget: self.budget_phase = phase
+
+    def report(self):
+        """各段階の所要時間を表示する。"""
+        if not self.enabled: return
+        lines, elapsed, budget_elapsed = ["起動時間の内訳:"], 0.0, None
+        for phase, seconds in self.phases:
+            elapsed += seconds
+            lines.append(f"  {phase:<24}{seconds * 1000:8.1f} ms (累計 {elapsed * 1000:8.1f} ms)")
+            if phase == self.budget_phase: budget_elapsed = elapsed
+        if budget_elapsed is not None and budget_elapsed * 1000 > STARTUP_BUDGET_MS:
+            lines.append(f"警告: ウィンドウの表示までに {budget_elapsed * 1000:.0f} ms かかりました (目安 {STARTUP_BUDGET_MS} ms)。")
+        text = "\n".join(lines)
+        print(text)
+        # ログビューアに切り替えた後でも、コンソールから起動した場合は端末で確認できるようにする
+        if sys.__stderr__ is not None and sys.stdout is not sys.__stdout__:
+            try: sys.__stderr__.write(text + "\n")
+            except Exception: pass
@@ -0,0 +1,96 @@
+# ==============================================================================
+# file: suggestion_cache.py (AI提案の永続キャッシュ)
+# ==============================================================================
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+class SuggestionCache:
+    """
+    画像ペイロード・モデル・言語・プロンプトのハッシュをキーに、Geminiの提案名を保存する。
+    設定ディレクトリ内のSQLiteに保存し、合計サイズが上限を超えたら古いものから削除する。
+    """
+    def __init__(self, config_dir, max_bytes=20 * 1024 * 1024, filename="suggestion_cache.sqlite3"):
+        self.db_path = os.path.join(config_dir, filename)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self._conn = None
+        try:
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("CREATE TABLE IF NOT EXISTS suggestions (key TEXT PRIMARY KEY, ai_part TEXT NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_suggestions_last_access ON suggestions (last_access)")
+            self._conn.commit()
+            self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM suggestions").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"AI提案キャッシュを開けませんでした: {e}")
+            self._conn = None
+
+    @staticmethod
+    def make_key(image_bytes, model_name, language_mode, prompt):
+        digest = hashlib.sha256(image_bytes)
+        for part in (model_name, language_mode, prompt):
+            digest.update(b"\0" + str(part).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key):
+        if self._conn is None: return None
+        with self._lock:
+            try:
+                row = self._conn.execute("SELECT ai_part FROM suggestions WHERE key = ?", (key,)).fetchone()
+                if row:
+                    self._conn.execute("UPDATE suggestions SET last_access = ? WHERE key = ?", (time.time(), key))
+                    self._conn.commit()
+                return row[0] if row else None
+            except sqlite3.Error as e:
+                print(f"AI提案キャッシュの読み込みエラー: {e}")
+                return None
+
+    def put(self, key, ai_part):
+        if self._conn is None or not ai_part: return
+        size = len(key) + len(ai_part.encode("utf-8"))
+        with self._lock:
+            try:
+                old = self._conn.execute("SELECT size FROM suggestions WHERE key = ?", (key,)).fetchone()
+                self._conn.execute("INSERT OR REPLACE INTO suggestions (key, ai_part, size, last_access) VALUES (?, ?, ?, ?)", (key, ai_part, size, time.time()))
+                self._total_bytes += size - (old[0] if old else 0)
+                if self._total_bytes > self.max_bytes:
+                    self._evict()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"AI提案キャッシュの書き込みエラー: {e}")
+
+    def _evict(self):
+        # 上限の9割まで、最終アクセスが古いものから削除する
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute("SELECT key, size FROM suggestions ORDER BY last_access").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._total_bytes <= target: break
+            evicted.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM suggestions WHERE key = ?", evicted)
+        print(f"AI提案キャッシュが上限に達したため、{len(evicted)}件の古いエントリを削除しました。")
+
+    def clear(self):
+        if self._conn is None: return 0
+        with self._lock:
+            try:
+                count = self._conn.execute("SELECT COUNT(*) FROM suggestions").fetchone()[0]
+                self._conn.execute("DELETE FROM suggestions")
+                self._conn.commit()
+                self._conn.execute("VACUUM")
+                self._total_bytes = 0
+                return count
+            except sqlite3.Error as e:
+                print(f"AI提案キャッシュの削除エラー: {e}")
+                return 0
+
+    def close(self):
+        if self._conn is None: return
+        with self._lock:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,313 @@
+# ==============================================================================
+# file: tagcleric_cli.py (画面を使わないコマンドライン版)
+# ==============================================================================
+"""
+サーバーなど画面のない環境で、フォルダ内の画像・動画にまとめて名前を提案し、必要ならリネームする。
+tkinter / tkinterdnd2 は読み込まない。設定 (API キー・モデル・プロンプト・使用量) は画面版と同じ設定フォルダを使う。
+
+    python tagcleric_cli.py <フォルダ> [--prompt テンプレート名] [--model モデル] [--apply] ...
+
+結果は1件1行の JSON (JSON Lines) で標準出力に書き出し、ログは標準エラーに出す。
+終了コード: 0 成功 / 1 一部のファイルで失敗 / 2 引数・設定の誤り / 3 API の上限に到達 / 130 中断
+"""
+import argparse
+import configparser
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import get_config_dir, resource_path
+from file_system_handler import FileSystemHandler
+from google_drive_handler import GoogleAIApiHandler, GEMINI_MODELS, GEMINI_RPD_LIMITS, GEMINI_RPM_LIMITS
+from rate_limiter import RateLimiter
+from suggestion_cache import SuggestionCache
+from usage_ledger import UsageLedger
+from naming import NamingOptions, compose_name
+from name_allocator import NameAllocator
+from image_preprocessor import prepare_ai_payload
+import rename_planner
+
+EXIT_OK = 0
+EXIT_PARTIAL = 1
+EXIT_USAGE = 2
+EXIT_QUOTA = 3
+EXIT_INTERRUPTED = 130
+
+API_KEY_ENV = "TAGCLERIC_API_KEY"
+DEFAULT_FILE_TYPES = ".jpg,.png,.jpeg,.gif,.bmp,.webp,.mp4,.mov,.avi"
+LANGUAGE_MODES = {"ja": "日本語", "en": "English"}
+
+# 提案の結果 (JSON の status)
+SUGGESTED = "suggested"
+CACHED = "cached"
+FALLBACK = "fallback"  # API がエラーを返したため代替名を使った
+IMAGE_ERROR = "image_error"
+UNSUPPORTED = "unsupported"
+QUOTA_EXCEEDED = "quota_exceeded"
+SKIPPED = "skipped"
+FAILED_STATUSES = (FALLBACK, IMAGE_ERROR, UNSUPPORTED)
+
+
+class JsonLinesWriter:
+    """どのスレッドから書いても1件が1行にまとまるように、ロックを取って書き出す。"""
+    def __init__(self, stream):
+        self._stream = stream
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        line = json.dumps({"event": event, **fields}, ensure_ascii=False)
+        with self._lock:
+            self._stream.write(line + "\n")
+            self._stream.flush()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="tagcleric_cli", description="フォルダ内の画像・動画に Gemini で名前を提案し、JSON Lines で出力します。")
+    parser.add_argument("folder", help="対象のフォルダ")
+    parser.add_argument("--apply", action="store_true", help="提案した名前で実際にリネームする (省略時は提案のみ)")
+    parser.add_argument("--prompt", help="rename_prompts.txt のテンプレート名 (省略時は先頭のテンプレート)")
+    parser.add_argument("--prompt-text", help="テンプレートの代わりに使うプロンプト")
+    parser.add_argument("--model", help=f"Gemini のモデル (省略時は設定ファイルの値。例: {', '.join(GEMINI_MODELS)})")
+    parser.add_argument("--language", choices=sorted(LANGUAGE_MODES), default="ja", help="提案する名前の言語")
+    parser.add_argument("--config-dir", help="設定フォルダ (省略時は画面版と同じ場所)")
+    scan = parser.add_argument_group("走査")
+    scan.add_argument("--types", default=DEFAULT_FILE_TYPES, help="対象の拡張子 (カンマ区切り)")
+    scan.add_argument("--recursive", action="store_true", help="サブフォルダも対象にする")
+    scan.add_argument("--max-depth", type=int, default=0, help="サブフォルダの階層の上限 (0 は無制限)")
+    scan.add_argument("--include", action="append", default=[], help="対象にする glob パターン (複数指定可)")
+    scan.add_argument("--exclude", action="append", default=[], help="除外する glob パターン (複数指定可)")
+    naming = parser.add_argument_group("命名")
+    naming.add_argument("--no-date", action="store_true", help="作成日時を付けない")
+    naming.add_argument("--date-format", default="%Y%m%d", help="作成日時の書式 (strftime)")
+    naming.add_argument("--keep-original-name", action="store_true", help="元のファイル名を残す")
+    naming.add_argument("--folder-name", help="名前にフォルダ名を付ける (サブフォルダ内のファイルは実際の親フォルダ名)")
+    naming.add_argument("--no-sequence", action="store_true", help="重複する名前に連番を付けない")
+    naming.add_argument("--fallback-name", default="AI_Unknown", help="AI が名前を返さなかったときの名前")
+    performance = parser.add_argument_group("性能")
+    performance.add_argument("--workers", type=int, help="同時に送信する Gemini リクエスト数 (省略時は設定ファイルの値)")
+    performance.add_argument("--rename-workers", type=int, help="リネームを並行して行うスレッド数 (省略時は設定ファイルの値)")
+    return parser
+
+
+def load_prompt(config_dir, template_name, prompt_text):
+    """プロンプトを返す。テンプレートが見つからなければ ValueError。"""
+    if prompt_text: return prompt_text
+    prompts_path = os.path.join(config_dir, "rename_prompts.txt")
+    if not os.path.exists(prompts_path): prompts_path = resource_path("rename_prompts.txt")
+    with open(prompts_path, encoding="utf-8") as f:
+        templates = json.load(f)
+    if template_name is None: return next(iter(templates.values()))
+    if template_name not in templates:
+        raise ValueError(f"プロンプトのテンプレート '{template_name}' が見つかりません。使用できるもの: {', '.join(templates)}")
+    return templates[template_name]
+
+
+def _created_of(stat):
+    # 画面版 (AppLogic._build_record) と同じく作成日時を使い、取得できなければ更新日時を使う
+    for timestamp in (stat.st_ctime, stat.st_mtime):
+        try:
+            datetime.datetime.fromtimestamp(timestamp)
+            return timestamp
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+class BatchRunner:
+    """画面版の AppLogic と同じ部品 (レート制御・提案キャッシュ・使用量ジャーナル・命名・リネーム計画) で一括処理する。"""
+    def __init__(self, args, settings, config_dir, writer):
+        self.args = args
+        self.writer = writer
+        self.config_dir = config_dir
+        self.model_name = args.model or settings.get('Settings', 'GeminiModel', fallback=GEMINI_MODELS[0])
+        self.language_mode = LANGUAGE_MODES[args.language]
+        self.prompt = load_prompt(config_dir, args.prompt, args.prompt_text)
+        self.workers = max(1, min(16, args.workers or settings.getint('Performance', 'MaxConcurrentRequests', fallback=4)))
+        self.rename_workers = max(1, min(32, args.rename_workers or settings.getint('Performance', 'RenameWorkers', fallback=8)))
+        self.options = NamingOptions(not args.no_date, args.date_format, not args.keep_original_name, args.folder_name is not None,
+                                     (args.folder_name or "").strip(), args.fallback_name, not args.no_sequence)
+        self.rate_limiter = RateLimiter(GEMINI_RPD_LIMITS, GEMINI_RPM_LIMITS)
+        self.suggestion_cache = SuggestionCache(config_dir, max_bytes=settings.getint('Performance', 'SuggestionCacheMaxMB', fallback=20) * 1024 * 1024)
+        # 使用量はジャーナルに追記するだけにし、config.ini は画面版に任せる (次回起動時にジャーナルから反映される)
+        self.usage_ledger = UsageLedger(config_dir)
+        self.usage_ledger.load(settings.get('TokenUsage', 'last_reset_date_gmt', fallback=''), settings.getint('TokenUsage', 'total_tokens_used', fallback=0),
+                               settings.getint('TokenUsage', 'daily_requests_made', fallback=0), settings.getint('TokenUsage', 'journal_offset', fallback=0))
+        self.usage_ledger.reset_if_new_day()
+        self.rate_limiter.sync_daily_usage(self.model_name, self.usage_ledger.daily_requests)
+        self.ai_handler = None
+        self.cancel_event = threading.Event()
+        self.stop_event = threading.Event()  # 本日の上限に達したら以降のリクエストを送らない
+
+    def close(self):
+        self.suggestion_cache.close()
+        self.usage_ledger.close()
+
+    def scan(self):
+        """対象ファイルの [(パス, 作成日時, サブフォルダ)] をパス順に返す。"""
+        args = self.args
+        root = os.path.abspath(args.folder)
+        extensions = [ext.strip().lower() for ext in args.types.split(',') if ext.strip()]
+        files = []
+        for batch in FileSystemHandler().scan_files(root, extensions, recursive=args.recursive, max_depth=max(0, args.max_depth),
+                                                    include_patterns=args.include, exclude_patterns=args.exclude):
+            for entry in batch:
+                try: created = _created_of(entry.stat())
+                except OSError as e:
+                    print(f"ファイル情報の取得エラー {entry.path}: {e}")
+                    continue
+                subfolder = os.path.relpath(os.path.dirname(entry.path), root)
+                files.append((entry.path, created, "" if subfolder == os.curdir else subfolder.replace(os.sep, '/')))
+        files.sort()
+        return files
+
+    def _call_gemini(self, image_bytes):
+        """AppLogic._call_gemini と同じく RPM/RPD を守って送信し、(ai_part, success)。上限に達したら None。"""
+        should_abort = lambda: self.cancel_event.is_set() or self.stop_event.is_set()
+        for _ in range(self.rate_limiter.MAX_RETRIES + 1):
+            if not self.rate_limiter.acquire(self.model_name, abort=should_abort, on_wait=lambda seconds: print(f"API の制限のため {round(seconds)} 秒待機します。")):
+                break
+            started = time.monotonic()
+            ai_part, success, tokens_used = self.ai_handler.generate_name_from_image(image_bytes, self.prompt, self.language_mode)
+            if ai_part == "QUOTA_EXCEEDED":
+                self.rate_limiter.report_exhausted(self.model_name)
+                continue
+            self.rate_limiter.report_success(self.model_name)
+            if success: self.usage_ledger.record(self.model_name, tokens_used, time.monotonic() - started)
+            return ai_part, success
+        if not self.cancel_event.is_set(): self.stop_event.set()
+        return None
+
+    def suggest(self, path):
+        """ワーカースレッドで実行し、(status, ai_part, error) を返す。"""
+        if self.cancel_event.is_set() or self.stop_event.is_set(): return SKIPPED, None, None
+        try:
+            image_bytes, _ = prepare_ai_payload(path)
+        except Exception as e:
+            return IMAGE_ERROR, None, str(e)
+        if not image_bytes: return UNSUPPORTED, None, None
+        cache_key = SuggestionCache.make_key(image_bytes, self.model_name, self.language_mode, self.prompt)
+        cached_part = self.suggestion_cache.get(cache_key)
+        if cached_part: return CACHED, cached_part, None
+        result = self._call_gemini(image_bytes)
+        if result is None:
+            return (SKIPPED if self.cancel_event.is_set() else QUOTA_EXCEEDED), None, None
+        ai_part, success = result
+        if not success: return FALLBACK, self.options.ai_fallback_name, ai_part
+        self.suggestion_cache.put(cache_key, ai_part)
+        return SUGGESTED, ai_part, None
+
+    def run_suggestions(self, files):
+        """提案をパス順に出力し、リネームする (旧パス, 新しい名前) のリストと状態ごとの件数を返す。代替名になったファイルはリネームしない。"""
+        allocator = NameAllocator()
+        renames, counts = [], {}
+        pending = deque()
+        iterator = iter(files)
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="gemini") as executor:
+            try:
+                while True:
+                    # 送信中の件数を抑え、結果はパス順に反映して連番を決定的に保つ
+                    while len(pending) < self.workers * 2:
+                        item = next(iterator, None)
+                        if item is None: break
+                        pending.append((item, executor.submit(self.suggest, item[0])))
+                    if not pending: break
+                    (path, created, subfolder), future = pending.popleft()
+                    status, ai_part, error = future.result()
+                    counts[status] = counts.get(status, 0) + 1
+                    fields = {"path": path, "status": status}
+                    if ai_part:
+                        new_name = compose_name(path, created, subfolder, ai_part, self.options, allocator.allocate)
+                        fields.update(ai_part=ai_part, new_name=new_name)
+                        # ★修正: 代替名は元の名前を失うため出力するだけにし、リネームはしない
+                        if status in (SUGGESTED, CACHED): renames.append((path, new_name))
+                    if error: fields["error"] = error
+                    self.writer.emit("suggestion", **fields)
+            except BaseException:
+                self.cancel_event.set()
+                for _, future in pending: future.cancel()
+                raise
+        return renames, counts
+
+    def apply_renames(self, renames):
+        """リネームを実行し、(リネームした件数, 失敗・競合の件数) を返す。中断された手順は画面版の起動時に復旧できる。"""
+        plan = rename_planner.plan_renames(renames)
+        for source, new_name, reason in plan.conflicts:
+            self.writer.emit("conflict", path=source, new_name=new_name, reason=reason)
+        requested = sum(1 for source, new_name in renames if new_name != os.path.basename(source))
+        if not plan.steps: return 0, requested
+        journal = rename_planner.RenameJournal(self.config_dir)
+        journal.begin(plan.steps)
+        started = time.monotonic()
+        done, failed = rename_planner.execute_plan(plan.steps, journal, workers=self.rename_workers)
+        if rename_planner.is_settled(plan.steps, done): journal.finish()
+        else: journal.close()
+        for step, error in failed:
+            self.writer.emit("rename_failed", path=step.source, target=step.target, error=str(error))
+        renamed = rename_planner.completed_renames(plan, done)
+        for source, target in renamed:
+            self.writer.emit("renamed", path=source, new_path=target)
+        elapsed = time.monotonic() - started
+        print(f"{len(renamed)} 件のリネームが完了しました ({elapsed:.2f} 秒)。")
+        return len(renamed), requested - len(renamed)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # 標準出力は JSON Lines 専用にし、各モジュールの print は標準エラーに出す
+    writer = JsonLinesWriter(sys.stdout)
+    sys.stdout = sys.stderr
+    started = time.monotonic()
+
+    if not os.path.isdir(args.folder):
+        writer.emit("error", message=f"フォルダが見つかりません: {args.folder}")
+        return EXIT_USAGE
+    config_dir = args.config_dir or get_config_dir("TagClericAI")
+    settings = configparser.ConfigParser()
+    settings.read(os.path.join(config_dir, "config.ini"), encoding="utf-8")
+    # API キーはコマンドラインに残らないよう、環境変数か設定ファイルから読む
+    api_key = os.environ.get(API_KEY_ENV) or settings.get('Settings', 'GeminiAPIKey', fallback='')
+    if not api_key:
+        writer.emit("error", message=f"API キーがありません。環境変数 {API_KEY_ENV} か config.ini に設定してください。")
+        return EXIT_USAGE
+    if args.apply and rename_planner.RenameJournal(config_dir).load() is not None:
+        writer.emit("error", message="中断されたリネームがあります。画面版を起動して復旧してから実行してください。")
+        return EXIT_USAGE
+    try:
+        runner = BatchRunner(args, settings, config_dir, writer)
+    except (OSError, ValueError) as e:
+        writer.emit("error", message=str(e))
+        return EXIT_USAGE
+
+    counts, renamed, failed = {}, 0, 0
+    try:
+        runner.ai_handler = GoogleAIApiHandler(gemini_api_key=api_key, model_name=runner.model_name)
+        if not runner.ai_handler.generative_model:
+            writer.emit("error", message="Gemini API のクライアントを初期化できませんでした。API キーとモデルを確認してください。")
+            return EXIT_USAGE
+        files = runner.scan()
+        print(f"{len(files)} 件のファイルに名前を提案します (モデル: {runner.model_name})。")
+        renames, counts = runner.run_suggestions(files)
+        # 上限に達した場合も、提案できた分はリネームする
+        if args.apply:
+            renamed, failed = runner.apply_renames(renames)
+    except KeyboardInterrupt:
+        writer.emit("summary", interrupted=True, counts=counts, elapsed=round(time.monotonic() - started, 3))
+        return EXIT_INTERRUPTED
+    finally:
+        runner.close()
+
+    failed += sum(counts.get(status, 0) for status in FAILED_STATUSES)
+    summary = {"files": sum(counts.values()), "counts": counts, "applied": args.apply, "failed": failed, "elapsed": round(time.monotonic() - started, 3)}
+    if args.apply: summary["renamed"] = renamed
+    writer.emit("summary", **summary)
+    if runner.stop_event.is_set(): return EXIT_QUOTA
+    return EXIT_PARTIAL if failed else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# ==============================================================================
+# file: tests/fakes.py (AppLogic をウィンドウなしで動かすための偽物)
+# ==============================================================================
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import app_logic
+from rate_limiter import RateLimiter
+from record_store import FileEntry
+
+
+class FakeDispatcher:
+    """UIDispatcher の代わり。call はその場で実行し、coalesce は最後の呼び出しだけを記録する。"""
+    def __init__(self):
+        self.coalesced = {}
+
+    def call(self, func, *args):
+        func(*args)
+
+    def coalesce(self, key, func, *args):
+        self.coalesced[key] = (func, args)
+
+
+class FakeAIHandler:
+    """送信したリクエストの枚数を記録し、固定の名前を返す。"""
+    def __init__(self, model_name="fake-model", fail=None, delay=0.0):
+        self.model_name = model_name
+        self.generative_model = object()
+        self.request_sizes = []
+        self.fail = fail or (lambda image_bytes: False)
+        self.delay = delay
+        self._lock = threading.Lock()
+
+    def _record(self, count):
+        with self._lock:
+            self.request_sizes.append(count)
+        if self.delay: threading.Event().wait(self.delay)
+
+    def generate_name_from_image(self, image_bytes, custom_prompt, language_mode):
+        self._record(1)
+        if self.fail(image_bytes): raise RuntimeError("API failure")
+        return f"name_{image_bytes.decode()}", True, 1
+
+    def generate_names_from_images(self, images_bytes, custom_prompt, language_mode):
+        self._record(len(images_bytes))
+        return [f"name_{image_bytes.decode()}" for image_bytes in images_bytes], True, len(images_bytes)
+
+
+def make_app(ai_handler=None):
+    app = mock.MagicMock()
+    app.lang_manager.get.side_effect = lambda key: key
+    app.ui = FakeDispatcher()
+    app.cancel_requested = threading.Event()
+    app.is_processing = False
+    app.ai_handler = ai_handler or FakeAIHandler()
+    app.rate_limiter = RateLimiter({}, {}, default_rpd=100000, default_rpm=100000)
+    app.usage_ledger.daily_requests = 0
+    app.suggestion_cache.get.return_value = None
+    return app
+
+
+def make_logic(app, paths):
+    """paths の行を持つ AppLogic を作る。画像の準備はプロセスではなくスレッドで行う (テストで差し替えられるように)。"""
+    logic = app_logic.AppLogic(app)
+    logic.records.upsert([FileEntry(path, "", "未分析", 0, "") for path in paths])
+    pools = ThreadPoolExecutor(max_workers=2), ThreadPoolExecutor(max_workers=1)
+    logic._get_preparation_pools = lambda: pools
+    return logic
+
+
+def fake_payload(path):
+    """prepare_ai_payload の代わり。ファイル名の拡張子を除いた部分を画像のバイト列として返す。"""
+    return os.path.splitext(os.path.basename(path))[0].encode(), None
+
+
+def suggestion_config(**overrides):
+    config = {
+        'add_creation_date': False, 'date_format': "%Y%m%d", 'remove_original_name': True, 'add_folder_name': False,
+        'folder_name_to_add': "", 'ai_fallback_name': "AI_Unknown", 'language_mode': "English", 'custom_prompt': "",
+        'add_sequence_number': True, 'max_concurrent_requests': 2, 'similarity_threshold': 0, 'batch_size': 1,
+    }
+    config.update(overrides)
+    return config
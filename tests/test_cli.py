@@ -0,0 +1,49 @@
+import io
+import json
+import os
+import sys
+
+import tagcleric_cli
+
+
+class _Handler:
+    def __init__(self, gemini_api_key, model_name, configured=True):
+        self.model_name = model_name
+        self.generative_model = object() if configured else None
+
+    def generate_name_from_image(self, image_bytes, custom_prompt, language_mode):
+        return "API error", False, 0
+
+
+def _run(tmp_path, monkeypatch, handler):
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    for name in ("a.jpg", "b.jpg"):
+        (folder / name).write_text(name)
+    monkeypatch.setenv(tagcleric_cli.API_KEY_ENV, "key")
+    monkeypatch.setattr(tagcleric_cli, "GoogleAIApiHandler", handler)
+    monkeypatch.setattr(tagcleric_cli, "GEMINI_RPM_LIMITS", {"test-model": 6000})
+    monkeypatch.setattr(tagcleric_cli, "prepare_ai_payload", lambda path: (os.path.basename(path).encode(), None))
+    out = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", out)
+    code = tagcleric_cli.main([str(folder), "--apply", "--prompt-text", "keywords", "--config-dir", str(tmp_path / "config"), "--workers", "1", "--model", "test-model"])
+    events = [json.loads(line) for line in out.getvalue().splitlines()]
+    return code, sorted(os.listdir(folder)), events
+
+
+def test_unconfigured_client_stops_before_renaming(tmp_path, monkeypatch):
+    handler = lambda gemini_api_key, model_name: _Handler(gemini_api_key, model_name, configured=False)
+    code, names, events = _run(tmp_path, monkeypatch, handler)
+    assert code == tagcleric_cli.EXIT_USAGE
+    assert names == ["a.jpg", "b.jpg"]
+    assert [event["event"] for event in events] == ["error"]
+
+
+def test_fallback_names_are_reported_but_not_applied(tmp_path, monkeypatch):
+    code, names, events = _run(tmp_path, monkeypatch, _Handler)
+    assert code == tagcleric_cli.EXIT_PARTIAL
+    assert names == ["a.jpg", "b.jpg"]
+    suggestions = [event for event in events if event["event"] == "suggestion"]
+    assert [event["status"] for event in suggestions] == [tagcleric_cli.FALLBACK] * 2
+    assert all("AI_Unknown" in event["new_name"] for event in suggestions)
+    assert not [event for event in events if event["event"] == "renamed"]
@@ -0,0 +1,35 @@
+from unittest import mock
+
+import app_logic
+import folder_watcher
+from fakes import make_app, make_logic
+
+
+def test_renames_are_paired_without_inodes():
+    previous = {"/p/a.jpg": (10, 111, 0), "/p/b.jpg": (20, 222, 0)}
+    current = {"/p/c.jpg": (10, 111, 0), "/p/b.jpg": (20, 222, 0)}
+    delta = folder_watcher.PollingWatcher._diff(previous, current)
+    assert delta.renames == [("/p/a.jpg", "/p/c.jpg", False)]
+
+
+def test_ambiguous_renames_without_inodes_are_not_paired():
+    previous = {"/p/a.jpg": (10, 111, 0), "/p/b.jpg": (10, 111, 0)}
+    current = {"/p/c.jpg": (10, 111, 0), "/p/d.jpg": (10, 111, 0)}
+    delta = folder_watcher.PollingWatcher._diff(previous, current)
+    assert delta.renames == [] and delta.changed == set(previous) | set(current)
+
+
+def test_snapshot_skips_files_deleted_during_the_scan(tmp_path):
+    kept = mock.MagicMock(path=str(tmp_path / "a.jpg"))
+    kept.stat.return_value = mock.MagicMock(st_size=1, st_mtime_ns=2, st_ino=3)
+    deleted = mock.MagicMock(path=str(tmp_path / "b.jpg"))
+    deleted.stat.side_effect = FileNotFoundError(2, "No such file")
+    app = make_app()
+    app.watch_folder_var.get.return_value = True
+    app.file_system_handler.scan_files.return_value = [[kept, deleted]]
+    logic = make_logic(app, [])
+    logic._scan_request = (str(tmp_path), [".jpg"], {"recursive": False})
+    with mock.patch.object(app_logic.folder_watcher, "start_watcher") as start:
+        logic.start_watcher()
+    snapshot = start.call_args[0][3]
+    assert snapshot() == {kept.path: (1, 2, 3)}
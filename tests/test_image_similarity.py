@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+
+import image_similarity
+from image_similarity import SimilarityClusterer
+
+
+def test_disabled_clusterer_does_not_import_numpy():
+    code = ("import sys; from image_similarity import SimilarityClusterer; "
+            "c = SimilarityClusterer(0); c.add(1, 'a'); c.find(1); print('numpy' in sys.modules)")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=os.path.dirname(image_similarity.__file__))
+    assert result.stdout.strip() == "False"
+
+
+def test_finds_nearest_representative_and_grows():
+    clusterer = SimilarityClusterer(2)
+    for value in range(100):
+        clusterer.add(value << 8, value)
+    assert clusterer.find((42 << 8) | 0b11) == 42
+    assert clusterer.find((42 << 8) | 0b111) is None
@@ -0,0 +1,25 @@
+from name_allocator import NameAllocator
+
+
+def _allocator(names, pending=None):
+    return NameAllocator(pending=pending, listdir=lambda directory: list(names))
+
+
+def test_numbered_files_keep_their_names_on_a_rerun():
+    names = ["beach.jpg", "beach_2.jpg", "beach_3.jpg"]
+    paths = [f"/photos/{name}" for name in names]
+    allocator = _allocator(names)
+    assert [allocator.allocate(path, "beach", ".jpg") for path in reversed(paths)] == list(reversed(names))
+    with allocator.batch(paths) as allocate:
+        assert [allocate(path, "beach", ".jpg") for path in paths] == names
+
+
+def test_batch_avoids_existing_files_and_other_suggestions():
+    names = ["beach.jpg", "img1.jpg", "img2.jpg", "img3.jpg"]
+    pending = lambda directories: {"/photos": [("/photos/img3.jpg", "beach_2.jpg")]}
+    allocator = _allocator(names, pending)
+    paths = ["/photos/img1.jpg", "/photos/img2.jpg"]
+    for _ in range(2):  # 組み立て直しても同じ名前になる
+        with allocator.batch(paths) as allocate:
+            assert [allocate(path, "beach", ".jpg") for path in paths] == ["beach_3.jpg", "beach_4.jpg"]
+    assert allocator.allocate("/photos/img3.jpg", "beach", ".jpg") == "beach_2.jpg"
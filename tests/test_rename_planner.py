@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+import rename_planner
+
+
+def _write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def _execute(plan, tmp_path):
+    journal = rename_planner.RenameJournal(str(tmp_path))
+    journal.begin(plan.steps)
+    done, failed = rename_planner.execute_plan(plan.steps, journal)
+    journal.close()
+    return done, failed
+
+
+def test_swap_and_chain(tmp_path):
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    for name in ("a.jpg", "b.jpg", "c.jpg"):
+        _write(folder / name, name)
+    plan = rename_planner.plan_renames([(str(folder / "a.jpg"), "b.jpg"), (str(folder / "b.jpg"), "a.jpg"), (str(folder / "c.jpg"), "d.jpg")])
+    done, failed = _execute(plan, tmp_path)
+    assert not failed and not plan.conflicts
+    assert _read(folder / "a.jpg") == "b.jpg" and _read(folder / "b.jpg") == "a.jpg" and _read(folder / "d.jpg") == "c.jpg"
+
+
+def test_listing_failure_is_a_conflict():
+    def failing_listdir(directory):
+        raise PermissionError(13, "Permission denied", directory)
+    plan = rename_planner.plan_renames([("/share/a.jpg", "b.jpg")], listdir=failing_listdir)
+    assert plan.steps == []
+    assert plan.conflicts == [("/share/a.jpg", "b.jpg", rename_planner.LISTING_FAILED)]
+
+
+def test_file_created_after_planning_is_not_overwritten(tmp_path):
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    _write(folder / "a.jpg", "a")
+    _write(folder / "x.jpg", "x")
+    plan = rename_planner.plan_renames([(str(folder / "x.jpg"), "y.jpg"), (str(folder / "a.jpg"), "b.jpg")])
+    # 計画の後に、移動先と同じ名前のファイルが別の場所から作られた
+    _write(folder / "b.jpg", "user file")
+    done, failed = _execute(plan, tmp_path)
+    assert [step.target for step, _ in failed] == [str(folder / "b.jpg")]
+    assert isinstance(failed[0][1], FileExistsError)
+    assert _read(folder / "b.jpg") == "user file" and _read(folder / "a.jpg") == "a"
+    assert _read(folder / "y.jpg") == "x"
+
+
+def test_rollback_does_not_overwrite(tmp_path):
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    _write(folder / "b.jpg", "moved")
+    _write(folder / "a.jpg", "user file")  # 元に戻す前に、元の名前で新しいファイルが作られた
+    step = rename_planner.RenameStep(str(folder / "a.jpg"), str(folder / "b.jpg"), 0)
+    journal = rename_planner.RenameJournal(str(tmp_path))
+    journal.begin([step])
+    done = {0}
+    rename_planner.rollback([(0, step)], journal, done)
+    journal.close()
+    assert done == {0}
+    assert _read(folder / "a.jpg") == "user file" and _read(folder / "b.jpg") == "moved"
+
+
+def test_case_only_rename_goes_through_a_temporary_name(tmp_path):
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    _write(folder / "a.jpg", "a")
+    plan = rename_planner.plan_renames([(str(folder / "a.jpg"), "A.jpg")])
+    assert len(plan.steps) == 2 and plan.steps[0].target.endswith(".renaming")
+    done, failed = _execute(plan, tmp_path)
+    assert not failed and done == {0, 1}
+    assert os.listdir(folder) == ["A.jpg"] and _read(folder / "A.jpg") == "a"
+
+
+def test_name_resolving_to_the_source_is_not_unlinked(tmp_path, monkeypatch):
+    # 大文字小文字を区別しないファイルシステムでは、A.jpg へのリンクが a.jpg 自身に当たる
+    folder = tmp_path / "photos"
+    folder.mkdir()
+    _write(folder / "a.jpg", "a")
+    source, target = str(folder / "a.jpg"), str(folder / "A.jpg")
+    def link(src, dst, follow_symlinks=True):
+        raise FileExistsError(17, "File exists", dst)
+    monkeypatch.setattr(rename_planner.os, "link", link)
+    monkeypatch.setattr(rename_planner.os.path, "samefile", lambda a, b: True)
+    with pytest.raises(FileExistsError):
+        rename_planner._move_no_replace(source, target)
+    assert _read(folder / "a.jpg") == "a"
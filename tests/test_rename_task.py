@@ -0,0 +1,123 @@
+import threading
+from unittest import mock
+
+import app_logic
+import rename_planner
+from fakes import make_app, make_logic
+
+
+def _set_processing(app):
+    def toggle(processing):
+        app.is_processing = processing
+    app.toggle_ui_state.side_effect = toggle
+
+
+def test_rename_locks_the_ui_until_rows_are_updated(tmp_path):
+    paths = [str(tmp_path / f"img{i}.jpg") for i in range(3)]
+    for path in paths:
+        open(path, "w").close()
+    app = make_app()
+    _set_processing(app)
+    app.config_dir = str(tmp_path)
+    app.get_rename_workers.return_value = 2
+    logic = make_logic(app, paths)
+    for i, path in enumerate(paths):
+        logic.records.update(path, new_name=f"new{i}.jpg")
+    app.app_view.local_tree.selection.return_value = paths
+
+    started = []
+    with mock.patch.object(app_logic, "Thread") as thread, mock.patch.object(app_logic.messagebox, "askyesno", return_value=True):
+        thread.side_effect = lambda target, args, daemon: started.append((target, args)) or mock.MagicMock()
+        logic.rename_local_files_logic()
+        assert app.is_processing
+        logic.rename_local_files_logic()  # 実行中の2回目は受け付けない
+    assert len(started) == 1
+
+    target, args = started[0]
+    worker = threading.Thread(target=target, args=args)
+    worker.start()
+    worker.join(10)
+    assert not app.is_processing
+    assert sorted(entry.name for entry in logic.records.get_many([str(tmp_path / f"new{i}.jpg") for i in range(3)])) == ["new0.jpg", "new1.jpg", "new2.jpg"]
+    assert not (tmp_path / "rename_journal.jsonl").exists()
+
+
+def test_rename_unlocks_the_ui_when_the_journal_cannot_be_written(tmp_path):
+    path = str(tmp_path / "img.jpg")
+    open(path, "w").close()
+    app = make_app()
+    _set_processing(app)
+    app.is_processing = True
+    app.config_dir = str(tmp_path / "missing")
+    logic = make_logic(app, [path])
+    logic.records.update(path, new_name="new.jpg")
+    logic._rename_files_task([path])
+    assert not app.is_processing
+    app.update_status.assert_called_with("status_rename_failed")
+
+
+def test_watcher_is_paused_during_the_rename_and_resumed_afterwards(tmp_path):
+    path = str(tmp_path / "img.jpg")
+    open(path, "w").close()
+    app = make_app()
+    _set_processing(app)
+    app.config_dir = str(tmp_path)
+    app.get_rename_workers.return_value = 1
+    app.watch_folder_var.get.return_value = True
+    logic = make_logic(app, [path])
+    logic.records.update(path, new_name="new.jpg")
+    logic._scan_request = (str(tmp_path), [".jpg"], {"recursive": False})
+    app.app_view.local_tree.selection.return_value = [path]
+
+    watchers = []
+    def start(root, path_filter, recursive, snapshot, on_changes):
+        watchers.append(on_changes)
+        return mock.MagicMock()
+
+    started = []
+    with mock.patch.object(app_logic.folder_watcher, "start_watcher", side_effect=start), \
+         mock.patch.object(app_logic, "Thread") as thread, mock.patch.object(app_logic.messagebox, "askyesno", return_value=True):
+        logic.start_watcher()
+        old_watcher = logic._watcher
+        thread.side_effect = lambda target, args, daemon: started.append((target, args)) or mock.MagicMock()
+        logic.rename_local_files_logic()
+        old_watcher.stop.assert_called_once()
+        assert logic._watch_token is None
+        logic.toggle_watcher()  # リネーム中に監視を入れ直しても再開しない
+        assert len(watchers) == 1
+        target, args = started[0]
+        target(*args)
+
+    # 新しいトークンで再開し、止める前の監視からの通知は無視される
+    assert len(watchers) == 2 and logic._watch_token is not None
+    with mock.patch.object(app.ui, "call") as call:
+        watchers[0](mock.MagicMock(resync=True))
+    call.assert_not_called()
+    assert [entry.name for entry in logic.records.get_many([str(tmp_path / "new.jpg")])] == ["new.jpg"]
+
+
+def test_unrecovered_journal_is_not_overwritten(tmp_path):
+    # a.jpg -> 一時名 まで終わった後に a.jpg と b.jpg が作られ、続きの実行も元に戻すこともできない
+    temp, target = tmp_path / ".a.jpg.0.renaming", tmp_path / "b.jpg"
+    temp.write_text("a")
+    target.write_text("user file")
+    (tmp_path / "a.jpg").write_text("new a")
+    steps = [rename_planner.RenameStep(str(tmp_path / "a.jpg"), str(temp), 0), rename_planner.RenameStep(str(temp), str(target), 0)]
+    journal = rename_planner.RenameJournal(str(tmp_path))
+    journal.begin(steps)
+    journal.mark(0)
+    journal.close()
+    journal_text = (tmp_path / rename_planner.JOURNAL_FILE_NAME).read_text()
+    app = make_app()
+    app.config_dir = str(tmp_path)
+    app.get_rename_workers.return_value = 1
+    logic = make_logic(app, [str(target)])
+    app.app_view.local_tree.selection.return_value = [str(target)]
+
+    with mock.patch.object(app_logic, "Thread") as thread, mock.patch.object(app_logic.messagebox, "askyesno", return_value=True), \
+         mock.patch.object(app_logic.messagebox, "showwarning") as warning:
+        logic.rename_local_files_logic()
+    thread.assert_not_called()
+    warning.assert_called_once()
+    assert (tmp_path / rename_planner.JOURNAL_FILE_NAME).read_text().startswith(journal_text)
+    assert target.read_text() == "user file" and temp.read_text() == "a"
@@ -0,0 +1,105 @@
+import threading
+from unittest import mock
+
+import pytest
+
+import app_logic
+from fakes import FakeAIHandler, fake_payload, make_app, make_logic, suggestion_config
+
+
+@pytest.fixture(autouse=True)
+def _fake_payload():
+    with mock.patch.object(app_logic, "prepare_ai_payload", fake_payload):
+        yield
+
+
+def _paths(tmp_path, count):
+    return [str(tmp_path / f"img{i:02d}.jpg") for i in range(count)]
+
+
+def _run_task(logic, paths, config, timeout=10):
+    task = threading.Thread(target=logic._suggest_names_task, args=(paths, config, logic._naming_options(config)), daemon=True)
+    task.start()
+    task.join(timeout)
+    assert not task.is_alive(), "提案のタスクが終了しなかった"
+
+
+def test_all_files_get_suggestions(tmp_path):
+    paths = _paths(tmp_path, 10)
+    app = make_app()
+    logic = make_logic(app, paths)
+    _run_task(logic, paths, suggestion_config())
+    assert [entry.ai_part for entry in logic.records.get_many(paths)] == [f"name_img{i:02d}" for i in range(10)]
+    app.toggle_ui_state.assert_called_with(False)
+
+
+def test_cancel_with_preparations_still_queued(tmp_path):
+    paths = _paths(tmp_path, 40)
+    app = make_app(FakeAIHandler(delay=0.05))
+    logic = make_logic(app, paths)
+    first_request = threading.Event()
+    original = app.ai_handler.generate_name_from_image
+
+    def cancel_on_first_request(*args):
+        first_request.set()
+        app.cancel_requested.set()
+        return original(*args)
+    app.ai_handler.generate_name_from_image = cancel_on_first_request
+
+    _run_task(logic, paths, suggestion_config())
+    assert first_request.is_set()
+    app.toggle_ui_state.assert_called_with(False)
+    app.update_status.assert_any_call("status_processing_interrupted")
+    # 送信済みのリクエストの結果は反映され、未送信のファイルは未分析のまま
+    entries = logic.records.get_many(paths)
+    assert entries[0].ai_part == "name_img00"
+    assert any(entry.ai_status == "未分析" for entry in entries)
+
+
+@pytest.mark.parametrize("delay", [0.0, 0.02])
+def test_batch_mode_sends_full_batches(tmp_path, delay):
+    paths = _paths(tmp_path, 40)
+    app = make_app(FakeAIHandler(delay=delay))
+    logic = make_logic(app, paths)
+    _run_task(logic, paths, suggestion_config(batch_size=4, max_concurrent_requests=2))
+    assert app.ai_handler.request_sizes == [4] * 10
+    assert [entry.ai_part for entry in logic.records.get_many(paths)] == [f"name_img{i:02d}" for i in range(40)]
+
+
+def test_batch_mode_sends_the_last_partial_batch(tmp_path):
+    paths = _paths(tmp_path, 10)
+    app = make_app()
+    logic = make_logic(app, paths)
+    _run_task(logic, paths, suggestion_config(batch_size=4, max_concurrent_requests=2))
+    assert sorted(app.ai_handler.request_sizes) == [2, 4, 4]
+
+
+def test_similar_images_finish_when_the_representative_fails(tmp_path):
+    paths = _paths(tmp_path, 6)
+    # すべて同じハッシュにして、先頭の画像を代表とするクラスタにまとめる
+    same_hash = lambda path: (fake_payload(path)[0], 0)
+    app = make_app(FakeAIHandler(fail=lambda image_bytes: image_bytes == b"img00"))
+    logic = make_logic(app, paths)
+    with mock.patch.object(app_logic, "prepare_ai_payload", same_hash):
+        _run_task(logic, paths, suggestion_config(similarity_threshold=6))
+    assert app.ai_handler.request_sizes == [1]
+    assert [entry.ai_status for entry in logic.records.get_many(paths)] == ["エラー"] * 6
+    app.toggle_ui_state.assert_called_with(False)
+
+
+def test_feeder_stops_when_the_task_fails(tmp_path):
+    paths = _paths(tmp_path, 40)
+    app = make_app()
+    logic = make_logic(app, paths)
+    feeder_finished = threading.Event()
+    original = logic._feed_preparations
+
+    def feed(*args):
+        try: original(*args)
+        finally: feeder_finished.set()
+    logic._feed_preparations = feed
+    logic._apply_suggestion = mock.Mock(side_effect=RuntimeError("boom"))
+    with mock.patch.object(threading, "excepthook"):
+        _run_task(logic, paths, suggestion_config(max_concurrent_requests=1))
+    assert feeder_finished.wait(5)
+    app.toggle_ui_state.assert_called_with(False)
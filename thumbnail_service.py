@@ -0,0 +1,209 @@
+# ==============================================================================
+# file: thumbnail_service.py (サムネイルのキャッシュとバックグラウンド生成)
+# ==============================================================================
+import hashlib
+import io
+import os
+import struct
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+from image_preprocessor import IMAGE_EXTENSIONS, VIDEO_EXTENSIONS, open_reduced
+from video_frames import get_video_frame
+
+# EXIF (APP1) セグメントは最大64KBなので、ファイル先頭のこの範囲だけを読めば足りる
+EXIF_HEADER_READ_BYTES = 128 * 1024
+
+
+def read_exif_thumbnail(file_path):
+    """
+    JPEG のヘッダだけを読み、EXIF (IFD1) に埋め込まれたサムネイルの JPEG バイト列を返す。
+    埋め込みサムネイルがない場合は None。
+    """
+    with open(file_path, "rb") as f:
+        data = f.read(EXIF_HEADER_READ_BYTES)
+    if not data.startswith(b"\xff\xd8"):
+        return None
+    pos = 2
+    while pos + 4 <= len(data) and data[pos] == 0xFF:
+        marker = data[pos + 1]
+        if marker in (0xD9, 0xDA):  # EOI / SOS 以降に EXIF はない
+            return None
+        length = struct.unpack(">H", data[pos + 2:pos + 4])[0]
+        segment = data[pos + 4:pos + 2 + length]
+        if marker == 0xE1 and segment.startswith(b"Exif\x00\x00"):
+            return _thumbnail_from_tiff(segment[6:])
+        pos += 2 + length
+    return None
+
+
+def _thumbnail_from_tiff(tiff):
+    if tiff[:2] == b"II": endian = "<"
+    elif tiff[:2] == b"MM": endian = ">"
+    else: return None
+    try:
+        ifd0 = struct.unpack(endian + "I", tiff[4:8])[0]
+        entry_count = struct.unpack(endian + "H", tiff[ifd0:ifd0 + 2])[0]
+        ifd1 = struct.unpack(endian + "I", tiff[ifd0 + 2 + entry_count * 12:ifd0 + 6 + entry_count * 12])[0]
+        if ifd1 == 0:
+            return None
+        offset = length = None
+        entry_count = struct.unpack(endian + "H", tiff[ifd1:ifd1 + 2])[0]
+        for i in range(entry_count):
+            entry = tiff[ifd1 + 2 + i * 12:ifd1 + 14 + i * 12]
+            tag, _, _, value = struct.unpack(endian + "HHII", entry)
+            if tag == 0x0201: offset = value  # JPEGInterchangeFormat
+            elif tag == 0x0202: length = value  # JPEGInterchangeFormatLength
+    except struct.error:
+        return None
+    if not offset or not length:
+        return None
+    thumbnail = tiff[offset:offset + length]
+    return thumbnail if thumbnail.startswith(b"\xff\xd8") and len(thumbnail) == length else None
+
+
+class ThumbnailService:
+    """
+    プレビュー用サムネイルを提供する。
+    - 表示可能な PhotoImage をメモリ上のLRUに保持する (メインスレッドのみで操作)
+    - 縮小済み画像をパス・サイズ・更新日時をキーにディスクへ保存する
+    - デコードは1本のバックグラウンドスレッドで行い、常に最新の要求だけを処理する
+    - JPEG は先に EXIF の埋め込みサムネイルを表示し、デコードが終わったら鮮明な画像に差し替える
+    """
+    MEMORY_ITEMS = 256
+    DISK_ITEMS = 5000
+
+    def __init__(self, dispatch, config_dir, size):
+        self.dispatch = dispatch  # dispatch(func, *args) で func をメインスレッドで呼ぶ (UIDispatcher.call)
+        self.size = size
+        self.cache_dir = os.path.join(config_dir, "thumbnails")
+        self._memory = OrderedDict()
+        self._generation = 0
+        self._pending = None
+        self._condition = threading.Condition()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        threading.Thread(target=self._worker, daemon=True, name="thumbnail").start()
+
+    def _cache_key(self, file_path):
+        stat = os.stat(file_path)
+        return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, self.size)
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.png")
+
+    def request(self, file_path, callback):
+        """
+        サムネイルを要求する (メインスレッドから呼ぶ)。callback(photo) は準備ができたときに
+        メインスレッドで呼ばれ、生成に失敗した場合は photo が None になる。
+        EXIF サムネイルを先に表示できる場合は callback が2回呼ばれる。
+        後から別の要求が来た場合、古い要求の callback は呼ばれない。
+        """
+        self._generation += 1
+        try:
+            key = self._cache_key(file_path)
+        except OSError as e:
+            print(f"サムネイルの対象ファイルにアクセスできません: {file_path} -> {e}")
+            callback(None)
+            return
+        photo = self._memory.get(key)
+        if photo is not None:
+            self._memory.move_to_end(key)
+            callback(photo)
+            return
+        with self._condition:
+            # 未着手の要求は上書きし、古いデコードが溜まらないようにする
+            self._pending = (self._generation, file_path, key, callback)
+            self._condition.notify()
+
+    def _worker(self):
+        self._prune_disk_cache()
+        while True:
+            with self._condition:
+                while self._pending is None:
+                    self._condition.wait()
+                generation, file_path, key, callback = self._pending
+                self._pending = None
+            if generation != self._generation:
+                continue
+            image = self._load(file_path, key, generation, callback)
+            self.dispatch(self._deliver, generation, key, image, callback)
+
+    def _load(self, file_path, key, generation, callback):
+        disk_path = self._disk_path(key)
+        try:
+            if os.path.exists(disk_path):
+                with Image.open(disk_path) as cached:
+                    cached.load()
+                    return cached.copy()
+        except Exception as e:
+            print(f"サムネイルキャッシュの読み込みエラー: {e}")
+
+        preview = self._decode_exif_thumbnail(file_path)
+        if preview is not None:
+            self.dispatch(self._deliver, generation, None, preview, callback)
+            if generation != self._generation:
+                # すでに別のファイルが選択されているため、フルデコードは行わない
+                return None
+
+        image = self._decode(file_path)
+        if image is not None:
+            try:
+                image.save(disk_path, format="PNG")
+            except Exception as e:
+                print(f"サムネイルキャッシュの保存エラー: {e}")
+        return image
+
+    def _decode_exif_thumbnail(self, file_path):
+        if os.path.splitext(file_path)[1].lower() not in (".jpg", ".jpeg"):
+            return None
+        try:
+            thumbnail_bytes = read_exif_thumbnail(file_path)
+            if not thumbnail_bytes:
+                return None
+            with Image.open(io.BytesIO(thumbnail_bytes)) as img:
+                img.thumbnail(self.size, Image.Resampling.LANCZOS)
+                return img.copy()
+        except Exception as e:
+            print(f"EXIFサムネイルの読み込みエラー: {e}")
+            return None
+
+    def _decode(self, file_path):
+        ext = os.path.splitext(file_path)[1].lower()
+        try:
+            if ext in IMAGE_EXTENSIONS:
+                with open_reduced(file_path, max(self.size)) as img:
+                    img.thumbnail(self.size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+                    return img.convert("RGBA") if img.mode in ("P", "LA") else img.copy()
+            if ext in VIDEO_EXTENSIONS:
+                image = get_video_frame(file_path)
+                if image is not None:
+                    image.thumbnail(self.size, Image.Resampling.LANCZOS)
+                return image
+        except Exception as e:
+            print(f"サムネイルの生成エラー: {file_path} -> {e}")
+        return None
+
+    def _deliver(self, generation, key, image, callback):
+        if generation != self._generation:
+            return
+        from PIL import ImageTk  # ★修正: 最初のサムネイルを表示するときに読み込む
+        photo = ImageTk.PhotoImage(image) if image is not None else None
+        # key が None のものは EXIF の仮サムネイルなので、メモリキャッシュには入れない
+        if photo is not None and key is not None:
+            self._memory[key] = photo
+            while len(self._memory) > self.MEMORY_ITEMS:
+                self._memory.popitem(last=False)
+        callback(photo)
+
+    def _prune_disk_cache(self):
+        try:
+            entries = [entry for entry in os.scandir(self.cache_dir) if entry.is_file()]
+            if len(entries) <= self.DISK_ITEMS:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - self.DISK_ITEMS]:
+                os.remove(entry.path)
+        except OSError as e:
+            print(f"サムネイルキャッシュの整理エラー: {e}")
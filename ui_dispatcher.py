@@ -0,0 +1,59 @@
+# ==============================================================================
+# file: ui_dispatcher.py (ワーカースレッドからのUI更新をまとめて適用する)
+# ==============================================================================
+import queue
+import threading
+import time
+
+TICK_MS = 50
+# 1回の tick で UI 更新に使う時間の上限。残りは次の tick に回して画面の応答を保つ
+TICK_BUDGET_SECONDS = 0.03
+
+
+class UIDispatcher:
+    """
+    ワーカースレッドからの UI 更新をスレッドセーフなキューに積み、メインスレッドで一定間隔ごとにまとめて適用する。
+    Tk の after() をワーカーから呼ばずに済み、大量の更新でイベントループがあふれることもない。
+    - call(func, *args): func をメインスレッドで順番どおりに呼ぶ
+    - coalesce(key, func, *args): 同じ key の更新は1回の tick で最後のものだけを呼ぶ (再描画・ステータス表示など)
+    """
+    def __init__(self, root, tick_ms=TICK_MS):
+        self.root = root
+        self.tick_ms = tick_ms
+        self._queue = queue.SimpleQueue()
+        self._backlog = []
+        self.root.after(self.tick_ms, self._drain)
+
+    @staticmethod
+    def on_main_thread():
+        return threading.current_thread() is threading.main_thread()
+
+    def call(self, func, *args):
+        self._queue.put((None, func, args))
+
+    def coalesce(self, key, func, *args):
+        self._queue.put((key, func, args))
+
+    def _drain(self):
+        items = self._backlog
+        while True:
+            try: items.append(self._queue.get_nowait())
+            except queue.Empty: break
+        # 同じ key の更新は最後のものだけを残す (順番は最後に積まれた位置に合わせる)
+        last = {key: i for i, (key, _, _) in enumerate(items) if key is not None}
+        items = [item for i, item in enumerate(items) if item[0] is None or last[item[0]] == i]
+
+        deadline = time.monotonic() + TICK_BUDGET_SECONDS
+        done = 0
+        for _, func, args in items:
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"UI更新中にエラーが発生しました: {e}")
+            done += 1
+            if time.monotonic() > deadline: break
+        self._backlog = items[done:]
+        try:
+            self.root.after(self.tick_ms, self._drain)
+        except RuntimeError:
+            pass  # アプリの終了後
@@ -0,0 +1,93 @@
+# ==============================================================================
+# file: ui_utils.py (tkinter に依存する UI 部品)
+# ==============================================================================
+import tkinter as tk
+from tkinter import ttk, scrolledtext
+
+class ContextMenu:
+    """A helper class to create a right-click context menu for text widgets."""
+    def __init__(self, widget):
+        self.widget = widget
+        self.menu = tk.Menu(widget, tearoff=0)
+        self.menu.add_command(label="切り取り (Cut)", command=self.cut)
+        self.menu.add_command(label="コピー (Copy)", command=self.copy)
+        self.menu.add_command(label="貼り付け (Paste)", command=self.paste)
+        self.menu.add_separator()
+        self.menu.add_command(label="すべて選択 (Select All)", command=self.select_all)
+        widget.bind("<Button-3>", self.show_menu)
+
+    def show_menu(self, event):
+        has_selection = False
+        try:
+            if self.widget.selection_get():
+                has_selection = True
+        except (tk.TclError, IndexError):
+            pass
+
+        has_clipboard = False
+        try:
+            if self.widget.clipboard_get():
+                has_clipboard = True
+        except tk.TclError:
+            pass
+
+        self.menu.entryconfig("切り取り (Cut)", state="normal" if has_selection else "disabled")
+        self.menu.entryconfig("コピー (Copy)", state="normal" if has_selection else "disabled")
+        self.menu.entryconfig("貼り付け (Paste)", state="normal" if has_clipboard else "disabled")
+
+        self.menu.tk_popup(event.x_root, event.y_root)
+
+    def cut(self):
+        try:
+            self.widget.event_generate("<<Cut>>")
+        except tk.TclError:
+            pass
+
+    def copy(self):
+        try:
+            self.widget.event_generate("<<Copy>>")
+        except tk.TclError:
+            pass
+
+    def paste(self):
+        try:
+            self.widget.event_generate("<<Paste>>")
+        except tk.TclError:
+            pass
+
+    def select_all(self):
+        if isinstance(self.widget, (tk.Entry, ttk.Entry)):
+            self.widget.selection_range(0, 'end')
+        elif isinstance(self.widget, (tk.Text, scrolledtext.ScrolledText)):
+            self.widget.tag_add('sel', '1.0', 'end')
+        self.widget.focus_set()
+
+
+class ToolTip:
+    def __init__(self, widget, text):
+        self.widget = widget
+        self.text = text
+        self.tooltip_window = None
+        self.id = None
+        self.x = 0
+        self.y = 0
+        self.widget.bind("<Enter>", self.enter)
+        self.widget.bind("<Leave>", self.leave)
+        self.widget.bind("<ButtonPress>", self.leave)
+
+    def enter(self, event=None): self.schedule()
+    def leave(self, event=None): self.unschedule(); self.hide()
+    def schedule(self): self.unschedule(); self.id = self.widget.after(500, self.show)
+    def unschedule(self):
+        if self.id: self.widget.after_cancel(self.id); self.id = None
+    def show(self):
+        self.unschedule()
+        self.x = self.widget.winfo_pointerx() + 15
+        self.y = self.widget.winfo_pointery() + 10
+        self.tooltip_window = tk.Toplevel(self.widget)
+        self.tooltip_window.wm_overrideredirect(True)
+        self.tooltip_window.wm_geometry(f"+{self.x}+{self.y}")
+        label = tk.Label(self.tooltip_window, text=self.text, background="#ffffe0", relief="solid", borderwidth=1, font=("arial", "8", "normal"))
+        label.pack(ipadx=1)
+    def hide(self):
+        if self.tooltip_window: self.tooltip_window.destroy(); self.tooltip_window = None
@@ -0,0 +1,107 @@
+# ==============================================================================
+# file: usage_ledger.py (Gemini API の使用量の集計とジャーナル)
+# ==============================================================================
+import datetime
+import json
+import os
+import threading
+
+JOURNAL_FILE_NAME = "usage_journal.jsonl"
+JOURNAL_MAX_BYTES = 5 * 1024 * 1024
+
+
+def _today_gmt():
+    return str(datetime.datetime.now(datetime.timezone.utc).date())
+
+
+class UsageLedger:
+    """
+    本日 (GMT) のトークン使用量とリクエスト数をメモリ上で集計する。
+    - リクエストごとにモデル・トークン数・所要時間を usage_journal.jsonl に1行追記する
+    - config.ini には一定間隔と終了時にだけ保存し、そのときのジャーナルの位置 (journal_offset) も記録する
+    - 起動時は journal_offset 以降の行を反映するため、保存前に異常終了しても使用量は失われない
+    """
+    def __init__(self, config_dir):
+        self.journal_path = os.path.join(config_dir, JOURNAL_FILE_NAME)
+        self._lock = threading.Lock()
+        self._journal = None
+        self.last_reset_date = ""
+        self.total_tokens = 0
+        self.daily_requests = 0
+        self.dirty = False
+
+    def load(self, last_reset_date, total_tokens, daily_requests, journal_offset):
+        """config.ini の値を読み込み、前回の保存より後にジャーナルへ追記されたリクエストを反映する。反映した件数を返す。"""
+        with self._lock:
+            self.last_reset_date, self.total_tokens, self.daily_requests = last_reset_date, total_tokens, daily_requests
+            replayed = 0
+            try:
+                # ジャーナルが保存位置より短ければ、保存前にローテーションされたため先頭から読む
+                if os.path.getsize(self.journal_path) < journal_offset: journal_offset = 0
+                with open(self.journal_path, "rb") as f:
+                    f.seek(journal_offset)
+                    for line in f:
+                        try: entry = json.loads(line)
+                        except ValueError: continue  # 書き込み途中で終了した行
+                        self._apply(entry.get("date", ""), int(entry.get("tokens", 0)))
+                        replayed += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"使用量ジャーナルの読み込みエラー: {e}")
+            self.dirty = replayed > 0
+            return replayed
+
+    def _apply(self, date, tokens):
+        if date != self.last_reset_date:
+            if date < self.last_reset_date: return  # 前日以前のリクエスト
+            self.last_reset_date, self.total_tokens, self.daily_requests = date, 0, 0
+        self.total_tokens += tokens
+        self.daily_requests += 1
+        self.dirty = True
+
+    def reset_if_new_day(self):
+        """GMT の日付が変わっていれば集計をリセットして True を返す。"""
+        today = _today_gmt()
+        with self._lock:
+            if self.last_reset_date == today: return False
+            self.last_reset_date, self.total_tokens, self.daily_requests = today, 0, 0
+            self.dirty = True
+            return True
+
+    def record(self, model_name, tokens, latency):
+        """成功したリクエストを1件記録する (どのスレッドからでも呼べる)。"""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        date = str(now.date())
+        line = json.dumps({"time": now.isoformat(timespec="seconds"), "date": date, "model": model_name, "tokens": tokens, "latency_ms": round(latency * 1000)}, ensure_ascii=False)
+        with self._lock:
+            try:
+                if self._journal is None: self._journal = open(self.journal_path, "a", encoding="utf-8")
+                self._journal.write(line + "\n")
+                self._journal.flush()
+            except OSError as e:
+                print(f"使用量ジャーナルの書き込みエラー: {e}")
+            self._apply(date, tokens)
+
+    def checkpoint(self):
+        """config.ini に保存する (日付, トークン数, リクエスト数, ジャーナルの位置) を返す。"""
+        with self._lock:
+            offset = 0
+            try:
+                if self._journal is not None: self._journal.flush()
+                if os.path.exists(self.journal_path): offset = os.path.getsize(self.journal_path)
+                if offset > JOURNAL_MAX_BYTES:
+                    # 集計に反映済みの古いジャーナルは1世代だけ残す
+                    if self._journal is not None: self._journal.close(); self._journal = None
+                    os.replace(self.journal_path, self.journal_path + ".1")
+                    offset = 0
+            except OSError as e:
+                print(f"使用量ジャーナルの更新エラー: {e}")
+            self.dirty = False
+            return self.last_reset_date, self.total_tokens, self.daily_requests, offset
+
+    def close(self):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
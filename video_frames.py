@@ -0,0 +1,105 @@
+# ==============================================================================
+# file: video_frames.py (動画フレームの高速抽出)
+# ==============================================================================
+import io
+import os
+import shutil
+import subprocess
+import sys
+import threading
+from collections import OrderedDict
+from PIL import Image
+
+# AI送信用 (1タイル = 768px) とサムネイルの両方に使える大きさで取り出す
+FRAME_MAX_SIDE = 768
+FRAME_TIME_SECONDS = 1.0
+CACHE_SIZE = 16
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_ffmpeg_exe = None
+
+
+def _get_ffmpeg_exe():
+    """moviepy が同梱している imageio-ffmpeg のバイナリを優先し、なければ PATH 上の ffmpeg を使う。"""
+    global _ffmpeg_exe
+    if _ffmpeg_exe is None:
+        try:
+            import imageio_ffmpeg
+            _ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
+        except Exception:
+            _ffmpeg_exe = os.environ.get("FFMPEG_BINARY") or shutil.which("ffmpeg") or ""
+    return _ffmpeg_exe
+
+
+def _run_ffmpeg(ffmpeg_exe, video_path, seconds, max_side):
+    # -ss を -i の前に置き、-noaccurate_seek で直前のキーフレームから1枚だけデコードする
+    command = [
+        ffmpeg_exe, "-nostdin", "-v", "error",
+        "-noaccurate_seek", "-ss", f"{seconds:.3f}", "-i", str(video_path),
+        "-frames:v", "1",
+        "-vf", f"scale={max_side}:{max_side}:force_original_aspect_ratio=decrease",
+        "-f", "image2pipe", "-c:v", "ppm", "-",
+    ]
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    result = subprocess.run(command, capture_output=True, timeout=30, creationflags=creationflags)
+    if result.returncode != 0 or not result.stdout:
+        return None
+    image = Image.open(io.BytesIO(result.stdout))
+    image.load()
+    return image
+
+
+def _extract_with_moviepy(video_path, max_side):
+    from moviepy.editor import VideoFileClip
+    with VideoFileClip(str(video_path), audio=False) as clip:
+        frame_time = min(clip.duration / 2, FRAME_TIME_SECONDS) if clip.duration > 0 else 0
+        image = Image.fromarray(clip.get_frame(frame_time))
+    image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    return image
+
+
+def _extract_frame(video_path, max_side):
+    ffmpeg_exe = _get_ffmpeg_exe()
+    if not ffmpeg_exe:
+        return _extract_with_moviepy(video_path, max_side)
+    # 1秒より短い動画では1秒地点にフレームがないため、先頭から取り直す
+    return _run_ffmpeg(ffmpeg_exe, video_path, FRAME_TIME_SECONDS, max_side) or _run_ffmpeg(ffmpeg_exe, video_path, 0, max_side)
+
+
+def get_video_frame(video_path, max_side=FRAME_MAX_SIDE):
+    """
+    動画の代表フレームを縮小済みの PIL.Image として返す。取得できなければ None。
+    パス・更新日時・サイズをキーにキャッシュするため、プレビューとAI送信で同じ動画を二度デコードしない。
+    呼び出し側が自由に加工できるよう、常にコピーを返す。
+    """
+    try:
+        stat = os.stat(video_path)
+    except OSError as e:
+        print(f"動画ファイルにアクセスできません: {video_path} -> {e}")
+        return None
+    key = (os.path.abspath(video_path), stat.st_mtime_ns, stat.st_size, max_side)
+    with _cache_lock:
+        image = _cache.get(key)
+        if image is not None:
+            _cache.move_to_end(key)
+            return image.copy()
+
+    try:
+        image = _extract_frame(video_path, max_side)
+    except ImportError:
+        print(f"動画処理ライブラリ(moviepy)の読み込みに失敗しました。インストールされていない可能性があります。")
+        return None
+    except Exception as e:
+        print(f"動画フレームのPILイメージとしての取得エラー: {video_path} -> {e}")
+        return None
+    if image is None:
+        print(f"動画フレームを取得できませんでした: {video_path}")
+        return None
+
+    with _cache_lock:
+        _cache[key] = image
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return image.copy()
@@ -0,0 +1,291 @@
+# ==============================================================================
+# file: virtual_list.py (大量のファイルを扱う仮想リスト)
+# ==============================================================================
+from bisect import bisect_left
+from tkinter import ttk
+
+DEFAULT_ROW_HEIGHT = 20
+DEFAULT_HEADER_HEIGHT = 24
+WHEEL_ROWS = 3
+
+
+class IndexSelection:
+    """
+    行番号の集合で選択を表す。inverted=True のときは indices が「選択されていない行」を表すため、
+    全選択と選択解除は行数にかかわらず一定時間で終わる。
+    """
+    __slots__ = ("inverted", "indices")
+
+    def __init__(self):
+        self.inverted = False
+        self.indices = set()
+
+    def clear(self):
+        self.inverted = False
+        self.indices = set()
+
+    def select_all(self):
+        self.inverted = True
+        self.indices = set()
+
+    def __contains__(self, index):
+        return (index in self.indices) != self.inverted
+
+    def add(self, index):
+        if self.inverted: self.indices.discard(index)
+        else: self.indices.add(index)
+
+    def discard(self, index):
+        if self.inverted: self.indices.add(index)
+        else: self.indices.discard(index)
+
+    def toggle(self, index):
+        if index in self: self.discard(index)
+        else: self.add(index)
+
+    def count(self, row_count):
+        return row_count - len(self.indices) if self.inverted else len(self.indices)
+
+    def iter_selected(self, row_count):
+        if self.inverted:
+            return (i for i in range(row_count) if i not in self.indices)
+        return iter(sorted(self.indices))
+
+    def rows_appended(self, old_count, new_count):
+        # 全選択のあとに追加された行は、選択されていない状態で加える
+        if self.inverted: self.indices.update(range(old_count, new_count))
+
+    def rows_removed(self, removed):
+        """removed (昇順の行番号リスト) を削除したあとの行番号に付け替える。"""
+        removed_set = set(removed)
+        self.indices = {i - bisect_left(removed, i) for i in self.indices if i not in removed_set}
+
+
+class VirtualFileList(ttk.Frame):
+    """
+    Treeview には画面に見えている行数分のアイテムだけを作り、スクロールに合わせて中身を差し替える仮想リスト。
+    行データは持たず、model (__len__ / key_at / keys_at / values_range / index_of を持つオブジェクト) から読む。
+    model の行が増減したときは rows_appended / rows_removed / key_replaced (keys_replaced) / reset で知らせ、
+    値だけが変わったときは refresh を呼ぶ。選択は IndexSelection で管理し、変更時に <<ListSelect>> を発生させる。
+    """
+    def __init__(self, master, model, display_columns, **kwargs):
+        super().__init__(master, **kwargs)
+        self.model = model
+        self.display_columns = tuple(display_columns)
+        self._selection = IndexSelection()
+        self._anchor_key = None
+        self._cursor_key = None
+        self._top = 0
+        self._row_height = DEFAULT_ROW_HEIGHT
+        self._header_height = DEFAULT_HEADER_HEIGHT
+        self._visible = 1
+        self._slot_values = []
+        self._slot_selected = ()
+        self._render_pending = None
+
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+        self.tree = ttk.Treeview(self, columns=self.display_columns, show="headings", selectmode="none")
+        self.tree.grid(row=0, column=0, sticky='nsew')
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky='ns')
+
+        self.tree.bind("<Configure>", lambda e: self._schedule_render(measure=True))
+        self.tree.bind("<Button-1>", lambda e: self._on_click(e, "single"))
+        self.tree.bind("<Control-Button-1>", lambda e: self._on_click(e, "toggle"))
+        self.tree.bind("<Shift-Button-1>", lambda e: self._on_click(e, "range"))
+        self.tree.bind("<MouseWheel>", lambda e: self._scroll_by(-WHEEL_ROWS if e.delta > 0 else WHEEL_ROWS))
+        self.tree.bind("<Button-4>", lambda e: self._scroll_by(-WHEEL_ROWS))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_by(WHEEL_ROWS))
+        for key, step in (("<Up>", -1), ("<Down>", 1), ("<Prior>", "-page"), ("<Next>", "page"), ("<Home>", "home"), ("<End>", "end")):
+            self.tree.bind(key, lambda e, s=step: self._on_key(s, extend=False))
+            self.tree.bind(key.replace("<", "<Shift-"), lambda e, s=step: self._on_key(s, extend=True))
+        self.tree.bind("<Control-a>", lambda e: (self.select_all(), "break")[1])
+
+    def heading(self, column, **kwargs): return self.tree.heading(column, **kwargs)
+    def column(self, column, **kwargs): return self.tree.column(column, **kwargs)
+
+    # --- model の変更通知 (メインスレッドから呼ぶ) ---
+    def refresh(self):
+        self._schedule_render()
+
+    def rows_appended(self, old_count):
+        self._selection.rows_appended(old_count, len(self.model))
+        self._schedule_render()
+
+    def rows_removed(self, removed):
+        if not removed: return
+        self._selection.rows_removed(removed)
+        if self.model.index_of(self._anchor_key) is None: self._anchor_key = None
+        if self.model.index_of(self._cursor_key) is None: self._cursor_key = None
+        self._schedule_render()
+
+    def key_replaced(self, old_key, new_key):
+        self.keys_replaced({old_key: new_key})
+
+    def keys_replaced(self, mapping):
+        """mapping は {旧キー: 新キー}。入れ替えでも1回で付け替える。"""
+        self._anchor_key = mapping.get(self._anchor_key, self._anchor_key)
+        self._cursor_key = mapping.get(self._cursor_key, self._cursor_key)
+        self._schedule_render()
+
+    def reset(self):
+        self._selection.clear()
+        self._anchor_key = self._cursor_key = None
+        self._top = 0
+        self._schedule_render()
+
+    # --- 選択 ---
+    def selection(self):
+        """選択中の行のキーを、一覧の並び順で返す。"""
+        return self.model.keys_at(self._selection.iter_selected(len(self.model)))
+
+    def selection_count(self):
+        return self._selection.count(len(self.model))
+
+    def focused_item(self):
+        """サムネイル表示などに使う代表の選択行。最後にクリックした行が選択中ならそれを、なければ先頭の選択行を返す。"""
+        index = self.model.index_of(self._anchor_key)
+        if index is not None and index in self._selection: return self._anchor_key
+        first = next(self._selection.iter_selected(len(self.model)), None)
+        return self.model.key_at(first) if first is not None else None
+
+    def select_all(self):
+        self._selection.select_all()
+        self._selection_changed()
+
+    def deselect_all(self):
+        self._selection.clear()
+        self._selection_changed()
+
+    def _selection_changed(self):
+        self._schedule_render()
+        self.event_generate("<<ListSelect>>")
+
+    # --- 座標 ---
+    def identify(self, x, y):
+        """(キー, 列名) を返す。行やセルの上でなければ (None, None)。"""
+        if self.tree.identify_region(x, y) != "cell": return None, None
+        index = self._index_at(y)
+        column = self.tree.identify_column(x)
+        if index is None or not column: return None, None
+        return self.model.key_at(index), self.display_columns[int(column[1:]) - 1]
+
+    def bbox(self, key, column):
+        index = self.model.index_of(key)
+        if index is None or not self._top <= index < self._top + len(self._slot_values): return None
+        return self.tree.bbox(f"slot{index - self._top}", column) or None
+
+    def _index_at(self, y):
+        item = self.tree.identify_row(y)
+        if not item: return None
+        index = self._top + int(item[4:])
+        return index if index < len(self.model) else None
+
+    # --- 入力 ---
+    def _on_click(self, event, mode):
+        if self.tree.identify_region(event.x, event.y) in ("heading", "separator"): return None
+        self.tree.focus_set()
+        index = self._index_at(event.y)
+        if index is None: return "break"
+        anchor = self.model.index_of(self._anchor_key)
+        key = self.model.key_at(index)
+        if mode == "toggle":
+            self._selection.toggle(index)
+            self._anchor_key = key
+        elif mode == "range" and anchor is not None:
+            self._select_range(anchor, index)
+        else:
+            self._selection.clear()
+            self._selection.add(index)
+            self._anchor_key = key
+        self._cursor_key = key
+        self._selection_changed()
+        return "break"
+
+    def _select_range(self, start, end):
+        self._selection.clear()
+        for i in range(min(start, end), max(start, end) + 1):
+            self._selection.add(i)
+
+    def _on_key(self, step, extend):
+        count = len(self.model)
+        if not count: return "break"
+        current = self.model.index_of(self._cursor_key)
+        if current is None: current = min(self._top, count - 1)
+        page = max(1, self._visible - 1)
+        target = {"-page": current - page, "page": current + page, "home": 0, "end": count - 1}.get(step, current + step if isinstance(step, int) else current)
+        target = max(0, min(count - 1, target))
+        anchor = self.model.index_of(self._anchor_key)
+        target_key = self.model.key_at(target)
+        if extend and anchor is not None:
+            self._select_range(anchor, target)
+        else:
+            self._selection.clear()
+            self._selection.add(target)
+            self._anchor_key = target_key
+        self._cursor_key = target_key
+        if target < self._top: self._top = target
+        elif target >= self._top + self._visible: self._top = target - self._visible + 1
+        self._selection_changed()
+        return "break"
+
+    def _scroll_by(self, rows):
+        self._top += rows
+        self._schedule_render()
+        return "break"
+
+    def _on_scrollbar(self, *args):
+        count = len(self.model)
+        if args[0] == "moveto":
+            self._top = int(float(args[1]) * count)
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            self._top += amount * (max(1, self._visible - 1) if args[2] == "pages" else 1)
+        self._schedule_render()
+
+    # --- 描画 ---
+    def _schedule_render(self, measure=False):
+        if measure: self._measure()
+        if self._render_pending is None:
+            self._render_pending = self.after_idle(self._render)
+
+    def _measure(self):
+        children = self.tree.get_children()
+        bbox = self.tree.bbox(children[0]) if children else None
+        if bbox:
+            self._header_height, self._row_height = bbox[1], max(1, bbox[3])
+        height = self.tree.winfo_height()
+        self._visible = max(1, (height - self._header_height) // self._row_height)
+
+    def _render(self):
+        self._render_pending = None
+        count = len(self.model)
+        self._top = max(0, min(self._top, count - self._visible))
+        rows = self.model.values_range(self._top, self._top + self._visible + 1)  # 下端の半端な行も描画する
+        slots = len(rows)
+
+        for slot in range(len(self._slot_values), slots):
+            self.tree.insert("", "end", iid=f"slot{slot}")
+            self._slot_values.append(None)
+        if len(self._slot_values) > slots:
+            self.tree.delete(*[f"slot{slot}" for slot in range(slots, len(self._slot_values))])
+            del self._slot_values[slots:]
+
+        selected = []
+        for slot in range(slots):
+            values = list(rows[slot])
+            if self._slot_values[slot] != values:
+                self.tree.item(f"slot{slot}", values=values)
+                self._slot_values[slot] = values
+            if self._top + slot in self._selection: selected.append(f"slot{slot}")
+        if tuple(selected) != self._slot_selected:
+            self.tree.selection_set(selected)
+            self._slot_selected = tuple(selected)
+
+        if count: self.scrollbar.set(self._top / count, min(1.0, (self._top + self._visible) / count))
+        else: self.scrollbar.set(0.0, 1.0)
+        # 初回描画で実際の行の高さが分かったら、見える行数を計算し直す
+        previous = self._visible
+        self._measure()
+        if self._visible != previous: self._schedule_render()